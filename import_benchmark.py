@@ -0,0 +1,58 @@
+"""
+Cold-start benchmark of the labs used as libraries.
+
+Each snippet runs in a fresh interpreter (so that nothing is cached in `sys.modules`), from the directory of its lab and with a
+foreign command line (as when imported by another program, e.g. a pool worker or a test runner). The wall-clock time of the whole
+interpreter is measured, and compared to the one of an interpreter doing nothing.
+
+Usage:
+    python import_benchmark.py [--repeats 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# (lab, description, snippet)
+SNIPPETS = [
+    (None, "bare interpreter", "pass"),
+    ("lab3", "best_move_nim_sum on Nim(5)", "from lab_utils.nim import Nim; from lab_utils.nim_omni import best_move_nim_sum; best_move_nim_sum(Nim(5))"),
+    ("lab3", "import solution", "import solution"),
+    ("lab2", "Problem.fitness on N=100", "from lab_utils import Problem; p = Problem(N=100, seed=42); p.fitness([1] * len(p.P))"),
+    ("lab2", "import solution", "import solution"),
+    ("lab1", "import solution", "import solution"),
+]
+
+# command line of a program importing the labs, which the labs must not try to parse
+FOREIGN_ARGV = "import sys; sys.argv = ['host-program', '--unknown-flag', 'value']; "
+
+def cold_start(lab:str, snippet:str, repeats:int)->tuple:
+    """
+        Return the median wall-clock time (s) of a fresh interpreter running `snippet` from the directory of `lab`,
+        and whether the snippet succeeded.
+    """
+    cwd = os.path.join(ROOT, lab) if lab is not None else ROOT
+    timings, ok = [], True
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", FOREIGN_ARGV + snippet], cwd=cwd, capture_output=True)
+        timings.append(time.perf_counter() - start)
+        ok &= result.returncode == 0
+    return statistics.median(timings), ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the labs used as libraries")
+    parser.add_argument("--repeats", default=10, type=int, help="Number of interpreters started per snippet (the median is reported)")
+    args = parser.parse_args()
+
+    print(f"{'lab':<6}{'snippet':<32}{'cold start (ms)':>16}{'status':>10}")
+    for lab, description, snippet in SNIPPETS:
+        elapsed, ok = cold_start(lab, snippet, args.repeats)
+        print(f"{lab or '-':<6}{description:<32}{1e3 * elapsed:>16.1f}{'ok' if ok else 'FAILED':>10}")
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,13 @@ class PriorityQueue:
         self._data_set.remove(item)
         return item
 
+    def peek(self):
+        """Return the (priority, item) pair which would be popped next, without popping it"""
+        return self._data_heap[0]
+
+    def __len__(self):
+        return len(self._data_set)
+
 
 class Multiset:
     """Multiset"""
@@ -130,3 +137,141 @@ class Multiset:
     
     def copy_data(self): 
         return self._data
+
+
+class ArrayMultiset:
+    """Multiset of integers in range(domain), backed by a numpy array of counts.
+    Same interface as Multiset, but the total is cached and unions, intersections, differences
+    and inclusion tests are single array operations. The hash is a digest of the counts' bytes,
+    stable across processes (unlike the hash of bytes, which is salted)."""
+
+    def __init__(self, domain, init=None):
+        # numpy is imported lazily, as in the rest of lab1
+        import numpy as np
+        self.domain = domain
+        if isinstance(init, ArrayMultiset):
+            self._check_domain(init)
+            self._counts = init._counts.copy()
+        elif init is not None:
+            items = np.fromiter(init, dtype=np.int64)
+            assert items.size == 0 or (items.min() >= 0 and items.max() < domain), f"Items must be in range({domain})"
+            # int64 counts, so that unions and additions do not overflow
+            self._counts = np.bincount(items, minlength=domain).astype(np.int64)
+        else:
+            self._counts = np.zeros(domain, dtype=np.int64)
+        self._total = int(self._counts.sum())
+        self._hash = None
+
+    @classmethod
+    def _from_counts(cls, domain, counts):
+        t = cls.__new__(cls)
+        t.domain, t._counts, t._total, t._hash = domain, counts, int(counts.sum()), None
+        return t
+
+    def _check_domain(self, other):
+        if self.domain != other.domain:
+            raise ValueError(f"Multisets over different domains ({self.domain} and {other.domain})")
+
+    def _modified(self):
+        self._hash = None
+
+    def __contains__(self, item):
+        return 0 <= item < self.domain and self._counts[item] > 0
+
+    def __getitem__(self, item):
+        return self.count(item)
+
+    def __iter__(self):
+        import numpy as np
+        return iter(np.repeat(np.arange(self.domain), self._counts).tolist())
+
+    def __len__(self):
+        return self._total
+
+    def __copy__(self):
+        return ArrayMultiset(self.domain, self)
+
+    def __str__(self):
+        return f"M{{{', '.join(repr(i) for i in self)}}}"
+
+    def __repr__(self):
+        return str(self)
+
+    def __bytes__(self):
+        return self._counts.tobytes()
+
+    def __or__(self, other: "ArrayMultiset"):
+        import numpy as np
+        self._check_domain(other)
+        return ArrayMultiset._from_counts(self.domain, np.maximum(self._counts, other._counts))
+
+    def __and__(self, other: "ArrayMultiset"):
+        return self.intersection(other)
+
+    def __add__(self, other: "ArrayMultiset"):
+        return self.union(other)
+
+    def __sub__(self, other: "ArrayMultiset"):
+        import numpy as np
+        self._check_domain(other)
+        assert not np.any((other._counts > 0) & (self._counts == 0)), f"Item not in collection"
+        # counts never go below 0, as in Multiset.remove
+        return ArrayMultiset._from_counts(self.domain, self._counts - np.minimum(self._counts, other._counts))
+
+    def __eq__(self, other: "ArrayMultiset"):
+        import numpy as np
+        return isinstance(other, ArrayMultiset) and self.domain == other.domain and self._total == other._total \
+            and np.array_equal(self._counts, other._counts)
+
+    def __le__(self, other: "ArrayMultiset"):
+        import numpy as np
+        self._check_domain(other)
+        return self._total <= other._total and bool(np.all(self._counts <= other._counts))
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = int.from_bytes(self.digest(), "little", signed=True)
+        return self._hash
+
+    def __lt__(self, other: "ArrayMultiset"):
+        return self <= other and not self == other
+
+    def __ge__(self, other: "ArrayMultiset"):
+        return other <= self
+
+    def __gt__(self, other: "ArrayMultiset"):
+        return other < self
+
+    def digest(self):
+        """8-byte digest of the counts, stable across processes and runs"""
+        import hashlib
+        return hashlib.blake2b(self._counts.tobytes(), digest_size=8).digest()
+
+    def add(self, item, *, cnt=1):
+        assert cnt >= 0, "Can't add a negative number of elements"
+        if cnt > 0:
+            self._counts[item] += cnt
+            self._total += cnt
+            self._modified()
+
+    def remove(self, item, *, cnt=1):
+        assert item in self, f"Item not in collection"
+        removed = min(cnt, int(self._counts[item]))
+        self._counts[item] -= removed
+        self._total -= removed
+        self._modified()
+
+    def count(self, item):
+        return int(self._counts[item]) if 0 <= item < self.domain else 0
+
+    def union(self, other: "ArrayMultiset"):
+        self._check_domain(other)
+        return ArrayMultiset._from_counts(self.domain, self._counts + other._counts)
+
+    def intersection(self, other: "ArrayMultiset"):
+        import numpy as np
+        self._check_domain(other)
+        return ArrayMultiset._from_counts(self.domain, np.minimum(self._counts, other._counts))
+
+    def copy_data(self):
+        return self._counts
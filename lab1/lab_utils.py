@@ -3,6 +3,13 @@ import random
 from re import I
 from typing import Generator
 import collections.abc
+import os
+import sys
+
+# profiling.py is shared by the labs and lives at the root of this repo
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(1, _REPO_ROOT)
 
 def problem(N: int, seed:int=None)->Generator:
     """Returns a generator for given value of N. 
@@ -20,13 +27,40 @@ def problem(N: int, seed:int=None)->Generator:
         for n in range(random.randint(N, N * 5))
     ]
 
+class CoverageIndex: 
+    def __init__(self, P:tuple): 
+        """Inverted index of a set-covering problem, mapping each element to the subsets containing it.
+
+        Args:
+            P (tuple): Subsets of the problem.
+        """
+        self.P = P
+        # element -> indices of the subsets of P containing it
+        self.subsets_of = {}
+        for idx, subset in enumerate(P): 
+            for element in subset: 
+                self.subsets_of.setdefault(element, []).append(idx)
+
 class TupleSet: 
-    def __init__(self, tup:tuple): 
+    def __init__(self, tup:tuple, index:CoverageIndex = None): 
+        """State of the search, i.e. the subsets chosen so far and how many times each element is covered.
+
+        Args:
+            tup (tuple): Initial subset(s).
+            index (CoverageIndex, optional): When given, the number of uncovered elements each subset would add (its gain) is kept
+                                             up to date as subsets are registered, and only subsets with positive gain are kept in
+                                             `useful`. Defaults to None.
+        """
         tup = (tup, ) if not isinstance(tup, collections.abc.Sized) else tup
         # store seen tuples
         self.tuples = tup
         # store counter of visualized numbers
         self.count = Counter()
+        self.index = index
+        if index is not None: 
+            # subset index -> number of uncovered elements in the subset
+            self.gains = [len(subset) for subset in index.P]
+            self.useful = {idx for idx, gain in enumerate(self.gains) if gain > 0}
         if tup:
             for item in tup: 
                 self.add(item)
@@ -55,6 +89,12 @@ class TupleSet:
     def add(self, item, *, cnt=1):
         assert cnt >= 0, "Can't add a negative number of elements"
         if cnt > 0:
+            if self.index is not None and item not in self.count: 
+                # item is newly covered: it is no longer a gain for the subsets containing it
+                for idx in self.index.subsets_of.get(item, ()): 
+                    self.gains[idx] -= 1
+                    if not self.gains[idx]: 
+                        self.useful.discard(idx)
             self.count[item] += cnt
     
     def register_new(self, new_tup:tuple)->None: 
@@ -86,8 +126,9 @@ class TupleSet:
         # sanity check
         if not isinstance(a, tuple) or not a: # either not tuple or empty tuple 
             raise ValueError(f"Can't add {a} of type {type(a)} to already available tuples")
-        # sorting new tuple
-        a = tuple(sorted(a))
+        # sorting new tuple (subsets of P are already sorted, and are shared rather than copied)
+        if any(a[i] > a[i + 1] for i in range(len(a) - 1)): 
+            a = tuple(sorted(a))
 
         return (self.tuples, a)
 class Problem: 
@@ -96,6 +137,14 @@ class Problem:
         self.P = tuple(map(lambda arg: tuple(sorted(arg)), problem(N = N, seed = seed)))
         self.seed = seed
         self.goal = set(range(N))
+        self._index = None
+
+    @property
+    def index(self)->CoverageIndex: 
+        """Inverted index element -> subsets of P (built on first use)."""
+        if self._index is None: 
+            self._index = CoverageIndex(self.P)
+        return self._index
     
     def is_solvable(self)->bool: 
         """This function returns a boolean corresponding to the result of a test performed to conclude whether or not the
@@ -141,7 +190,10 @@ class Problem:
         return sum(candidate.count.values())
     
     def possible_actions(self, candidate:TupleSet)->list: 
-        """This function returns the possible actions given a candidate solution.
+        """This function returns the possible actions given a candidate solution, i.e. the subsets covering at least an element
+        the candidate does not cover (the others can only increase the cost), by decreasing number of newly covered elements.
+        When the candidate tracks its gains on the index of this problem (see `TupleSet`), they are read from there, so that the
+        cost of the call decreases as coverage fills in; otherwise, they are computed from scratch.
 
         Args:
             candidate (TupleSet): Object used to keep track of the states. 
@@ -149,12 +201,10 @@ class Problem:
        Returns:
             list: Available actions.
         """ 
-        actions = []
-        for subtuple in self.P:
-            if not isinstance(candidate.tuples[0], collections.abc.Sized): 
-                if subtuple not in (candidate.tuples,):
-                    actions.append(subtuple) 
-            else: 
-                if subtuple not in candidate.tuples:
-                    actions.append(subtuple) 
-        return actions 
\ No newline at end of file
+        if candidate.index is self.index: 
+            gains, useful = candidate.gains, candidate.useful
+        else: 
+            gains = [sum(element not in candidate.count for element in subset) for subset in self.P]
+            useful = [idx for idx, gain in enumerate(gains) if gain > 0]
+        # ties are broken by position in P, as before
+        return [self.P[idx] for idx in sorted(useful, key = lambda idx: (-gains[idx], idx))]
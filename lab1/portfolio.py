@@ -0,0 +1,169 @@
+import solvers
+from solution import SolvedProblem
+
+import csv
+import multiprocessing
+import os
+import queue
+import time
+from collections import Counter, defaultdict
+from typing import Callable
+
+# Each strategy solves the problem (N, seed) and returns its cost and whether the cost is proven optimal.
+# Strategies run in their own process, so they must be module-level functions.
+
+def _graph_search(N:int, seed:int, priority:str)->dict:
+    sp = SolvedProblem(N = N, seed = seed)
+    functions = dict(zip(["bfs", "greedy_best_first", "astar"], sp.set_functions()))
+    result = sp.search(priority_function = functions[priority])
+    if result is None:
+        raise ValueError("Problem is not solvable!")
+    # the graph search does not prove the optimality of the cover it finds
+    return {"cost": sp.problem.compute_cost(result), "optimal": False}
+
+def bfs(N:int, seed:int, deadline:float)->dict:
+    return _graph_search(N, seed, "bfs")
+
+def greedy_best_first(N:int, seed:int, deadline:float)->dict:
+    return _graph_search(N, seed, "greedy_best_first")
+
+def astar(N:int, seed:int, deadline:float)->dict:
+    return _graph_search(N, seed, "astar")
+
+def lazy_greedy(N:int, seed:int, deadline:float)->dict:
+    stats = solvers.lazy_greedy_cover(SolvedProblem(N = N, seed = seed).problem)
+    return {"cost": stats["cost"], "optimal": False}
+
+def branch_and_bound(N:int, seed:int, deadline:float)->dict:
+    problem = SolvedProblem(N = N, seed = seed).problem
+    # stops before the deadline, so that its best cover is reported rather than lost
+    time_limit = None if deadline is None else max(0., 0.8 * (deadline - time.time()))
+    stats = solvers.branch_and_bound(problem, time_limit = time_limit)
+    return {"cost": stats["cost"], "optimal": stats["optimal"]}
+
+def beam(N:int, seed:int, deadline:float)->dict:
+    stats = solvers.beam_search(SolvedProblem(N = N, seed = seed).problem, width = 16)
+    return {"cost": stats["cost"], "optimal": False}
+
+STRATEGIES = {
+    "bfs": bfs,
+    "greedy_best_first": greedy_best_first,
+    "astar": astar,
+    "lazy_greedy": lazy_greedy,
+    "bnb": branch_and_bound,
+    "beam": beam,
+}
+
+def _worker(name:str, strategy:Callable, N:int, seed:int, deadline:float, results:multiprocessing.Queue)->None:
+    start = time.perf_counter()
+    try:
+        result = strategy(N, seed, deadline)
+        results.put((name, "finished", result, time.perf_counter() - start))
+    except Exception as error:
+        results.put((name, "failed", {"error": repr(error)}, time.perf_counter() - start))
+
+def race(N:int, seed:int, strategies:list=None, deadline:float=60., log_path:str=None)->dict:
+    """Race several strategies on the same problem, each in its own process.
+    The race ends as soon as a strategy returns a proven-optimal cover, when all the strategies are over or at the deadline,
+    and the strategies still running are terminated. The winner is the first proven-optimal strategy or, if none, the one
+    with the cheapest cover among the finished ones (ties are broken by time).
+
+    Args:
+        N (int): problem size.
+        seed (int): problem seed.
+        strategies (list, optional): names of the strategies to race (keys of STRATEGIES). Defaults to None (all of them).
+        deadline (float, optional): wall-clock budget of the race (s). Defaults to 60.
+        log_path (str, optional): CSV file where a row per race is appended (N, seed, winner, cost, ... and the outcome of
+                                  each strategy), to learn which strategy to run by default (see `winners`). Defaults to None.
+
+    Returns:
+        dict: "winner" (None if no strategy finished), "cost", "optimal", "seconds" and "strategies" (name -> outcome, one in
+              ['finished', 'optimal', 'failed', 'cancelled'], with cost and seconds).
+    """
+    strategies = list(STRATEGIES) if strategies is None else strategies
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        raise ValueError(f"Unknown strategies {sorted(unknown)}! Please use some in {list(STRATEGIES)}")
+
+    start = time.perf_counter()
+    end = time.time() + deadline
+    results = multiprocessing.Queue()
+    processes = {
+        name: multiprocessing.Process(target = _worker, args = (name, STRATEGIES[name], N, seed, end, results), daemon = True)
+        for name in strategies
+    }
+    outcomes = {name: {"outcome": "cancelled", "cost": None, "seconds": None} for name in strategies}
+
+    try:
+        for process in processes.values():
+            process.start()
+        pending = set(strategies)
+        while pending:
+            try:
+                name, status, result, seconds = results.get(timeout = max(0., end - time.time()))
+            except queue.Empty:
+                break
+            pending.discard(name)
+            if status == "failed":
+                outcomes[name] = {"outcome": "failed", "cost": None, "seconds": seconds, **result}
+                continue
+            outcomes[name] = {"outcome": "optimal" if result["optimal"] else "finished", "cost": result["cost"], "seconds": seconds}
+            if result["optimal"]:
+                break
+    finally:
+        # the remaining strategies are cancelled
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join()
+
+    finished = [(name, outcome) for name, outcome in outcomes.items() if outcome["outcome"] in ["finished", "optimal"]]
+    winner = min(finished, key = lambda item: (item[1]["outcome"] != "optimal", item[1]["cost"], item[1]["seconds"]), default = (None, None))[0]
+    race_result = {
+        "winner": winner,
+        "cost": outcomes[winner]["cost"] if winner is not None else None,
+        "optimal": winner is not None and outcomes[winner]["outcome"] == "optimal",
+        "seconds": time.perf_counter() - start,
+        "strategies": outcomes
+    }
+    if log_path is not None:
+        log_race(log_path, N, seed, deadline, race_result)
+    return race_result
+
+def log_race(log_path:str, N:int, seed:int, deadline:float, race_result:dict)->None:
+    """Append the outcome of a race to the CSV file `log_path` (one row per race, with cost and seconds of each strategy)."""
+    row = {
+        "N": N, "seed": seed, "deadline": deadline, "winner": race_result["winner"], "cost": race_result["cost"],
+        "optimal": race_result["optimal"], "seconds": round(race_result["seconds"], 4)
+    }
+    for name, outcome in race_result["strategies"].items():
+        row[f"{name}_outcome"] = outcome["outcome"]
+        row[f"{name}_cost"] = outcome["cost"]
+        row[f"{name}_seconds"] = None if outcome["seconds"] is None else round(outcome["seconds"], 4)
+
+    new_file = not os.path.exists(log_path) or os.path.getsize(log_path) == 0
+    if not new_file:
+        with open(log_path, newline = "") as f:
+            fieldnames = next(csv.reader(f))
+        if set(row) - set(fieldnames):
+            raise ValueError(f"{log_path} logs races among other strategies, please use another file")
+    else:
+        fieldnames = list(row)
+    with open(log_path, "a", newline = "") as f:
+        writer = csv.DictWriter(f, fieldnames = fieldnames)
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+def winners(log_path:str)->dict:
+    """Number of races won by each strategy per problem size, from the log written by `race`.
+
+    Returns:
+        dict: N -> Counter of the winners (most frequent first with `most_common`).
+    """
+    wins = defaultdict(Counter)
+    with open(log_path, newline = "") as f:
+        for row in csv.DictReader(f):
+            wins[int(row["N"])][row["winner"] or None] += 1
+    return dict(wins)
@@ -1,9 +1,13 @@
 from itertools import product
 from lab_utils import Problem, TupleSet
 from gx_utils import PriorityQueue
+import profiling
+import solvers
 
+import argparse
 import logging
 import random
+import time
 from typing import Callable, Tuple
 
 # flatten out a tuple of tuples
@@ -26,8 +30,11 @@ class SolvedProblem:
             list: List of priority functions defined for current problem.
         """
         self.BF = lambda s: len(self.state_cost)
-        self.custom_heuristic = lambda s: self.heuristic(s)
-        return [self.BF, self.custom_heuristic]
+        # ties are broken in insertion order (as in BF), since states themselves cannot be compared
+        self.custom_heuristic = lambda s: (self.heuristic(s), len(self.state_cost))
+        # the cost of a state is known before it is pushed in the frontier
+        self.astar = lambda s: (self.state_cost[s.tuples] + self.heuristic(s), len(self.state_cost))
+        return [self.BF, self.custom_heuristic, self.astar]
     
     def search(
         self, 
@@ -52,38 +59,157 @@ class SolvedProblem:
             priority_function = lambda arg: len(self.state_cost)
         
         # initializations
-        state = TupleSet(tup = initial_state)
+        state = TupleSet(tup = initial_state, index = self.problem.index)
         self.state_cost[state.tuples] = 0
 
         while state is not None and not self.problem.test_candidate(state):
-            for a in self.problem.possible_actions(state):
+            if profiling.enabled:
+                profiling.count("lab1.nodes_expanded")
+                start = time.perf_counter()
+            actions = self.problem.possible_actions(state)
+            if profiling.enabled:
+                profiling.count("lab1.actions", len(actions))
+                start = profiling.record("lab1.possible_actions", start)
+            for a in actions:
                 new_state = state.result(a)
                 cost = self.problem.compute_cost(TupleSet(new_state))
                 if new_state not in self.state_cost and new_state not in self.frontier:
                     self.state_cost[new_state] = self.state_cost[state.tuples] + cost
                     self.frontier.push(new_state, p=priority_function(TupleSet(new_state)))
+                    if profiling.enabled:
+                        profiling.count("lab1.frontier_push")
                     logging.debug(f"Added new node to frontier (cost = {self.state_cost[new_state]})")
                 if new_state in self.frontier and self.state_cost[new_state] > self.state_cost[state.tuples] + cost:
                     old_cost = self.state_cost[new_state]
                     self.state_cost[new_state] = self.state_cost[state] + cost
+                    if profiling.enabled:
+                        profiling.count("lab1.frontier_update")
                     logging.debug(f"Update node cost in frontier: {old_cost} -> {self.state_cost[new_state]}")
-            if self.frontier:
+            if profiling.enabled:
+                start = profiling.record("lab1.expansion", start)
+            # actions covering nothing new for the current state can only increase the cost (and are not among its successors)
+            performed_action = None
+            while self.frontier and performed_action is None:
                 performed_action = self.frontier.pop()[-1]
+                if all(element in state.count for element in performed_action):
+                    performed_action = None
+            if profiling.enabled:
+                profiling.record("lab1.frontier_pop", start)
+            if performed_action is not None:
                 state.register_new(new_tup = performed_action)
             else:
                 state = None
         return state
 
-def main(): 
-    problem_size = [5, 10, 20, 50, 100, 500, 1000]
+    def branch_and_bound(self, time_limit:float = None, node_limit:int = None)->Tuple[TupleSet, dict]: 
+        """This function performs an anytime branch-and-bound search (see `solvers.branch_and_bound`), which can be stopped at any
+        time (budgets or Ctrl-C) returning the best cover found so far and its proven optimality gap.
+
+        Args:
+            time_limit (float, optional): Wall-clock budget (s). Defaults to None (no limit).
+            node_limit (int, optional): Maximal number of nodes to explore. Defaults to None (no limit).
+
+        Returns:
+            Tuple[TupleSet, dict]: Best cover found and search statistics (cost, lower bound, gap, nodes, seconds, ...).
+        """
+        result = solvers.branch_and_bound(self.problem, time_limit = time_limit, node_limit = node_limit)
+        return self.cover_state(result["cover"]), result
+
+    def beam_search(self, width:int = 16)->Tuple[TupleSet, dict]: 
+        """This function performs a beam search keeping `width` covers per depth (see `solvers.beam_search`), to find good covers fast
+        on large problems (without optimality proofs).
+
+        Args:
+            width (int, optional): Number of covers kept at each depth. Defaults to 16.
+
+        Returns:
+            Tuple[TupleSet, dict]: Best cover found and search statistics (cost, greedy cost, seconds, depth, scored successors).
+        """
+        result = solvers.beam_search(self.problem, width = width)
+        return self.cover_state(result["cover"]), result
+
+    def cover_state(self, cover:list)->TupleSet: 
+        """This function returns the state made of the subsets in `cover`.
+
+        Args:
+            cover (list): Non-empty list of subsets.
+
+        Returns:
+            TupleSet: State registering all the subsets in `cover`.
+        """
+        state = TupleSet(tup = cover[0])
+        for subset in cover[1:]: 
+            state.register_new(new_tup = subset)
+        return state
+
+def parse_args(argv:list=None)->object: 
+    """args function. Parses `argv` (defaults to the command line).
+
+    Returns:
+        object: args parser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--solver", default="search", type=str, choices=["search", "greedy", "bnb", "beam", "portfolio"], help="Search algorithm: graph search, lazy greedy, anytime branch-and-bound, beam search or a race of strategies")
+    parser.add_argument("--time-limit", default=None, type=float, help="Wall-clock budget (s) per problem size of the branch-and-bound")
+    parser.add_argument("--node-limit", default=None, type=int, help="Maximal number of nodes explored per problem size by the branch-and-bound")
+    parser.add_argument("--widths", default=[1, 4, 16, 64], type=int, nargs="+", help="Beam widths (one run per width, to trade quality for time)")
+    parser.add_argument("--sizes", default=[5, 10, 20, 50, 100, 500, 1000], type=int, nargs="+", help="Problem sizes to solve")
+    parser.add_argument("--seed", default=42, type=int, help="Random seed of the problems")
+    parser.add_argument("--strategies", default=None, type=str, nargs="+", help="Strategies raced by the portfolio (defaults to all, see portfolio.STRATEGIES)")
+    parser.add_argument("--deadline", default=60., type=float, help="Wall-clock budget (s) per problem size of the portfolio")
+    parser.add_argument("--portfolio-log", default=None, type=str, help="CSV file where the winner of each race is appended")
+    parser.add_argument("--profile", default=None, type=str, help="Profile the run (one in ['phases', 'cprofile', 'sample'])")
+    parser.add_argument("--profile-output", default=None, type=str, help="When profiling with cprofile or sample, where to write the raw profile")
+    return parser.parse_args(argv)
+
+def main(argv:list=None): 
+    args = parse_args(argv)
+    if args.profile is not None: 
+        return profiling.profile_run(run, args, mode = args.profile, output = args.profile_output)
+    return run(args)
+
+def run(args:object): 
+    problem_size = args.sizes
     functions = ["Breadth First"] # to be further modified adding new functions
 
     for function, size in product(functions, problem_size): 
-        sp = SolvedProblem(N = size, seed = 42)
+        sp = SolvedProblem(N = size, seed = args.seed)
 
         if not sp.problem.is_solvable(): 
             raise Exception("Problem is not solvable!")
         
+        if args.solver == "portfolio": 
+            # imported here, since the portfolio imports this module
+            import portfolio
+            race = portfolio.race(size, args.seed, strategies = args.strategies, deadline = args.deadline, log_path = args.portfolio_log)
+            print(f"With a portfolio and size {size}:\n")
+            print(f"\tSolution's cost: {race['cost']} ({'optimal' if race['optimal'] else 'best within the deadline'}) by {race['winner']} in {race['seconds']:.2f} s")
+            for name, outcome in race["strategies"].items(): 
+                print(f"\t\t{name:<20}{outcome['outcome']:<12}cost {outcome['cost']}")
+            continue
+
+        if args.solver == "beam": 
+            print(f"With beam search and size {size}:\n")
+            for width in args.widths: 
+                result, stats = sp.beam_search(width = width)
+                assert sp.problem.test_candidate(result) and sp.problem.compute_cost(result) == stats["cost"]
+                print(f"\twidth {width:>4}: solution's cost {stats['cost']} (greedy {stats['greedy_cost']}) in {stats['seconds']:.2f} s, scoring {stats['scored']:,} successors")
+            continue
+
+        if args.solver == "greedy": 
+            stats = solvers.lazy_greedy_cover(sp.problem)
+            print(f"With lazy greedy and size {size}:\n")
+            print(f"\tSolution's cost: {stats['cost']} in {stats['seconds']:.3f} s\n\t with {stats['evaluations']:,} gain evaluations ({stats['avoided']:.1%} avoided)")
+            continue
+
+        if args.solver == "bnb": 
+            result, stats = sp.branch_and_bound(time_limit = args.time_limit, node_limit = args.node_limit)
+            assert sp.problem.test_candidate(result) and sp.problem.compute_cost(result) == stats["cost"]
+            status = "optimal" if stats["optimal"] else f"stopped by {stats['stopped_by']}, gap {stats['gap']:.1%}"
+            print(f"With branch-and-bound and size {size}:\n")
+            print(f"\tSolution's cost: {stats['cost']} (lower bound {stats['lower_bound']}, {status})\n\t exploring {stats['nodes']:,} nodes in {stats['seconds']:.2f} s")
+            continue
+
         result = sp.search(priority_function=None) # to be further modified
         
         print(f"With priority function {function} and size {size}:\n")
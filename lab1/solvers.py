@@ -0,0 +1,396 @@
+from lab_utils import Problem
+from gx_utils import PriorityQueue
+import profiling
+
+import logging
+import math
+import time
+from functools import cached_property
+from typing import Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Subsets and sets of elements are represented as bitsets (python integers, bit e set if element e belongs to the set),
+# so that unions, differences and cardinalities of sets of up to thousands of elements are single integer operations.
+
+def to_bitset(items)->int:
+    """Return the bitset of the non-negative integers in `items`."""
+    bitset = 0
+    for item in items:
+        bitset |= 1 << item
+    return bitset
+
+class CoverInstance:
+    def __init__(self, problem:Problem):
+        """Bitset view of a set-covering problem, shared by the solvers.
+        Duplicated subsets of `problem.P` are considered once, and the cost of a subset is its length (see `Problem.compute_cost`).
+        Only `problem.P` and `problem.goal` are used, so that the Problem of lab2 (whose subsets are lists) is accepted as well.
+
+        Args:
+            problem (Problem): set-covering problem.
+        """
+        # subset -> index of its first occurrence in problem.P
+        first_index = dict()
+        for idx, subset in enumerate(problem.P):
+            first_index.setdefault(tuple(sorted(subset)), idx)
+        self.subsets = list(first_index)
+        self.indices = list(first_index.values())
+        self.n_subsets = len(problem.P)
+        self.masks = [to_bitset(subset) for subset in self.subsets]
+        self.weights = [len(subset) for subset in self.subsets]
+        self.goal = to_bitset(problem.goal)
+
+        self.elements = tuple(sorted(problem.goal))
+
+    @cached_property
+    def containing(self)->dict:
+        """element -> indices of the subsets containing it (built on first use, since only the branch-and-bound needs it)"""
+        containing = {element: [] for element in self.elements}
+        for idx, subset in enumerate(self.subsets):
+            for element in subset:
+                containing[element].append(idx)
+        return containing
+
+    @cached_property
+    def branching_order(self)->list:
+        """elements sorted by number of subsets containing them: rare elements are the most constrained ones to branch on"""
+        return sorted(self.elements, key = lambda element: len(self.containing[element]))
+
+    def cost(self, chosen:list)->int:
+        """Cost of the subsets with indices in `chosen`."""
+        return sum(self.weights[idx] for idx in chosen)
+
+    def lower_bound(self, uncovered:int, excluded:int=0)->float:
+        """Admissible lower bound on the cost of covering the elements in `uncovered` without the subsets in `excluded`.
+        Each subset s spreads its cost over the uncovered elements it contains, i.e. costs |s| / |s & uncovered| per element,
+        and each element is charged the cheapest share among the subsets containing it. Any cover pays at least these shares.
+
+        Args:
+            uncovered (int): bitset of the elements still to cover.
+            excluded (int, optional): bitset of the indices of the subsets which cannot be used. Defaults to 0.
+
+        Returns:
+            float: lower bound, infinite if the elements cannot be covered.
+        """
+        shares = sorted(
+            (self.weights[idx] / covered, mask)
+            for idx, mask in enumerate(self.masks)
+            if not excluded >> idx & 1 and (covered := (mask & uncovered).bit_count())
+        )
+        bound, left = 0., uncovered
+        for share, mask in shares:
+            newly_covered = mask & left
+            if newly_covered:
+                bound += share * newly_covered.bit_count()
+                left &= ~newly_covered
+                if not left:
+                    return bound
+        return bound if not left else math.inf
+
+    def lazy_greedy(self)->Tuple[list, int, int]:
+        """Greedy cover: repeatedly choose the subset with the lowest cost per newly covered element.
+        Gains can only decrease as elements get covered, so that the gain a subset had when it was pushed in the queue is an upper
+        bound on its current one (CELF): only the subset on top of the queue is re-evaluated, and it is chosen if its updated
+        priority still beats the (possibly stale) one of the next subset, otherwise it is pushed back with the updated priority.
+
+        Raises:
+            ValueError: the goal cannot be covered.
+
+        Returns:
+            Tuple[list, int, int]: indices of the chosen subsets, number of gain evaluations, number of gain evaluations
+                                   that the plain greedy (re-evaluating all the subsets at each step) would have performed.
+        """
+        # priorities are costs per covered element, so that the queue (a min-heap) pops the best subset first
+        queue = PriorityQueue()
+        for idx, mask in enumerate(self.masks):
+            if mask:
+                queue.push(idx, p = self.weights[idx] / mask.bit_count())
+        evaluations = len(self.masks)
+
+        uncovered, chosen = self.goal, []
+        while uncovered:
+            if not queue:
+                raise ValueError("Problem is not solvable!")
+            idx = queue.pop()
+            gain = (self.masks[idx] & uncovered).bit_count()
+            evaluations += 1
+            if profiling.enabled:
+                profiling.count("lab1.greedy_evaluations")
+            if not gain:
+                # subsets covering nothing new will never cover anything
+                continue
+            priority = self.weights[idx] / gain
+            if queue and priority > queue.peek()[0]:
+                queue.push(idx, p = priority)
+                continue
+            chosen.append(idx)
+            uncovered &= ~self.masks[idx]
+        # the plain greedy evaluates all the subsets which are not chosen yet to choose the next one
+        eager_evaluations = sum(len(self.masks) - step for step in range(len(chosen)))
+        return chosen, evaluations, eager_evaluations
+
+    def drop_redundant(self, chosen:list)->list:
+        """Drop chosen subsets (most expensive first) whose elements are all covered by the other chosen subsets.
+
+        Args:
+            chosen (list): indices of the subsets of a cover.
+
+        Returns:
+            list: indices of the subsets of a cover without redundant subsets.
+        """
+        chosen = list(chosen)
+        for idx in sorted(chosen, key = lambda idx: self.weights[idx], reverse = True):
+            others = 0
+            for other in chosen:
+                if other != idx:
+                    others |= self.masks[other]
+            if others & self.goal == self.goal:
+                chosen.remove(idx)
+        return chosen
+
+    def incidence(self)->"np.ndarray":
+        """Subset-by-element incidence matrix (float32, so that products with it run on BLAS and are exact up to 2^24)."""
+        # numpy is imported lazily, since only the beam search needs it
+        import numpy as np
+        position = {element: column for column, element in enumerate(self.elements)}
+        incidence = np.zeros((len(self.subsets), len(self.elements)), dtype = np.float32)
+        for idx, subset in enumerate(self.subsets):
+            incidence[idx, [position[element] for element in subset]] = 1
+        return incidence
+
+    def greedy_profile(self, chosen:list)->Tuple[list, list]:
+        """Cost the greedy cover `chosen` spends to cover the last u elements, for each number u of uncovered elements it goes through.
+
+        Returns:
+            Tuple[list, list]: numbers of uncovered elements (increasing) and corresponding remaining costs.
+        """
+        uncovered, remaining = [self.goal.bit_count()], [self.cost(chosen)]
+        left = self.goal
+        for idx in chosen:
+            left &= ~self.masks[idx]
+            uncovered.append(left.bit_count()); remaining.append(remaining[-1] - self.weights[idx])
+        return uncovered[::-1], remaining[::-1]
+
+    def mask(self, chosen:list)->list:
+        """Boolean mask over the subsets of the original problem (the candidate format of lab2) selecting `chosen`."""
+        candidate = [False] * self.n_subsets
+        for idx in chosen:
+            candidate[self.indices[idx]] = True
+        return candidate
+
+def lazy_greedy_cover(problem:Problem, drop_redundant:bool=True)->dict:
+    """Greedy set-covering baseline choosing subsets by new coverage per cost, re-evaluated lazily (see `CoverInstance.lazy_greedy`).
+    Accepts both the Problem of lab1 and the one of lab2.
+
+    Args:
+        problem (Problem): set-covering problem.
+        drop_redundant (bool, optional): whether to drop the subsets made redundant by the ones chosen later. Defaults to True.
+
+    Returns:
+        dict: "cover" (list of subsets), "mask" (boolean mask over `problem.P`, i.e. a lab2 candidate), "cost", "seconds",
+              "evaluations" (gain evaluations performed), "eager_evaluations" (the ones the plain greedy would perform)
+              and "avoided" (share of the latter avoided).
+    """
+    start = time.perf_counter()
+    instance = CoverInstance(problem)
+    chosen, evaluations, eager_evaluations = instance.lazy_greedy()
+    if drop_redundant:
+        chosen = instance.drop_redundant(chosen)
+    return {
+        "cover": [instance.subsets[idx] for idx in chosen],
+        "mask": instance.mask(chosen),
+        "cost": instance.cost(chosen),
+        "seconds": time.perf_counter() - start,
+        "evaluations": evaluations,
+        "eager_evaluations": eager_evaluations,
+        "avoided": 1 - evaluations / eager_evaluations
+    }
+
+def branch_and_bound(problem:Problem, time_limit:float=None, node_limit:int=None)->dict:
+    """Anytime branch-and-bound for the set-covering problem.
+    The greedy cover (see `lazy_greedy_cover`) is the first incumbent. Then, the search tree is explored depth-first: each node branches on the uncovered
+    element contained in the fewest subsets, one child per subset containing it (cheapest share first), where the i-th child cannot
+    use the subsets chosen by its i-1 previous siblings, so that no cover is visited twice. Nodes whose cost plus lower bound
+    (see `CoverInstance.lower_bound`) cannot improve the incumbent are pruned.
+
+    The search can be stopped at any time (time or node budget, or KeyboardInterrupt): the best cover found so far is returned
+    together with a proven lower bound on the optimal cost, i.e. the smallest bound among the nodes left to explore.
+
+    Args:
+        problem (Problem): set-covering problem.
+        time_limit (float, optional): wall-clock budget (s). Defaults to None (no limit).
+        node_limit (int, optional): maximal number of nodes to explore. Defaults to None (no limit).
+
+    Returns:
+        dict: "cover" (list of subsets), "cost", "lower_bound", "gap" ((cost - lower_bound) / cost), "optimal", "nodes", "seconds"
+              and "stopped_by" (None when the search completed, otherwise one in ['time', 'nodes', 'interrupt']).
+    """
+    start = time.perf_counter()
+    instance = CoverInstance(problem)
+
+    incumbent = instance.drop_redundant(instance.lazy_greedy()[0])
+    incumbent_cost = instance.cost(incumbent)
+    logging.info(f"Greedy incumbent: cost {incumbent_cost}")
+
+    # each node is (cost, uncovered elements, chosen subsets, excluded subsets, lower bound on the cost of its covers)
+    root_bound = math.ceil(instance.lower_bound(instance.goal) - 1e-9)
+    stack = [(0, instance.goal, (), 0, root_bound)]
+    nodes, stopped_by = 0, None
+    # bound of the node being expanded, when it is no longer on the stack
+    in_flight = None
+
+    try:
+        while stack:
+            if time_limit is not None and time.perf_counter() - start > time_limit:
+                stopped_by = "time"; break
+            if node_limit is not None and nodes >= node_limit:
+                stopped_by = "nodes"; break
+
+            cost, uncovered, chosen, excluded, bound = stack[-1]
+            if bound >= incumbent_cost:
+                stack.pop()
+                continue
+
+            nodes += 1
+            if profiling.enabled:
+                profiling.count("lab1.bnb_nodes")
+                bound_start = time.perf_counter()
+            # costs are integers: the bound can be rounded up
+            bound = cost + math.ceil(instance.lower_bound(uncovered, excluded) - 1e-9)
+            if profiling.enabled:
+                profiling.record("lab1.bnb_bound", bound_start)
+            # until its children are on the stack, the bound of the node is kept in `in_flight`, so that an interruption in
+            # between still accounts for its subtree in the lower bound
+            in_flight = bound
+            stack.pop()
+            if bound >= incumbent_cost:
+                in_flight = None
+                if profiling.enabled:
+                    profiling.count("lab1.bnb_pruned")
+                continue
+
+            # branching on the most constrained uncovered element
+            element = next(element for element in instance.branching_order if uncovered >> element & 1)
+            candidates = sorted(
+                (idx for idx in instance.containing[element] if not excluded >> idx & 1),
+                key = lambda idx: instance.weights[idx] / (instance.masks[idx] & uncovered).bit_count()
+            )
+
+            children = []
+            for idx in candidates:
+                child_cost = cost + instance.weights[idx]
+                child_uncovered = uncovered & ~instance.masks[idx]
+                if not child_uncovered:
+                    if child_cost < incumbent_cost:
+                        incumbent, incumbent_cost = list(chosen) + [idx], child_cost
+                        logging.info(f"New incumbent after {nodes:,} nodes: cost {incumbent_cost}")
+                elif child_cost < incumbent_cost:
+                    children.append((child_cost, child_uncovered, chosen + (idx,), excluded, bound))
+                # siblings explored later do not use this subset
+                excluded |= 1 << idx
+
+            # the first child (cheapest share) is explored first
+            stack.extend(reversed(children))
+            in_flight = None
+
+    except KeyboardInterrupt:
+        stopped_by = "interrupt"
+
+    if stopped_by is not None:
+        lower_bound = min([incumbent_cost] + [node[-1] for node in stack] + ([in_flight] if in_flight is not None else []))
+    else:
+        lower_bound = incumbent_cost
+    return {
+        "cover": [instance.subsets[idx] for idx in incumbent],
+        "cost": incumbent_cost,
+        "lower_bound": lower_bound,
+        "gap": (incumbent_cost - lower_bound) / incumbent_cost,
+        "optimal": lower_bound == incumbent_cost,
+        "nodes": nodes,
+        "seconds": time.perf_counter() - start,
+        "stopped_by": stopped_by
+    }
+
+def beam_search(problem:Problem, width:int=16)->dict:
+    """Beam search for good covers (without optimality proofs).
+    Starting from the empty cover, each depth adds a subset to the covers in the beam: all the successors of all the covers are scored
+    at once, multiplying the beam's uncovered-elements matrix (width x elements) by the incidence matrix (elements x subsets), and the
+    `width` best distinct successors are kept. A successor is scored by its cost plus the cost the greedy cover spends to cover as many
+    elements as the successor leaves uncovered (see `CoverInstance.greedy_profile`); successors which cannot beat the best cover found
+    so far (initially, the greedy one) are dropped. The search ends when the beam is empty. Memory is O(width x subsets) at any depth.
+
+    Args:
+        problem (Problem): set-covering problem.
+        width (int, optional): number of covers kept at each depth. Defaults to 16.
+
+    Returns:
+        dict: "cover" (list of subsets), "mask" (boolean mask over `problem.P`), "cost", "greedy_cost", "seconds", "depth"
+              and "scored" (number of successors scored).
+    """
+    import numpy as np
+    start = time.perf_counter()
+    instance = CoverInstance(problem)
+    incidence = instance.incidence()
+    n_subsets, n_elements = incidence.shape
+    weights = np.array(instance.weights, dtype = float)
+
+    best = instance.drop_redundant(instance.lazy_greedy()[0])
+    best_cost = greedy_cost = instance.cost(best)
+    profile = instance.greedy_profile(best)
+
+    # beam: elements covered (width x elements), subsets chosen (width x subsets) and cost of each cover
+    covered = np.zeros((1, n_elements), dtype = bool)
+    chosen = np.zeros((1, n_subsets), dtype = bool)
+    costs = np.zeros(1)
+    depth = scored = 0
+
+    while len(costs):
+        depth += 1; scored += covered.shape[0] * n_subsets
+        with profiling.phase("lab1.beam_scoring"):
+            # newly covered elements of each (cover, subset) pair
+            gains = (~covered).astype(np.float32) @ incidence.T
+            new_costs = costs[:, None] + weights[None, :]
+            uncovered = n_elements - covered.sum(axis = 1)[:, None] - gains
+            scores = new_costs + np.interp(uncovered, *profile)
+            # subsets adding nothing new (among which the chosen ones) are useless, and so are covers not cheaper than the best one
+            scores[(gains == 0) | (new_costs >= best_cost)] = np.inf
+
+        with profiling.phase("lab1.beam_selection"):
+            candidates = np.flatnonzero(np.isfinite(scores))
+            candidates = candidates[np.argsort(scores.flat[candidates], kind = "stable")]
+            kept, seen = [], set()
+            for candidate in candidates:
+                parent, idx = divmod(int(candidate), n_subsets)
+                if new_costs[parent, idx] >= best_cost:
+                    continue
+                if uncovered[parent, idx] == 0:
+                    best_cost = new_costs[parent, idx]
+                    best = list(np.flatnonzero(chosen[parent])) + [idx]
+                    continue
+                # the same cover can be reached adding its subsets in different orders
+                child = chosen[parent].copy(); child[idx] = True
+                key = child.tobytes()
+                if key in seen:
+                    continue
+                seen.add(key); kept.append((parent, idx, child))
+                if len(kept) == width:
+                    break
+
+        if not kept:
+            break
+        parents = np.array([parent for parent, _, _ in kept]); indices = np.array([idx for _, idx, _ in kept])
+        covered = covered[parents] | (incidence[indices] > 0)
+        chosen = np.array([child for _, _, child in kept])
+        costs = new_costs[parents, indices]
+
+    best = instance.drop_redundant([int(idx) for idx in best])
+    return {
+        "cover": [instance.subsets[idx] for idx in best],
+        "mask": instance.mask(best),
+        "cost": instance.cost(best),
+        "greedy_cost": greedy_cost,
+        "seconds": time.perf_counter() - start,
+        "depth": depth,
+        "scored": scored
+    }
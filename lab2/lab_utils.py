@@ -1,7 +1,19 @@
 import random
-from typing import Generator, List
-from itertools import chain
-import numpy as np
+from typing import Generator, List, TYPE_CHECKING
+from itertools import chain, compress
+import os
+import sys
+import time
+
+# profiling.py is shared by the labs and lives at the root of this repo
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(1, _REPO_ROOT)
+
+import profiling
+
+if TYPE_CHECKING:
+    import numpy as np
 
 def problem(N: int, seed:int=None)->Generator:
     """Returns a generator for given value of N. 
@@ -19,9 +31,11 @@ def problem(N: int, seed:int=None)->Generator:
         for n in range(random.randint(N, N * 5))
     ]
 class Problem: 
-    def __init__(self, N:int, seed:int=None):
+    def __init__(self, N:int, seed:int=None, P:List[list]=None):
         self.N = N 
-        self.P = np.array(problem(N = N, seed = seed), dtype=object)
+        # plain lists (rather than a numpy object array): importing and using Problem does not require numpy
+        # P can be given when already generated (e.g., read from shared memory), since generating it is slow for large N
+        self.P = problem(N = N, seed = seed) if P is None else P
         self.seed = seed
         self.goal = set(range(N))
 
@@ -52,7 +66,7 @@ class Problem:
         Returns:
             List[list]: P masked with respect to candidate.
         """
-        return self.P[[bool(ind) for ind in candidate]]
+        return list(compress(self.P, candidate))
 
     def test_candidate(self, candidate:List[bool])->bool: 
         """This function returns a boolean correspoding to the test performed to conclude whether or not a given candidate
@@ -89,6 +103,8 @@ class Problem:
         """
         # incrementing fitness calls
         self.fitness_calls += 1
+        if profiling.enabled:
+            start = time.perf_counter()
         # w_reps must be negative since repetitions are penalized
         w_coverage, w_reps = weights; w_reps *= -1
         # retrieve actual candidate
@@ -104,7 +120,91 @@ class Problem:
         reps_fitness =  (reps_fitness - self.N)/(self.max_reps_cost - self.N)
         
         # normalizing in the 0-1 range through min-max normalization
-        return (w_coverage * covering_fitness + w_reps * reps_fitness) - w_reps
+        fitness = (w_coverage * covering_fitness + w_reps * reps_fitness) - w_reps
+        if profiling.enabled:
+            profiling.record("lab2.fitness", start)
+        return fitness
+
+    def incidence(self)->"np.ndarray": 
+        """This function returns the |P| x N incidence matrix of P (built once, on first use).
+
+        Returns:
+            np.ndarray: Matrix whose (i, j) entry is 1 if the number j is in P[i], 0 otherwise.
+        """
+        if getattr(self, "_incidence", None) is None: 
+            import numpy as np
+            self._incidence = np.zeros((len(self.P), self.N), dtype=np.int32)
+            for i, sublist in enumerate(self.P): 
+                self._incidence[i, sublist] = 1
+        return self._incidence
+
+    def objectives(self, candidates:List[List[bool]])->"np.ndarray": 
+        """This function computes the two objectives of many candidates at once, without combining them: the coverage
+        (number of distinct numbers covered, to be maximized) and the cost (total number of numbers, to be minimized).
+
+        Args:
+            candidates (List[List[bool]]): Candidates, in their boolean mask representation.
+
+        Returns:
+            np.ndarray: Array of shape (len(candidates), 2) whose rows are (coverage, cost).
+        """
+        import numpy as np
+        self.fitness_calls += len(candidates)
+        with profiling.phase("lab2.objectives"):
+            # how many times each number is covered by each candidate
+            counts = np.asarray(candidates, dtype=np.int32) @ self.incidence()
+            return np.stack(((counts > 0).sum(axis=1), counts.sum(axis=1)), axis=1)
+
+def non_dominated_sort(objectives:"np.ndarray")->"np.ndarray": 
+    """This function performs the fast non-dominated sort of NSGA-II on the rows of `objectives` (all to be maximized), 
+    using the matrix of pairwise dominations rather than nested loops.
+
+    Args:
+        objectives (np.ndarray): Array of shape (n_candidates, n_objectives).
+
+    Returns:
+        np.ndarray: Rank of each candidate, 0 for the Pareto front, 1 for the front obtained once the first one is removed, and so on.
+    """
+    import numpy as np
+    # dominates[i, j] is True if candidate i dominates candidate j
+    dominates = (objectives[:, None, :] >= objectives[None, :, :]).all(axis=-1) & (objectives[:, None, :] > objectives[None, :, :]).any(axis=-1)
+    dominated_by = dominates.sum(axis=0)
+    ranks = np.full(len(objectives), -1)
+    front, rank = dominated_by == 0, 0
+    while front.any(): 
+        ranks[front] = rank
+        # removing the current front from the count of the candidates dominating each candidate
+        dominated_by = dominated_by - dominates[front].sum(axis=0)
+        front = (dominated_by == 0) & (ranks < 0)
+        rank += 1
+    return ranks
+
+def crowding_distance(objectives:"np.ndarray", ranks:"np.ndarray")->"np.ndarray": 
+    """This function computes the crowding distance of NSGA-II of each candidate within its front, i.e. the sum over the objectives
+    of the normalized distance between its two neighbours. Candidates at the boundaries of a front have infinite distance.
+
+    Args:
+        objectives (np.ndarray): Array of shape (n_candidates, n_objectives).
+        ranks (np.ndarray): Front of each candidate (see `non_dominated_sort`).
+
+    Returns:
+        np.ndarray: Crowding distance of each candidate.
+    """
+    import numpy as np
+    distance = np.zeros(len(objectives))
+    for rank in np.unique(ranks): 
+        members = np.flatnonzero(ranks == rank)
+        for objective in objectives[members].T.astype(float): 
+            order = np.argsort(objective, kind="stable")
+            values = objective[order]
+            span = values[-1] - values[0]
+            gaps = np.full(len(members), np.inf)
+            if len(members) > 2 and span > 0: 
+                gaps[1:-1] = (values[2:] - values[:-2]) / span
+            elif len(members) > 2: 
+                gaps[1:-1] = 0
+            distance[members[order]] += gaps
+    return distance
 
 class Genetics:
     def __init__(
@@ -128,6 +228,8 @@ class Genetics:
         """
         if len(parents) != 2: 
             raise NotImplementedError("Recombination for n != 2 has not been implemented yet")
+        # numpy is only needed to evolve candidates, not to evaluate them
+        import numpy as np
         # mapping parents to array
         parent1, parent2 = list(map(lambda parent: np.array(parent, dtype=object), parents))
         # randomly sampling a scalar to be used to cut-and-cross the two parents
@@ -149,6 +251,7 @@ class Genetics:
         Returns:
             List[int]: New candidate obtained mutating a given individual.
         """
+        import numpy as np
         # for _ in range(self.mutant_loci): 
         # sampling the index at which to perform mutation
         mutant_index = np.random.randint(low = 0, high = len(individual))
@@ -0,0 +1,223 @@
+"""
+Plotting of fitness histories off the evolution loop.
+
+Long histories are decimated preserving the minimum and the maximum of each bucket of generations (so that spikes and plateaus
+survive), plots with many points are rendered as PNG rather than SVG, and rendering happens in a background process, so that
+the evolution of the next problem starts right away. Histories can also be read from the evolution logs written with
+`--save-evolution True`, one line at a time.
+
+Usage:
+    python plotting.py routes/N=500-fittest_individuals.txt [--output images/N=500-fitness] [--max-points 2000]
+"""
+import argparse
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+def decimate(values:Iterable[float], max_points:int=2_000)->Tuple["np.ndarray", "np.ndarray"]:
+    """
+        Min/max-preserving decimation: the history is split in max_points // 2 buckets of consecutive generations, and only the
+        minimum and maximum of each bucket are kept (in order of generation).
+
+    Args:
+        values (Iterable[float]): fitness history.
+        max_points (int, optional): maximal number of points returned. Defaults to 2_000.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: generations and values of the points kept (all of them if there are at most `max_points`).
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=float)
+    generations = np.arange(len(values))
+    n_buckets = max(1, max_points // 2)
+    if len(values) <= max_points:
+        return generations, values
+
+    bounds = np.linspace(0, len(values), n_buckets + 1).astype(int)
+    starts = bounds[:-1]
+    # position of the minimum and maximum within each bucket
+    argmin = np.array([start + np.argmin(values[start:end]) for start, end in zip(starts, bounds[1:])])
+    argmax = np.array([start + np.argmax(values[start:end]) for start, end in zip(starts, bounds[1:])])
+    kept = np.unique(np.concatenate((argmin, argmax)))
+    return generations[kept], values[kept]
+
+class StreamingDecimator:
+    def __init__(self, max_points:int=2_000):
+        """
+            Min/max-preserving decimation of a history of unknown length, received one value at a time with O(max_points) memory.
+            Buckets start with a single generation; whenever there are more than max_points // 2 buckets, adjacent buckets are
+            merged in pairs and the size of the next buckets doubles.
+
+        Args:
+            max_points (int, optional): maximal number of points returned. Defaults to 2_000.
+        """
+        self.max_buckets = max(1, max_points // 2)
+        self.bucket_size = 1
+        # each bucket is [generation of the min, min, generation of the max, max]
+        self.buckets = list()
+        self.count = 0
+
+    def add(self, value:float)->None:
+        if self.buckets and self.count % self.bucket_size:
+            bucket = self.buckets[-1]
+            if value < bucket[1]:
+                bucket[0], bucket[1] = self.count, value
+            if value > bucket[3]:
+                bucket[2], bucket[3] = self.count, value
+        else:
+            self.buckets.append([self.count, value, self.count, value])
+            if len(self.buckets) > self.max_buckets:
+                self._merge()
+        self.count += 1
+
+    def _merge(self)->None:
+        merged = list()
+        for first, second in zip(self.buckets[::2], self.buckets[1::2] + [None]):
+            if second is not None:
+                first = [*min(first[:2], second[:2], key=lambda point: point[1]), *max(first[2:], second[2:], key=lambda point: point[1])]
+            merged.append(list(first))
+        self.buckets, self.bucket_size = merged, 2 * self.bucket_size
+
+    def points(self)->Tuple["np.ndarray", "np.ndarray"]:
+        """
+            Generations and values of the points kept, in order of generation.
+        """
+        import numpy as np
+        points = sorted({(generation, value) for bucket in self.buckets for generation, value in (bucket[:2], bucket[2:])})
+        return np.array([generation for generation, _ in points], dtype=int), np.array([value for _, value in points], dtype=float)
+
+def read_fitness_log(path:str, max_points:int=2_000)->Tuple[Tuple["np.ndarray", "np.ndarray"], int]:
+    """
+        Decimated fitness history of an evolution log (one generation per line, whose last column is the fitness of the fittest
+        individual), read one line at a time.
+
+    Returns:
+        Tuple[Tuple[np.ndarray, np.ndarray], int]: generations and values of the points kept, and number of generations.
+    """
+    decimator = StreamingDecimator(max_points)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                decimator.add(float(line.rsplit(maxsplit=1)[-1]))
+    return decimator.points(), decimator.count
+
+def write_evolution(path:str, individuals:List[List[int]], history:List[float])->None:
+    """
+        Write the evolution log (the fittest individual of each generation followed by its fitness) one line at a time,
+        in the format of `np.savetxt`.
+    """
+    with open(path, "w") as f:
+        for individual, fitness in zip(individuals, history):
+            f.write(" ".join(f"{value:.18e}" for value in [*individual, fitness]) + "\n")
+
+def render_history(
+    generations:"np.ndarray",
+    values:"np.ndarray",
+    n_generations:int,
+    output:str,
+    title:str,
+    raster_threshold:int=3_000,
+    scatter:bool=True)->str:
+    """
+        Render a (possibly decimated) fitness history. Markers are drawn on each generation only when the history was not
+        decimated. Plots with more than `raster_threshold` drawn points are saved as PNG, the other ones as SVG.
+
+    Args:
+        generations (np.ndarray): generations of the points.
+        values (np.ndarray): fitness of the points.
+        n_generations (int): number of generations of the whole history.
+        output (str): path of the image, without extension.
+        title (str): title of the plot.
+        raster_threshold (int, optional): number of drawn points (line vertices and markers) above which PNG is used. Defaults to 3_000.
+        scatter (bool, optional): whether to draw markers when the history was not decimated. Defaults to True.
+
+    Returns:
+        str: path of the image.
+    """
+    # no pyplot: figures are rendered by the Agg canvas, also outside of the main thread
+    from matplotlib.figure import Figure
+    scatter = scatter and len(values) == n_generations
+    drawn = len(values) * (2 if scatter else 1)
+    path = output + (".png" if drawn > raster_threshold else ".svg")
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.plot(generations, values, lw = 2, alpha = .5)
+    if scatter:
+        ax.scatter(generations, values, marker = "x", c = "grey", s = 25)
+    ax.set_title(title, fontweight = "bold")
+    ax.set_xlabel("Generations", fontsize=12)
+    ax.set_ylabel("Fitness of Fittest Individual", fontsize=12)
+    fig.savefig(path, dpi = 150)
+    return path
+
+class PlotWorker:
+    def __init__(self, max_points:int=2_000, raster_threshold:int=3_000):
+        """
+            Background process rendering fitness histories, so that plotting does not block the evolution.
+            Histories are decimated before being sent to the worker, so that only up to `max_points` points are transferred.
+
+        Args:
+            max_points (int, optional): maximal number of points plotted per history. Defaults to 2_000.
+            raster_threshold (int, optional): number of drawn points above which plots are saved as PNG. Defaults to 3_000.
+        """
+        self.max_points, self.raster_threshold = max_points, raster_threshold
+        self.pool = ProcessPoolExecutor(max_workers = 1)
+        self.pending = list()
+
+    def submit(self, history:List[float], output:str, title:str)->Future:
+        """
+            Plot `history` to `output` (without extension) in the background. The future resolves to the path of the image.
+        """
+        generations, values = decimate(history, self.max_points)
+        future = self.pool.submit(render_history, generations, values, len(history), output, title, self.raster_threshold)
+        self.pending.append(future)
+        return future
+
+    def submit_log(self, path:str, output:str, title:str)->Future:
+        """
+            Plot the history of the evolution log `path` to `output` (without extension) in the background,
+            reading the log in the worker one line at a time.
+        """
+        future = self.pool.submit(_render_log, path, output, title, self.max_points, self.raster_threshold)
+        self.pending.append(future)
+        return future
+
+    def close(self)->List[str]:
+        """
+            Wait for all the plots and return the paths of the images.
+        """
+        paths = [future.result() for future in self.pending]
+        self.pool.shutdown()
+        self.pending = list()
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _render_log(path:str, output:str, title:str, max_points:int, raster_threshold:int)->str:
+    (generations, values), n_generations = read_fitness_log(path, max_points)
+    return render_history(generations, values, n_generations, output, title, raster_threshold)
+
+def main(argv:List[str]=None):
+    parser = argparse.ArgumentParser(description = "Plot the fitness history of an evolution log")
+    parser.add_argument("log", type=str, help="Evolution log (routes/N=<size>-fittest_individuals.txt)")
+    parser.add_argument("--output", default=None, type=str, help="Image path without extension (defaults to images/<log name>-fitness)")
+    parser.add_argument("--title", default=None, type=str, help="Title of the plot")
+    parser.add_argument("--max-points", default=2_000, type=int, help="Maximal number of points plotted")
+    parser.add_argument("--raster-threshold", default=3_000, type=int, help="Number of drawn points above which the plot is saved as PNG")
+    args = parser.parse_args(argv)
+
+    name = os.path.splitext(os.path.basename(args.log))[0].replace("-fittest_individuals", "")
+    output = args.output or os.path.join("images", f"{name}-fitness")
+    title = args.title or f"Set Covering - {name} \nFitness in iterations"
+    print(_render_log(args.log, output, title, args.max_points, args.raster_threshold))
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,36 @@
 from lab_utils import *
+import profiling
 from collections import Counter
-import matplotlib.pyplot as plt
+import numpy as np
 import time
 from typing import List, Tuple
-from tqdm import tqdm
 import os
 import glob
 import argparse
 
-def parse_args()->None: 
+def boolean_string(s):
+    if s.lower() not in {'false', 'true'}:
+        raise ValueError('Not a valid boolean string')
+    return s.lower() == 'true'
+
+def parse_args(argv:List[str]=None)->object: 
+    """args function. Parses `argv` (defaults to the command line).
+
+    Returns:
+        object: args parser
+    """
     parser = argparse.ArgumentParser()
-    parser.add_argument("--save-evolution", default=False, type=bool, help="Whether or not to save the whole training process")
+    parser.add_argument("--save-evolution", default=False, type=boolean_string, help="Whether or not to save the whole training process")
     parser.add_argument("--max-generations", default=100, type=int, help="Maximal number of generations")
-    parser.add_argument("--visualize-opt", default=True, type=bool, help="Whether or not to save an image visualizing the evolution process")
-    parser.add_argument("--clear-past", default=True, type=bool, help="Whether or not to empty routes and images content before optimization")
-    return parser.parse_args()
-
-args = parse_args()
+    parser.add_argument("--visualize-opt", default=True, type=boolean_string, help="Whether or not to save an image visualizing the evolution process")
+    parser.add_argument("--clear-past", default=True, type=boolean_string, help="Whether or not to empty routes and images content before optimization")
+    parser.add_argument("--max-plot-points", default=2_000, type=int, help="Maximal number of points of the fitness plots (longer histories are decimated preserving minima and maxima)")
+    parser.add_argument("--raster-threshold", default=3_000, type=int, help="Number of drawn points above which fitness plots are saved as PNG rather than SVG")
+    parser.add_argument("--plot-from-log", default=False, type=boolean_string, help="Whether to plot the fitness from the evolution log (streamed from disk) rather than from memory, requires --save-evolution True")
+    parser.add_argument("--mode", default="weighted", type=str, choices=["weighted", "pareto"], help="Single weighted fitness or Pareto front of (coverage, cost) with NSGA-II")
+    parser.add_argument("--profile", default=None, type=str, help="Profile the run (one in ['phases', 'cprofile', 'sample'])")
+    parser.add_argument("--profile-output", default=None, type=str, help="When profiling with cprofile or sample, where to write the raw profile")
+    return parser.parse_args(argv)
 
 class Solution: 
     def __init__(
@@ -27,10 +41,12 @@ class Solution:
         tournament_size:int=10,
         mutant_loci:int=1,
         cross_probability:float=0.5,
-        seed:int = None):
+        seed:int = None,
+        problem:Problem = None):
 
         self.population_size = population_size; self.offspring_size = offspring_size
-        self.problem = Problem(N = N, seed = seed)
+        # an already available problem (e.g., shared by the runs of a sweep) is not generated again
+        self.problem = Problem(N = N, seed = seed) if problem is None else problem
         self.genetics = Genetics(
             Mu = population_size, 
             Lambda = offspring_size, 
@@ -71,8 +87,12 @@ class Solution:
         recombinations = 0
 
         for _ in range(self.offspring_size): 
+            if profiling.enabled:
+                start = time.perf_counter()
             # obtaining parents in the current population
             parents = self.obtain_parents()
+            if profiling.enabled:
+                start = profiling.record("lab2.selection", start)
             # whether or not to generate an individual mutating a parent or recombinating them.
             if random.random() < self.cross_probability: # do recombination 
                 recombinations += 1
@@ -80,6 +100,8 @@ class Solution:
             else: # do mutation
                 parent = random.sample(parents, k = 1)[0]
                 individual = self.genetics.mutation(parent)
+            if profiling.enabled:
+                profiling.record("lab2.variation", start)
             offspring.append(individual)
         # storing the number of recombinant individuals in offspring
         self.recombinations.append(recombinations)
@@ -89,7 +111,8 @@ class Solution:
         self,
         strategy:str="comma",
         n_loci:int=1, 
-        max_generations:int=1_000) -> Tuple[List, List]:
+        max_generations:int=1_000,
+        progress_bar:bool=True) -> Tuple[List, List]:
         """This function performs a Genetic Algorithm using computational evolution to solve a given problem.
 
         Args:
@@ -97,6 +120,7 @@ class Solution:
             strategy (str, optional): Wheter to perform (mu/rho, lambda) strategy or (mu/rho + lambda). Defaults to "comma".
             n_loc (int, optional): Number of loci to mutate in mutation. Defaults to 1.
             max_generations (int, optional): Maximal Number of generations considered. Defaults to 1_000.
+            progress_bar (bool, optional): Whether to show a progress bar. Defaults to True.
 
         Raises:
             ValueError: Raises an error if strategy is not "comma" or "plus".
@@ -111,28 +135,104 @@ class Solution:
         self.genetics.mutant_loci = n_loci
 
         history, fittest = list(), list()
+        # number of fitness evaluations performed at the end of each generation
+        self.evaluations = list()
 
-        for _ in (pbar := tqdm(range(max_generations))):
+        # progress bars are only needed when evolving, not to import this module
+        from tqdm import tqdm
+        for _ in (pbar := tqdm(range(max_generations), disable = not progress_bar)):
             offspring = self.generate_offspring()
 
-            if strategy.lower() == "comma": 
-                # self.population =  # getting rid of all elements in past population
-                self.population = (
-                    sorted(offspring, key=lambda candidate: self.problem.fitness(candidate), reverse=True)[:self.population_size] # add best elements of offspring
-                )
-            else: # "plus" strategy
-                self.population += offspring # add offspring to population
-                # keep only best elements from new enlarged population
-                self.population = sorted(self.population, key=lambda candidate: self.problem.fitness(candidate), reverse=True)[:self.population_size]
+            with profiling.phase("lab2.replacement"):
+                if strategy.lower() == "comma": 
+                    # self.population =  # getting rid of all elements in past population
+                    self.population = (
+                        sorted(offspring, key=lambda candidate: self.problem.fitness(candidate), reverse=True)[:self.population_size] # add best elements of offspring
+                    )
+                else: # "plus" strategy
+                    self.population += offspring # add offspring to population
+                    # keep only best elements from new enlarged population
+                    self.population = sorted(self.population, key=lambda candidate: self.problem.fitness(candidate), reverse=True)[:self.population_size]
             
             fittest.append(self.population[0]) # storing fittest individual
             history.append(self.problem.fitness(self.population[0])) # storing fitness of fittest (1st) individual in population
+            self.evaluations.append(self.problem.fitness_calls)
             pbar.set_description(f"Fitness value: {history[-1]}")
 
         self.fittest_individuals = fittest
         return self.population[0], history
 
-def main(): 
+    def evolve_pareto(self, max_generations:int=1_000)->Tuple[List, "np.ndarray"]:
+        """This function performs a multi-objective (NSGA-II) evolution, maximizing the coverage while minimizing the cost of the
+        candidates (see `Problem.objectives`) instead of combining them with fixed weights, so that the whole trade-off between the
+        two is found in a single run.
+        Parents are selected by binary tournaments preferring lower non-dominated rank and then larger crowding distance; the offspring 
+        is added to the population (as in the "plus" strategy), and the next population is made of the best fronts, the last one 
+        being truncated by crowding distance.
+
+        Args:
+            max_generations (int, optional): Maximal Number of generations considered. Defaults to 1_000.
+
+        Returns:
+            Tuple[List, np.ndarray]: Candidates of the final Pareto front (one per point) and their (coverage, cost), by increasing cost.
+        """
+        population = [list(candidate) for candidate in self.population]
+        objectives = self.problem.objectives(population)
+        ranks = non_dominated_sort(objectives * [1, -1])
+        crowding = crowding_distance(objectives * [1, -1], ranks)
+        self.front_history = list()
+
+        from tqdm import tqdm
+        for _ in (pbar := tqdm(range(max_generations))):
+            offspring = list()
+            for _ in range(self.offspring_size): 
+                if profiling.enabled:
+                    start = time.perf_counter()
+                parents = list()
+                for _ in range(2): 
+                    # binary tournament with the crowded-comparison operator
+                    i, j = random.sample(range(len(population)), k = 2)
+                    parents.append(population[min((i, j), key = lambda k: (ranks[k], -crowding[k]))])
+                if profiling.enabled:
+                    start = profiling.record("lab2.selection", start)
+                if random.random() < self.cross_probability: 
+                    individual = self.genetics.recombination(parents = parents)
+                else: 
+                    # mutating a copy, since the parent stays in the population
+                    individual = self.genetics.mutation(list(random.choice(parents)))
+                if profiling.enabled:
+                    profiling.record("lab2.variation", start)
+                offspring.append(individual)
+
+            with profiling.phase("lab2.replacement"):
+                population = population + offspring
+                objectives = np.vstack((objectives, self.problem.objectives(offspring)))
+                ranks = non_dominated_sort(objectives * [1, -1])
+                crowding = crowding_distance(objectives * [1, -1], ranks)
+                survivors = np.lexsort((-crowding, ranks))[:self.population_size]
+                population = [population[k] for k in survivors]
+                objectives, ranks = objectives[survivors], ranks[survivors]
+                # crowding distances are computed again within the survivors, whose last front may have been truncated
+                crowding = crowding_distance(objectives * [1, -1], ranks)
+
+            self.front_history.append(objectives[ranks == 0])
+            pbar.set_description(f"Front size: {(ranks == 0).sum()}")
+
+        self.population = population
+        # one candidate per point of the front
+        front, seen = list(), set()
+        for k in np.flatnonzero(ranks == 0)[np.argsort(objectives[ranks == 0][:, 1], kind = "stable")]: 
+            if tuple(objectives[k]) not in seen: 
+                seen.add(tuple(objectives[k])); front.append(k)
+        return [population[k] for k in front], objectives[front]
+
+def main(argv:List[str]=None): 
+    args = parse_args(argv)
+    if args.profile is not None: 
+        return profiling.profile_run(run, args, mode = args.profile, output = args.profile_output)
+    return run(args)
+
+def run(args:object): 
     problem_size = [5, 10, 20, 50, 100, 500]
 
     if args.clear_past:
@@ -141,7 +241,21 @@ def main():
             files = os.listdir(folder)
             for file in files: 
                 os.remove(folder + "/" + file)
-    
+
+    # fitness plots are rendered in a background process, while the next problems are evolved
+    plotter = None
+    if args.visualize_opt and args.mode == "weighted": 
+        from plotting import PlotWorker
+        plotter = PlotWorker(max_points = args.max_plot_points, raster_threshold = args.raster_threshold)
+    try: 
+        evolve_sizes(args, problem_size, plotter)
+    finally: 
+        if plotter is not None: 
+            for path in plotter.close(): 
+                print(f"Fitness plot saved to {path}")
+
+def evolve_sizes(args:object, problem_size:List[int], plotter:object=None): 
+    """Evolve a solution for each problem size, handing the fitness histories to `plotter` (a `plotting.PlotWorker`) if given."""
     for size in problem_size:
         pop_size = 20; off_size = int(1.5 * pop_size); tournament_size = pop_size // 3
         
@@ -161,18 +275,41 @@ def main():
         max_generations = args.max_generations
         save_evolution = args.save_evolution
 
+        if args.mode == "pareto": 
+            initial_time = time.time()
+            front, front_objectives = s.evolve_pareto(max_generations=max_generations)
+            solution_time = time.time() - initial_time
+
+            print(f"For problem size: {size}")
+            print(f"In {max_generations} generations, a Pareto front of {len(front)} solutions has been found (coverage, cost):")
+            print("\t" + ", ".join(f"({coverage}, {cost})" for coverage, cost in front_objectives))
+            print()
+            print(f"Elapsed in: {solution_time} (s)")
+            print("-"*50)
+
+            if save_evolution: 
+                np.savetxt(f"routes/N={size}-pareto_front.txt", np.hstack((np.array(front), front_objectives)), fmt="%d")
+            if args.visualize_opt: 
+                import matplotlib.pyplot as plt
+                fig, ax = plt.subplots()
+                ax.step(front_objectives[:, 1], front_objectives[:, 0], where = "post", lw = 2, alpha = .5)
+                ax.scatter(front_objectives[:, 1], front_objectives[:, 0], marker = "x", c = "grey", s = 25)
+                ax.set_title(f"Set Covering - N = {size} \nPareto front after {max_generations} generations", fontweight = "bold")
+                ax.set_xlabel("Cost", fontsize=12)
+                ax.set_ylabel("Coverage", fontsize=12)
+
+                fig.savefig(f"images/N={size}-pareto.svg")
+                plt.close(fig)
+            continue
+
         initial_time = time.time()
         result, history = s.evolve(max_generations=max_generations, strategy="plus")
         solution_time = time.time() - initial_time
 
         if save_evolution: 
-            fittest_individuals = np.array(s.fittest_individuals)
-            fittest_fit = np.array(history).reshape(-1,1)
-            evolution = np.hstack(
-                (fittest_individuals, fittest_fit)
-            )
-
-            np.savetxt(f"routes/N={size}-fittest_individuals.txt", evolution)
+            # written one generation at a time, rather than stacked in a single array
+            from plotting import write_evolution
+            write_evolution(f"routes/N={size}-fittest_individuals.txt", s.fittest_individuals, history)
         
         print(f"For problem size: {size}")
         print(f"In {len(history)}/{max_generations} generation a {'valid' if s.problem.test_candidate(result) else 'non-valid'} solution has been found!")
@@ -181,15 +318,12 @@ def main():
         print(f"Elapsed in: {solution_time} (s)")
         print("-"*50)
 
-        if args.visualize_opt: 
-            fig, ax = plt.subplots()
-            ax.plot(history, lw = 2, alpha = .5)
-            ax.scatter(np.arange(len(history)), history, marker = "x", c = "grey", s = 25)
-            ax.set_title(f"Set Covering - N = {size} \nFitness in iterations", fontweight = "bold")
-            ax.set_xlabel("Generations", fontsize=12)
-            ax.set_ylabel("Fitness of Fittest Individual", fontsize=12)
-
-            fig.savefig(f"images/N={size}-fitness.svg")
+        if plotter is not None: 
+            title = f"Set Covering - N = {size} \nFitness in iterations"
+            if args.plot_from_log and save_evolution: 
+                plotter.submit_log(f"routes/N={size}-fittest_individuals.txt", f"images/N={size}-fitness", title)
+            else: 
+                plotter.submit(history, f"images/N={size}-fitness", title)
 
 if __name__ == "__main__": 
     main()
\ No newline at end of file
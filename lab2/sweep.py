@@ -0,0 +1,246 @@
+"""
+Hyperparameter sweep of the set-covering GA.
+
+Configurations (N, seed, population size, offspring size, tournament size, cross probability, strategy) run in a process pool.
+Each problem is generated once per (N, seed) by the main process and sent to the workers through shared memory, where workers
+read it (copying it into their own lists) instead of generating it again. One row per run (best fitness, cost, evaluations to reach
+the target fitness, wall time) is appended to the results table as soon as the run is over, so that an interrupted sweep is resumed
+by running the same command again: runs already in the table are skipped, failed ones are run again. Results are finally aggregated
+over seeds.
+
+Usage:
+    python sweep.py --sizes 50 100 --seeds 0 1 2 --population-sizes 20 50 --cross-probabilities 0.5 0.7 --results sweep.csv
+"""
+from lab_utils import Problem
+from solution import Solution
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import List
+
+# columns identifying a run, then its results
+CONFIG_COLUMNS = ["N", "seed", "population_size", "offspring_size", "tournament_size", "cross_probability", "strategy", "max_generations", "target"]
+RESULT_COLUMNS = ["best_fitness", "cost", "valid", "evaluations", "evaluations_to_target", "wall_time"]
+
+def share_problem(N:int, seed:int)->tuple:
+    """
+        Generate the problem (N, seed) and copy its subsets to shared memory, flattened (int32), after their offsets.
+        Return the SharedMemory block, to be closed and unlinked by the caller.
+    """
+    import numpy as np
+    P = Problem(N = N, seed = seed).P
+    offsets = np.cumsum([0] + [len(subset) for subset in P], dtype = np.int64)
+    block = shared_memory.SharedMemory(create = True, size = 8 * len(offsets) + 4 * int(offsets[-1]) + 8)
+    np.ndarray(1, dtype = np.int64, buffer = block.buf)[0] = len(P)
+    np.ndarray(len(offsets), dtype = np.int64, buffer = block.buf, offset = 8)[:] = offsets
+    np.ndarray(int(offsets[-1]), dtype = np.int32, buffer = block.buf, offset = 8 + 8 * len(offsets))[:] = np.fromiter(
+        itertools.chain.from_iterable(P), dtype = np.int32, count = int(offsets[-1])
+    )
+    return block
+
+# problems already read by this worker: (N, seed) -> Problem
+_problems = dict()
+
+def attached_problem(N:int, seed:int, block_name:str)->Problem:
+    """
+        Problem (N, seed) read from the shared memory block `block_name` (once per worker).
+        Shared memory only transports the subsets: each worker copies them into its own lists.
+    """
+    import numpy as np
+    if (N, seed) not in _problems:
+        block = shared_memory.SharedMemory(name = block_name)
+        try:
+            n_subsets = int(np.ndarray(1, dtype = np.int64, buffer = block.buf)[0])
+            offsets = np.ndarray(n_subsets + 1, dtype = np.int64, buffer = block.buf, offset = 8)
+            values = np.ndarray(int(offsets[-1]), dtype = np.int32, buffer = block.buf, offset = 8 + 8 * (n_subsets + 1))
+            P = [values[start:end].tolist() for start, end in zip(offsets[:-1], offsets[1:])]
+            del offsets, values
+        finally:
+            block.close()
+        _problems[(N, seed)] = Problem(N = N, seed = seed, P = P)
+    return _problems[(N, seed)]
+
+def run_configuration(config:dict, block_name:str)->dict:
+    """
+        Evolve the configuration `config` on the shared problem and return its results.
+        The GA is seeded with the seed of the problem, so that runs are reproducible.
+    """
+    import numpy as np
+    problem = attached_problem(config["N"], config["seed"], block_name)
+    # fitness evaluations are counted per run
+    problem.fitness_calls = 0
+    random.seed(config["seed"]); np.random.seed(config["seed"])
+
+    start = time.perf_counter()
+    solution = Solution(
+        N = config["N"],
+        population_size = config["population_size"],
+        offspring_size = config["offspring_size"],
+        tournament_size = config["tournament_size"],
+        cross_probability = config["cross_probability"],
+        problem = problem
+    )
+    best, history = solution.evolve(strategy = config["strategy"], max_generations = config["max_generations"], progress_bar = False)
+    wall_time = time.perf_counter() - start
+
+    reached = next((generation for generation, fitness in enumerate(history) if fitness >= config["target"]), None)
+    return {
+        **config,
+        "best_fitness": history[-1],
+        "cost": sum(len(subset) for subset in problem.return_candidate(best)),
+        "valid": problem.test_candidate(best),
+        "evaluations": problem.fitness_calls,
+        "evaluations_to_target": None if reached is None else solution.evaluations[reached],
+        "wall_time": round(wall_time, 4)
+    }
+
+def configurations(args:object)->List[dict]:
+    """
+        Grid of the configurations of the sweep. Offspring and tournament sizes default to the ones of solution.py
+        (1.5 and 1/3 of the population size); configurations whose tournament is larger than the population are skipped.
+    """
+    grid = list()
+    for N, seed, population_size, cross_probability, strategy in itertools.product(
+        args.sizes, args.seeds, args.population_sizes, args.cross_probabilities, args.strategies
+    ):
+        offspring_sizes = args.offspring_sizes or [int(1.5 * population_size)]
+        tournament_sizes = args.tournament_sizes or [population_size // 3]
+        for offspring_size, tournament_size in itertools.product(offspring_sizes, tournament_sizes):
+            if not 0 < tournament_size <= population_size:
+                continue
+            grid.append({
+                "N": N, "seed": seed, "population_size": population_size, "offspring_size": offspring_size,
+                "tournament_size": tournament_size, "cross_probability": cross_probability, "strategy": strategy,
+                "max_generations": args.max_generations, "target": args.target
+            })
+    return grid
+
+def config_key(row:dict)->tuple:
+    """
+        Identifier of a run, from a configuration or a row of the results table (whose values are strings).
+    """
+    return tuple(str(row[column]) for column in CONFIG_COLUMNS)
+
+def completed_runs(results_path:str)->set:
+    """
+        Identifiers of the runs already in the results table.
+        Raise a ValueError if the table does not have the columns of this sweep (e.g., it was written without the target).
+    """
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0:
+        return set()
+    with open(results_path, newline = "") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != CONFIG_COLUMNS + RESULT_COLUMNS:
+            raise ValueError(f"{results_path} has columns {reader.fieldnames} instead of {CONFIG_COLUMNS + RESULT_COLUMNS}, please use another file")
+        return {config_key(row) for row in reader}
+
+def sweep(args:object)->None:
+    grid = configurations(args)
+    done = completed_runs(args.results)
+    pending = [config for config in grid if config_key(config) not in done]
+    print(f"{len(grid)} configurations, {len(grid) - len(pending)} already in {args.results}, {len(pending)} to run")
+
+    new_file = not os.path.exists(args.results) or os.path.getsize(args.results) == 0
+    blocks = dict()
+    try:
+        # one shared problem per (N, seed) still to run
+        for N, seed in sorted({(config["N"], config["seed"]) for config in pending}):
+            blocks[(N, seed)] = share_problem(N, seed)
+
+        with open(args.results, "a", newline = "") as f, ProcessPoolExecutor(max_workers = args.n_workers) as pool:
+            writer = csv.DictWriter(f, fieldnames = CONFIG_COLUMNS + RESULT_COLUMNS)
+            if new_file:
+                writer.writeheader()
+            futures = {
+                pool.submit(run_configuration, config, blocks[(config["N"], config["seed"])].name): config for config in pending
+            }
+            failed = 0
+            try:
+                for completed, future in enumerate(as_completed(futures), start = 1):
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        # failed runs are not written, so that they are run again when the sweep is resumed
+                        failed += 1
+                        config = futures[future]
+                        print(f"[{completed}/{len(pending)}] failed: " + ", ".join(f"{column}={config[column]}" for column in CONFIG_COLUMNS) + f" ({type(e).__name__}: {e})")
+                        continue
+                    # each run is written as soon as it is over, so that an interrupted sweep can be resumed
+                    writer.writerow(row); f.flush()
+                    print(f"[{completed}/{len(pending)}] " + ", ".join(f"{column}={row[column]}" for column in CONFIG_COLUMNS + RESULT_COLUMNS))
+            except BaseException:
+                # e.g. KeyboardInterrupt: runs not started yet are cancelled rather than waited for
+                pool.shutdown(cancel_futures = True)
+                raise
+            if failed:
+                print(f"{failed} runs failed, run the same command again to retry them")
+    finally:
+        for block in blocks.values():
+            block.close(); block.unlink()
+
+def aggregate(results_path:str)->List[dict]:
+    """
+        Aggregate the runs of the results table over seeds: mean and standard deviation of the best fitness, mean cost,
+        share of runs reaching the target, median evaluations to reach it (among those reaching it) and mean wall time.
+    """
+    groups = defaultdict(list)
+    with open(results_path, newline = "") as f:
+        for row in csv.DictReader(f):
+            groups[tuple(row[column] for column in CONFIG_COLUMNS if column != "seed")].append(row)
+
+    summary = list()
+    for key, rows in groups.items():
+        fitness = [float(row["best_fitness"]) for row in rows]
+        to_target = [int(row["evaluations_to_target"]) for row in rows if row["evaluations_to_target"]]
+        summary.append({
+            **dict(zip([column for column in CONFIG_COLUMNS if column != "seed"], key)),
+            "runs": len(rows),
+            "best_fitness_mean": round(statistics.mean(fitness), 6),
+            "best_fitness_std": round(statistics.stdev(fitness), 6) if len(fitness) > 1 else 0.,
+            "cost_mean": round(statistics.mean(int(row["cost"]) for row in rows), 2),
+            "target_rate": round(len(to_target) / len(rows), 4),
+            "evaluations_to_target_median": statistics.median(to_target) if to_target else None,
+            "wall_time_mean": round(statistics.mean(float(row["wall_time"]) for row in rows), 4)
+        })
+    return sorted(summary, key = lambda row: -row["best_fitness_mean"])
+
+def parse_args(argv:List[str]=None)->object:
+    parser = argparse.ArgumentParser(description = "Parallel and resumable hyperparameter sweep of the set-covering GA")
+    parser.add_argument("--sizes", default=[50, 100], type=int, nargs="+", help="Problem sizes")
+    parser.add_argument("--seeds", default=[42], type=int, nargs="+", help="Seeds of the problems (and of the GA)")
+    parser.add_argument("--population-sizes", default=[20], type=int, nargs="+", help="Population sizes")
+    parser.add_argument("--offspring-sizes", default=None, type=int, nargs="+", help="Offspring sizes (defaults to 1.5 times the population size)")
+    parser.add_argument("--tournament-sizes", default=None, type=int, nargs="+", help="Tournament sizes (defaults to a third of the population size)")
+    parser.add_argument("--cross-probabilities", default=[0.7], type=float, nargs="+", help="Recombination probabilities")
+    parser.add_argument("--strategies", default=["plus"], type=str, nargs="+", choices=["comma", "plus"], help="Survival strategies")
+    parser.add_argument("--max-generations", default=100, type=int, help="Generations per run")
+    parser.add_argument("--target", default=0.99, type=float, help="Fitness whose number of evaluations to reach is reported")
+    parser.add_argument("--n-workers", default=os.cpu_count(), type=int, help="Number of worker processes")
+    parser.add_argument("--results", default="sweep.csv", type=str, help="Results table (CSV), appended to and used to resume the sweep")
+    parser.add_argument("--summary", default=None, type=str, help="Where to write the results aggregated over seeds (defaults to <results>_summary.csv)")
+    return parser.parse_args(argv)
+
+def main(argv:List[str]=None):
+    args = parse_args(argv)
+    sweep(args)
+
+    summary = aggregate(args.results)
+    summary_path = args.summary or os.path.splitext(args.results)[0] + "_summary.csv"
+    if summary:
+        with open(summary_path, "w", newline = "") as f:
+            writer = csv.DictWriter(f, fieldnames = list(summary[0]))
+            writer.writeheader(); writer.writerows(summary)
+    print(f"Aggregated results of {len(summary)} configurations written to {summary_path}")
+    for row in summary[:10]:
+        print(", ".join(f"{column}={value}" for column, value in row.items()))
+
+if __name__ == "__main__":
+    main()
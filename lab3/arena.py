@@ -0,0 +1,56 @@
+from lab_utils.nim_arena import AGENTS, arena
+from lab_utils.nim_rl import NimAI, train
+from lab_utils.nim_store import agent_path, is_compatible, load_agent, save_agent
+import argparse
+import os
+import random
+
+def parse_args()->object:
+    """args function.
+
+    Returns:
+        object: args parser
+    """
+    parser = argparse.ArgumentParser(description="Headless tournament between Nim agents")
+    parser.add_argument("--agents", default=["omni", "rules", "rl", "random"], nargs="+", type=str, help=f"Agents taking part in the arena (any of {AGENTS})")
+    parser.add_argument("--nim-sizes", default=[3, 4, 5], nargs="+", type=int, help="Dimensions of the Nim games played")
+    parser.add_argument("--subtraction-set", default=None, nargs="+", type=int, help="Numbers of objects which can be removed in a move (default: any, i.e. regular Nim)")
+    parser.add_argument("--n-games", default=100, type=int, help="Number of games per pair of agents, Nim dimension and starting player")
+    parser.add_argument("--memory-games", default=1, type=int, help="Number of games per pairing played tracing memory allocations")
+    parser.add_argument("--seed", default=None, type=int, help="Random seed")
+    parser.add_argument("--rl-n-iter", default=10000, type=int, help="Number of games the RL agent plays in the training phase, if not stored")
+    parser.add_argument("--rl-store", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"), type=str, help="Directory where trained RL agents are stored")
+    parser.add_argument("--report", default=None, type=str, help="Where to write the report (JSON if the path ends with .json, CSV otherwise)")
+
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    agent_kwargs = dict()
+    if "rl" in args.agents:
+        # the RL agent depends on the number of heaps: arena() builds one per Nim size, here they are loaded or trained once
+        rl_agents = dict()
+        for nim_size in args.nim_sizes:
+            path = agent_path(args.rl_store, nim_size, rule_set = args.subtraction_set)
+            if is_compatible(path, nim_size, rule_set = args.subtraction_set):
+                rl_agents[nim_size] = load_agent(path)
+            else:
+                rl_agents[nim_size] = train(NimAI(number_of_heaps = nim_size, rule_set = args.subtraction_set), n_iter = args.rl_n_iter, number_of_heaps = nim_size, rng = random.Random(args.seed))
+                save_agent(rl_agents[nim_size], path)
+        agent_kwargs["rl"] = {"ai": rl_agents}
+
+    report = arena(
+        agents = args.agents,
+        nim_sizes = args.nim_sizes,
+        n_games = args.n_games,
+        memory_games = args.memory_games,
+        agent_kwargs = agent_kwargs,
+        rule_set = args.subtraction_set,
+        seed = args.seed,
+        report_path = args.report
+        )
+    print(report.to_string(index = False))
+
+if __name__ == "__main__":
+    main()
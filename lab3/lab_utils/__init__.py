@@ -0,0 +1,7 @@
+import os
+import sys
+
+# profiling.py is shared by the labs and lives at the root of this repo
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(1, _REPO_ROOT)
@@ -1,11 +1,14 @@
 from collections.abc import Iterable
 from typing import Union, Iterable
+from lab_utils.nim_grundy import RuleSet, grundy_sum
+import profiling
 class Nim:
     def __init__(
         self, 
         data:Union[Iterable, int],
         player:str=None, 
         agent:str=None, 
+        rule_set:Union[RuleSet, Iterable]=None,
         **kwargs) -> None:
         """
         Initialise Nim instance.
@@ -16,6 +19,9 @@ class Nim:
             player (str, optional): to keep track of the current player during a game. If specified, should be either 'human' or 'computer'. Defaults to None.
             agent (str, optional): if specified, the agent that finds the best move at each step. 
                                     Only accepts 4 values: omni, minimax, rl, rules, or None. (not case-sensitive). 
+            rule_set (RuleSet or list, optional): rules of the game, i.e. how many objects can be removed from a heap in a move.
+                                                  A list is read as the subtraction set, e.g. [1, 2, 3] to remove at most 3 objects per move.
+                                                  Defaults to None, i.e. any number of objects can be removed (regular Nim).
 
         Kwargs, defined when `agent` = rules:
             k (int): number of heaps that you want to eliminate during the opening. Default: number of heaps - 1.
@@ -50,6 +56,7 @@ class Nim:
         
         self.player = player
         self.agent = agent
+        self.rule_set = RuleSet.parse(rule_set)
 
         # default parameters are obtained using an extensive grid search
         self._k = kwargs.get("k", 1)
@@ -76,12 +83,16 @@ class Nim:
             # updating heap correspondent to index row
             if self._rows[row] < num_objects: 
                 raise ValueError("Cannot remove from a row more elements that the ones in the row itself!")
+            if not self.rule_set.allows(num_objects):
+                raise ValueError(f"Cannot remove {num_objects} elements in a move with {self.rule_set}!")
             self._rows[row] -= num_objects
         else:
             # here the modification is done updating rows with input target 
             pairwise_diff = sorted([nim_before - nim_after for nim_before, nim_after in zip(self._rows, target)], reverse=True)
             if pairwise_diff[0] > 0 and pairwise_diff[1] != 0: 
                 raise ValueError("Cannot remove elements from different rows!")
+            if pairwise_diff[0] > 0 and not self.rule_set.allows(pairwise_diff[0]):
+                raise ValueError(f"Cannot remove {pairwise_diff[0]} elements in a move with {self.rule_set}!")
             self._rows = target
 
         if switch_player:
@@ -94,12 +105,15 @@ class Nim:
             Only unique states are returned, i.e., if two lists contain the same numbers but in different positions,
             only one is returned.
         """
+        if profiling.enabled:
+            profiling.count("lab3.successor_generations")
         horizon = [
             self._rows[:idx]+[n]+self._rows[idx+1:] if n_objects > 0 else 0 # putting element at index 'idx' equal to n
                 for idx, n_objects in enumerate(self._rows) # looping over the rows
                     for n in range(n_objects) # looping over all possible 'n' in n_objects range.
+                        if self.rule_set.allows(n_objects - n) # only moves allowed by the rules
                 ]
-        horizon_no_dupl = list(map(Nim, list({tuple(sorted(i)): i for i in horizon}.values())))
+        horizon_no_dupl = [Nim(state, rule_set = self.rule_set) for state in {tuple(sorted(i)): i for i in horizon}.values()]
         return (horizon_no_dupl)
 
     def is_endgame(self):
@@ -124,6 +138,13 @@ class Nim:
             nim_sum = nim_sum ^ self._rows[i]
         return nim_sum
 
+    def grundy_sum(self):
+        """
+            Given a Nim game, return the XOR sum of the Grundy numbers of its heaps according to its rules.
+            For the regular Nim, this is the nim-sum.
+        """
+        return grundy_sum(self._rows, self.rule_set)
+
     def biggest_heap(self):
         """
             Given a game, return the heap with the maximum number of objects.
@@ -0,0 +1,219 @@
+from lab_utils.nim import Nim
+from lab_utils.nim_grundy import RuleSet
+from lab_utils.nim_omni import best_move_nim_sum
+from lab_utils.nim_rules import best_move_rules
+from lab_utils.nim_minmax import minmax, best_move_minmax
+from lab_utils.nim_rl import NimAI, train
+import itertools
+import json
+import random
+import time
+import tracemalloc
+import numpy as np
+from math import sqrt
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AGENTS = ["omni", "rules", "rl", "minmax", "random"]
+
+class ArenaAgent:
+    def __init__(self, name:str, number_of_heaps:int, seed:int=None, rule_set:RuleSet=None, **kwargs):
+        """
+            Headless agent taking part in the arena. Given a configuration, `move` returns the configuration after its move.
+
+        Args:
+            name (str): one in ['omni', 'rules', 'rl', 'minmax', 'random'].
+            number_of_heaps (int): number of heaps in the games the agent plays.
+            seed (int, optional): random seed of the agent, used by its moves (random and rule-based agents) and training (RL agent). Defaults to None.
+            rule_set (RuleSet or list, optional): rules of the games the agent plays (see `Nim`). Defaults to None (regular Nim).
+
+        Kwargs:
+            when `name` = rules, parameters of the rule-based agent (k, alpha, endgame_nim, strategy).
+            when `name` = rl, either `ai` (a trained NimAI, or a dict number of heaps -> trained NimAI) 
+                              or `n_iter` (number of training games, defaults to 10000).
+        """
+        if name.lower() not in AGENTS:
+            raise ValueError(f"Unknown agent {name}! Please use one in {AGENTS}")
+
+        self.name = name.lower()
+        self.rng = random.Random(seed)
+        self.kwargs = kwargs
+        self.rule_set = RuleSet.parse(rule_set)
+
+        if self.name == "rl":
+            self.ai = kwargs.get("ai")
+            if isinstance(self.ai, dict):
+                self.ai = self.ai.get(number_of_heaps)
+            if self.ai is None:
+                self.ai = train(NimAI(number_of_heaps = number_of_heaps, rule_set = self.rule_set), n_iter = kwargs.get("n_iter", 10000), number_of_heaps = number_of_heaps, rng = self.rng)
+        # number of nodes searched during the last move (None for agents which do not search)
+        self.nodes = None
+
+    def move(self, rows:list)->list:
+        """
+            Given a (non-terminal) configuration, return the configuration after the agent's move.
+        """
+        if self.name == "omni":
+            return best_move_nim_sum(Nim(rows, rule_set = self.rule_set))
+        elif self.name == "rules":
+            return best_move_rules(Nim(rows, agent = "rules", rule_set = self.rule_set, **self.kwargs), rng = self.rng)
+        elif self.name == "rl":
+            return self.ai.best_move_rl(Nim(rows, rule_set = self.rule_set))._rows
+        elif self.name == "minmax":
+            game = Nim(rows, rule_set = self.rule_set)
+            misses = minmax.cache_info().misses
+            best_move_minmax(game, inplace = True)
+            self.nodes = minmax.cache_info().misses - misses
+            # states are cached by identity, i.e. they are never reused across moves
+            minmax.cache_clear()
+            return game._rows
+        else:
+            row = self.rng.choice([r for r, c in enumerate(rows) if c > 0])
+            target = rows.copy()
+            target[row] -= self.rng.choice(self.rule_set.removals(rows[row]))
+            return target
+
+def wilson_interval(wins:int, games:int, z:float=1.96)->tuple:
+    """
+        Wilson score interval for a winning ratio (95% confidence by default).
+    """
+    if games == 0:
+        return (0., 1.)
+    ratio = wins / games
+    center = (ratio + z**2 / (2 * games)) / (1 + z**2 / games)
+    half_width = z * sqrt(ratio * (1 - ratio) / games + z**2 / (4 * games**2)) / (1 + z**2 / games)
+    return (max(0., center - half_width), min(1., center + half_width))
+
+def play_match(agents:tuple, rows:list, measure_memory:bool=False, rule_set:RuleSet=None)->dict:
+    """
+        Play a single game between two agents, the first one moving first.
+
+    Args:
+        agents (tuple): the two ArenaAgent instances.
+        rows (list): starting configuration.
+        measure_memory (bool, optional): whether to trace the peak memory allocated by each decision. Defaults to False.
+        rule_set (RuleSet or list, optional): rules of the game, moves are checked against them. Defaults to None (regular Nim).
+
+    Returns:
+        dict: index of the winner, and per-agent decision latencies (s), nodes searched and memory peaks (bytes).
+    """
+    rows = rows.copy()
+    latencies, nodes, memory = ([], []), ([], []), ([], [])
+    turn = 0
+
+    while sum(rows) > 0:
+        agent = agents[turn]
+        if measure_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        new_rows = agent.move(rows)
+        latencies[turn].append(time.perf_counter() - start)
+
+        if measure_memory:
+            memory[turn].append(tracemalloc.get_traced_memory()[1] - baseline)
+        if agent.nodes is not None:
+            nodes[turn].append(agent.nodes)
+
+        # sanity check on the move
+        Nim(rows, rule_set = rule_set).nimming(target = new_rows)
+        rows = list(new_rows)
+        turn = 1 - turn
+
+    # whoever empties the board wins
+    return {"winner": 1 - turn, "latencies": latencies, "nodes": nodes, "memory": memory}
+
+def arena(
+    agents:list=("omni", "rules", "rl", "random"),
+    nim_sizes:list=(3, 4, 5),
+    n_games:int=100,
+    memory_games:int=1,
+    agent_kwargs:dict=None,
+    rule_set:RuleSet=None,
+    seed:int=None,
+    report_path:str=None)->"pd.DataFrame":
+    """
+        Every ordered pair of different agents plays `n_games` games on each Nim size, so that both agents of a pair start in turn.
+
+    Args:
+        agents (list, optional): names of the agents. Defaults to ("omni", "rules", "rl", "random").
+        nim_sizes (list, optional): number of heaps of the (regular) Nim games played. Defaults to (3, 4, 5).
+        n_games (int, optional): number of games per pair of agents, Nim size and starting player. Defaults to 100.
+        memory_games (int, optional): number of games, for each pairing, played tracing memory allocations.
+                                      These games are not considered for latencies, since tracing slows the agents down. Defaults to 1.
+        agent_kwargs (dict, optional): agent name -> kwargs of its ArenaAgent. Defaults to None.
+        rule_set (RuleSet or list, optional): rules of the games played (see `Nim`). Defaults to None (regular Nim).
+        seed (int, optional): random seed, from which the seed of each agent is drawn, so that the games are reproducible. Defaults to None.
+        report_path (str, optional): if given, the report is written there, as JSON if the path ends with .json, as CSV otherwise.
+
+    Returns:
+        pd.DataFrame: one row per (first agent, second agent, Nim size), with the winning ratio of the first agent (the one moving first)
+                      and its 95% confidence interval, and, for each agent, the p50/p99 decision latency (ms), the mean number of
+                      nodes searched per move and the peak memory allocated by a decision (KiB).
+    """
+    agent_kwargs = agent_kwargs if agent_kwargs is not None else dict()
+    rule_set = RuleSet.parse(rule_set)
+    # pandas and tqdm are only imported when needed, so that importing this module is cheap
+    import pandas as pd
+    from tqdm import tqdm
+    rng = random.Random(seed)
+    report = []
+
+    for nim_size in nim_sizes:
+        # agents are built once per Nim size (e.g., the RL agent is trained on games with `nim_size` heaps)
+        players = {
+            name: ArenaAgent(name, nim_size, seed = rng.randrange(2**32), rule_set = rule_set, **agent_kwargs.get(name, dict())) for name in agents
+            }
+
+        for first, second in tqdm(list(itertools.permutations(agents, 2)), desc = f"Nim({nim_size})"):
+            latencies, nodes, memory = ([], []), ([], []), ([], [])
+            wins = 0
+            for game in range(n_games):
+                measure_memory = game < memory_games
+                if measure_memory:
+                    tracemalloc.start()
+                try:
+                    result = play_match((players[first], players[second]), Nim(nim_size)._rows, measure_memory = measure_memory, rule_set = rule_set)
+                finally:
+                    if measure_memory:
+                        tracemalloc.stop()
+
+                wins += result["winner"] == 0
+                for player in (0, 1):
+                    if not measure_memory:
+                        latencies[player].extend(result["latencies"][player])
+                    nodes[player].extend(result["nodes"][player])
+                    memory[player].extend(result["memory"][player])
+
+            ci_low, ci_high = wilson_interval(wins, n_games)
+            record = {
+                "first": first,
+                "second": second,
+                "nim_size": nim_size,
+                "rule_set": repr(rule_set),
+                "games": n_games,
+                "first_win_rate": wins / n_games,
+                "ci_low": ci_low,
+                "ci_high": ci_high
+            }
+            for player, name in ((0, "first"), (1, "second")):
+                record.update({
+                    f"{name}_p50_ms": 1e3 * np.percentile(latencies[player], 50) if latencies[player] else np.nan,
+                    f"{name}_p99_ms": 1e3 * np.percentile(latencies[player], 99) if latencies[player] else np.nan,
+                    f"{name}_nodes_per_move": np.mean(nodes[player]) if nodes[player] else np.nan,
+                    f"{name}_peak_kib": max(memory[player]) / 1024 if memory[player] else np.nan
+                })
+            report.append(record)
+
+    report = pd.DataFrame(report)
+    if report_path is not None:
+        if report_path.endswith(".json"):
+            with open(report_path, "w") as f:
+                json.dump(json.loads(report.to_json(orient = "records")), f, indent = 2)
+        else:
+            report.to_csv(report_path, index = False)
+
+    return report
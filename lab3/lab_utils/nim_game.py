@@ -1,12 +1,13 @@
 from lab_utils.nim_omni import *
 from lab_utils.nim_rules import *
 
-def play(nim_game:object, inplace_move:bool=True)->None:
+def play(nim_game:object, inplace_move:bool=True, rl_agent:object=None)->None:
         """This funtion plays the actual game. Human vs computer. Human starts first.
 
         Args:
             nim_game (object, Nim): instance of a pre-generated Nim game
             inplace_move (bool): Whether to perform the move on Nim game or not. Defaults to True.
+            rl_agent (object, NimAI): trained Q-learning agent, needed when the agent of `nim_game` is 'rl'. Defaults to None.
         """
 
         # Keep a copy of the original game if the player wants to play again at the end of a match
@@ -45,6 +46,13 @@ def play(nim_game:object, inplace_move:bool=True)->None:
                         best_move_rules(nim_game, inplace=inplace_move)
                     else: 
                         print("Best move: ", best_move_rules(nim_game, inplace=inplace_move))
+                # Q-learning agent
+                elif nim_game.agent == 'rl':
+                    best_move = rl_agent.best_move_rl(nim_game)._rows
+                    if inplace_move: 
+                        nim_game.nimming(target = best_move)
+                    else: 
+                        print("Best move: ", best_move)
 
                 if sum(nim_game._rows) > 0:
                     print("Ha-ha! I've got you! Go on you fool ;)")
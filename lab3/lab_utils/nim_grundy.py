@@ -0,0 +1,217 @@
+from functools import cache
+from typing import Union, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+class RuleSet:
+    def __init__(self, subtraction_set:Iterable=None, max_remove:int=None):
+        """
+            Rules of a (generalized) Nim game, i.e. how many objects can be removed from a heap in a single move.
+            With no arguments, any positive number of objects can be removed, as in the regular Nim.
+
+        Args:
+            subtraction_set (Iterable, optional): numbers of objects which can be removed from a heap in a move. Defaults to None.
+            max_remove (int, optional): shortcut for the subtraction set {1, ..., `max_remove`}, i.e. at most `max_remove` objects per move.
+                                        Defaults to None.
+
+        Raises:
+            ValueError: the subtraction set must contain 1, so that a game is over if and only if the board is empty (as for the regular Nim).
+        """
+        if subtraction_set is not None and max_remove is not None:
+            raise ValueError("Please specify either the subtraction set or the maximal number of objects to remove, not both")
+        if max_remove is not None:
+            subtraction_set = range(1, max_remove + 1)
+
+        self.subtraction_set = None if subtraction_set is None else tuple(sorted(set(subtraction_set)))
+        if self.subtraction_set is not None and (1 not in self.subtraction_set or self.subtraction_set[0] < 1):
+            raise ValueError(f"Invalid subtraction set {list(self.subtraction_set)}: it must contain 1 and positive numbers only")
+
+    @classmethod
+    def parse(cls, rule_set:Union["RuleSet", Iterable, None])->"RuleSet":
+        """
+            Return `rule_set` if it is a RuleSet, otherwise the RuleSet whose subtraction set is `rule_set` (None for the regular Nim).
+        """
+        return rule_set if isinstance(rule_set, RuleSet) else cls(rule_set)
+
+    @property
+    def is_plain(self)->bool:
+        """
+            True for the rules of the regular Nim.
+        """
+        return self.subtraction_set is None
+
+    def allows(self, n_objects:int)->bool:
+        """
+            Whether `n_objects` objects can be removed from a heap (holding at least `n_objects` objects) in a single move.
+        """
+        return n_objects > 0 if self.is_plain else n_objects in self.subtraction_set
+
+    def removals(self, heap:int)->list:
+        """
+            Numbers of objects which can be removed from a heap holding `heap` objects, in increasing order.
+        """
+        if self.is_plain:
+            return list(range(1, heap + 1))
+        return [n_objects for n_objects in self.subtraction_set if n_objects <= heap]
+
+    def mask(self, max_objects:int)->"np.ndarray":
+        """
+            Boolean array of length `max_objects` + 1, True at index n if removing n objects is allowed.
+        """
+        # numpy is imported lazily, since Nim games (which hold a RuleSet) do not need it
+        import numpy as np
+        mask = np.zeros(max_objects + 1, dtype=bool)
+        mask[self.removals(max_objects)] = True
+        return mask
+
+    def largest_removals(self, max_objects:int)->"np.ndarray":
+        """
+            Integer array of length `max_objects` + 1, holding at index n the largest number of objects not exceeding n which can be
+            removed in a move (0 at index 0). Vectorized counterpart of `restrict`.
+        """
+        import numpy as np
+        allowed = np.where(self.mask(max_objects), np.arange(max_objects + 1), 0)
+        return np.maximum.accumulate(allowed)
+
+    def restrict(self, rows:list, target:list)->list:
+        """
+            Map a move of the regular Nim (from `rows` to `target`) to a legal move on the same heap, removing the largest allowed
+            number of objects not exceeding the desired one. Used by agents designed for the regular Nim only.
+        """
+        row = next((idx for idx, (before, after) in enumerate(zip(rows, target)) if before != after), None)
+        if self.is_plain or row is None:
+            return target
+        restricted = rows.copy()
+        restricted[row] -= max(n for n in self.removals(rows[row]) if n <= rows[row] - target[row])
+        return restricted
+
+    def __eq__(self, other:object)->bool:
+        return isinstance(other, RuleSet) and self.subtraction_set == other.subtraction_set
+
+    def __hash__(self)->int:
+        return hash(self.subtraction_set)
+
+    def __repr__(self)->str:
+        return "RuleSet()" if self.is_plain else f"RuleSet({list(self.subtraction_set)})"
+
+class GrundySequence:
+    def __init__(self, subtraction_set:Iterable=None):
+        """
+            Grundy numbers of a single heap, g(n) = mex{g(n - s) : s in subtraction set, s <= n}, computed lazily.
+            For a finite subtraction set with largest element s_max, g(n) only depends on the s_max previous values:
+            as soon as a window of s_max consecutive values repeats, the sequence is periodic from there on,
+            so that the Grundy number of an arbitrarily large heap is found in O(1).
+            The subtraction set may be any set of positive integers here (e.g., {2, 3}); None stands for the regular Nim, where g(n) = n.
+
+        Args:
+            subtraction_set (Iterable, optional): numbers of objects which can be removed from a heap. Defaults to None.
+        """
+        self.subtraction_set = None if subtraction_set is None else tuple(sorted(set(subtraction_set)))
+        self.values = [0]
+        # g(n) = values[preperiod + (n - preperiod) % period] for n >= preperiod, once the period has been detected
+        self.preperiod = 0 if self.subtraction_set is None else None
+        self.period = None
+        # window of the s_max previous values -> first position it was observed at
+        self._windows = dict()
+
+    def _extend(self, heap:int)->None:
+        """
+            Compute the Grundy numbers up to `heap`, stopping as soon as the period is detected.
+        """
+        s_max = self.subtraction_set[-1]
+        values = self.values
+        while len(values) <= heap and self.period is None:
+            n = len(values)
+            reachable = {values[n - s] for s in self.subtraction_set if s <= n}
+            mex = 0
+            while mex in reachable:
+                mex += 1
+            values.append(mex)
+
+            if n + 1 >= s_max:
+                # values[n + 1 - s_max: n + 1] determine all the following values
+                window = tuple(values[n + 1 - s_max:])
+                if window in self._windows:
+                    start = self._windows[window]
+                    self.preperiod, self.period = start - s_max, n + 1 - start
+                else:
+                    self._windows[window] = n + 1
+
+    def __call__(self, heap:int)->int:
+        """
+            Grundy number of a heap holding `heap` objects.
+        """
+        if self.subtraction_set is None:
+            return heap
+        if self.period is None and heap >= len(self.values):
+            self._extend(heap)
+        if heap < len(self.values):
+            return self.values[heap]
+        return self.values[self.preperiod + (heap - self.preperiod) % self.period]
+
+    def batch(self, heaps:"np.ndarray")->"np.ndarray":
+        """
+            Vectorized version of `__call__`.
+        """
+        import numpy as np
+        heaps = np.asarray(heaps)
+        if self.subtraction_set is None:
+            return heaps.copy()
+        if heaps.size:
+            self(int(heaps.max()))
+        values = np.array(self.values)
+        if self.period is None:
+            return values[heaps]
+        return np.where(heaps < len(values), values[np.minimum(heaps, len(values) - 1)], values[self.preperiod + (heaps - self.preperiod) % self.period])
+
+@cache
+def grundy_sequence(rule_set:RuleSet)->GrundySequence:
+    """
+        Grundy sequence of the heaps of a game played with `rule_set`, shared by all the games with the same rules.
+    """
+    return GrundySequence(rule_set.subtraction_set)
+
+def grundy_sum(rows:list, rule_set:RuleSet)->int:
+    """
+        Grundy number of a configuration, i.e. XOR of the Grundy numbers of its heaps (Sprague-Grundy theorem).
+        The player who has to move wins (under optimal play) if and only if it is different from 0.
+    """
+    sequence = grundy_sequence(rule_set)
+    value = 0
+    for heap in rows:
+        value ^= sequence(heap)
+    return value
+
+def best_move_grundy(nim_game:object, inplace:bool=False)->Union[None, list]:
+    """
+        Given a Nim game played with any rule set, return the best move based on Grundy numbers.
+        This generalizes `best_move_nim_sum`: from a configuration with non-zero Grundy sum, a move bringing it to 0 always exists
+        and the one removing the most objects is played; otherwise, one object is removed from the most populated heap.
+
+    Args:
+        nim_game (object, Nim): Nim instance where to evaluate the best move.
+        inplace (bool): whether the function should return the best move as a list or if it should operate it right away.
+
+    Returns:
+        Union[None, list]: Either None (best move is performed on nim_game) or the list representing the best move.
+    """
+    sequence = grundy_sequence(nim_game.rule_set)
+    total = grundy_sum(nim_game._rows, nim_game.rule_set)
+
+    row, objects_to_nim = nim_game.biggest_heap(), 1
+    if total != 0:
+        best = 0
+        for idx, heap in enumerate(nim_game._rows):
+            # the Grundy number of this heap has to become `target` for the Grundy sum to be 0
+            target = sequence(heap) ^ total
+            for n_objects in nim_game.rule_set.removals(heap):
+                if n_objects > best and sequence(heap - n_objects) == target:
+                    row, objects_to_nim, best = idx, n_objects, n_objects
+
+    if inplace:
+        nim_game.nimming(row, objects_to_nim, switch_player = True)
+    else:
+        rows_copy = nim_game._rows.copy()
+        rows_copy[row] -= objects_to_nim
+        return (rows_copy)
@@ -1,4 +1,5 @@
 from lab_utils.nim import Nim
+import profiling
 from functools import cache
 
 @cache
@@ -14,6 +15,8 @@ def minmax(nim_game, maximising = True):
     Returns:
         integer: minmax value
     """
+    if profiling.enabled:
+        profiling.count("lab3.minmax_nodes")
     # Check if the game is finished
     if sum(nim_game._rows) == 0:
         return -1 if maximising else 1
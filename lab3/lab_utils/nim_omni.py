@@ -1,8 +1,13 @@
-from typing import Union
+from typing import Union, TYPE_CHECKING
+from lab_utils.nim_grundy import best_move_grundy
+
+if TYPE_CHECKING:
+    import numpy as np
 def best_move_nim_sum(nim_game:object, inplace:bool=False)->Union[None, list]:
     """
         Given a Nim game, return the best move based on nim-sum.
         To an explanation of nim-sum, please refer to: https://en.wikipedia.org/wiki/Nim#Mathematical_theory
+        Games with a different rule set are solved with Grundy numbers instead (see `best_move_grundy`).
     
     Args:
         nim_game (object, Nim): Nim instance where to evaluate the best move.
@@ -11,6 +16,10 @@ def best_move_nim_sum(nim_game:object, inplace:bool=False)->Union[None, list]:
     Returns:
         Union[None, list]: Either None (best move is performed on nim_game) or the list representing the best move.
     """
+    if not nim_game.rule_set.is_plain:
+        # the nim-sum only solves the regular Nim: other rule sets are solved with Grundy numbers
+        return best_move_grundy(nim_game, inplace = inplace)
+
     if not nim_game.is_endgame():
         # computing nim_sum as per documentation
         nim_sum = nim_game.nim_sum()
@@ -74,3 +83,43 @@ def endgame_nim_sum(nim_game):
         return([biggest_heap_pos, max(nim_game._rows)])
     else:
         return([biggest_heap_pos, max(nim_game._rows) - 1])
+
+
+def best_move_nim_sum_batch(rows:"np.ndarray")->"np.ndarray":
+    """
+        Vectorized version of `best_move_nim_sum`: given a 2D array of Nim configurations (one per row), 
+        return the configurations obtained playing the best move based on nim-sum in each of them (ties are broken as in `best_move_nim_sum`).
+    
+    Args:
+        rows (np.ndarray): 2D array of shape (positions, heaps).
+    
+    Returns:
+        np.ndarray: configurations after the best move.
+    """
+    # numpy is only imported by the vectorized agent, so that the scalar one starts as fast as bare Python
+    import numpy as np
+    rows = np.array(rows, dtype=np.int64)
+    positions = np.arange(len(rows))
+
+    biggest_heap = rows.argmax(axis=1)
+    biggest = rows[positions, biggest_heap]
+    endgame = (rows > 1).sum(axis=1) <= 1
+
+    # computing nim_sum as per documentation
+    nim_sum = np.bitwise_xor.reduce(rows, axis=1)
+    # bring the game to nim-sum 0 removing the maximum number of elements
+    nim_differences = rows - (rows ^ nim_sum[:, None])
+    biggest_difference = nim_differences.argmax(axis=1)
+
+    # when nim-sum is 0, remove one object from the most populated row (minimising other's time-to-win).
+    row = np.where(nim_sum == 0, biggest_heap, biggest_difference)
+    objects_to_nim = np.where(nim_sum == 0, 1, nim_differences[positions, biggest_difference])
+
+    # endgame: leave an odd number of heaps with one object
+    objects_left = rows.sum(axis=1) - biggest
+    endgame_objects = np.where((objects_left % 2 == 0) | (biggest == 1), biggest, biggest - 1)
+    row = np.where(endgame, biggest_heap, row)
+    objects_to_nim = np.where(endgame, endgame_objects, objects_to_nim)
+
+    rows[positions, row] -= objects_to_nim
+    return rows
@@ -0,0 +1,384 @@
+from lab_utils.nim_grundy import RuleSet
+import numpy as np
+import itertools
+from math import comb
+from typing import Union, Iterable
+
+class OrderedIndexer:
+    def __init__(self, number_of_heaps:int, max_objects:int, rule_set:RuleSet=None):
+        """
+            Ranks ordered Nim configurations (i.e., [1, 3, 5] and [5, 3, 1] are different states) into integer indices.
+            Each configuration is read as a number in base `max_objects` + 1 (mixed-radix encoding).
+            Actions are encoded as (row, objects left in row) pairs, i.e. `row * max_objects + objects_left`.
+
+        Args:
+            number_of_heaps (int): number of heaps in every configuration.
+            max_objects (int): maximal number of objects in each heap.
+            rule_set (RuleSet, optional): rules of the game, only the actions they allow are legal. Defaults to None (regular Nim).
+        """
+        self.number_of_heaps = number_of_heaps
+        self.max_objects = max_objects
+        self.base = max_objects + 1
+        self.rule_set = RuleSet.parse(rule_set)
+        # whether removing n objects is allowed, for n in [0, max_objects]
+        self._allowed = self.rule_set.mask(max_objects)
+
+        self.n_states = self.base ** number_of_heaps
+        self.n_actions = number_of_heaps * max_objects
+
+        # objects left in a row after each action, used to build the mask of legal actions
+        self._targets = np.arange(max_objects)
+
+    def check(self, rows:Iterable)->None:
+        """
+            Raise an error if `rows` cannot be represented by this indexer.
+        """
+        if len(rows) != self.number_of_heaps or max(rows) > self.max_objects or min(rows) < 0:
+            raise ValueError(
+                f"Configuration {list(rows)} is out of bounds: expected {self.number_of_heaps} heaps with at most {self.max_objects} objects each")
+
+    def rank(self, rows:Iterable)->int:
+        """
+            Given a configuration, return its integer index.
+        """
+        index = 0
+        for n_objects in rows:
+            index = index * self.base + n_objects
+        return index
+
+    def valid_actions(self, rows:Iterable)->np.ndarray:
+        """
+            Given a configuration, return the boolean mask of the legal actions.
+            Action (row, objects_left) is legal if and only if objects_left < rows[row] and the rules allow removing rows[row] - objects_left objects.
+        """
+        removed = np.asarray(rows)[:, None] - self._targets[None, :]
+        return ((removed > 0) & self._allowed[np.maximum(removed, 0)]).ravel()
+
+    def valid_actions_batch(self, rows:np.ndarray)->np.ndarray:
+        """
+            Same as `valid_actions`, for a 2D array of configurations (one per row).
+        """
+        removed = rows[:, :, None] - self._targets[None, None, :]
+        return ((removed > 0) & self._allowed[np.maximum(removed, 0)]).reshape(len(rows), -1)
+
+    def states(self)->np.ndarray:
+        """
+            Return all the configurations, sorted by rank, as a 2D array of shape (n_states, number_of_heaps).
+        """
+        return np.stack(np.unravel_index(np.arange(self.n_states), (self.base,) * self.number_of_heaps), axis=1)
+
+    def successors(self, states:np.ndarray)->np.ndarray:
+        """
+            Given a 2D array of configurations, return the 2D array of shape (len(states), n_actions) with the rank of the configuration
+            reached playing each action. Illegal actions are marked with -1.
+        """
+        weights = self.base ** np.arange(self.number_of_heaps)[::-1]
+        ranks = states @ weights
+        # removing (rows[row] - objects_left) objects from `row` decreases the rank by (rows[row] - objects_left) * weights[row]
+        removed = states[:, :, None] - self._targets[None, None, :]
+        successors = ranks[:, None, None] - removed * weights[None, :, None]
+        return np.where((removed > 0) & self._allowed[np.maximum(removed, 0)], successors, -1).reshape(len(states), -1)
+
+    def encode_action(self, old_rows:Iterable, new_rows:Iterable)->int:
+        """
+            Given a configuration and the configuration obtained after nimming it, return the index of the action played.
+        """
+        row = next(idx for idx, (before, after) in enumerate(zip(old_rows, new_rows)) if before != after)
+        return row * self.max_objects + new_rows[row]
+
+    def decode_action(self, rows:Iterable, action:int)->tuple:
+        """
+            Given a configuration and an action index, return the action as (row, number of objects to nim).
+        """
+        row, objects_left = divmod(action, self.max_objects)
+        return row, rows[row] - objects_left
+
+class CanonicalIndexer:
+    def __init__(self, number_of_heaps:int, max_objects:int, rule_set:RuleSet=None):
+        """
+            Ranks Nim configurations up to a permutation of the heaps (i.e., [1, 3, 5] and [5, 3, 1] are the same state).
+            Each configuration is sorted and ranked as a multiset with the combinatorial number system, 
+            so that the C(`max_objects` + `number_of_heaps`, `number_of_heaps`) canonical states are indexed without gaps.
+            Actions are encoded as (heap size, objects left in heap) pairs, i.e. `heap_size * (heap_size - 1) / 2 + objects_left`,
+            and are mapped back to a concrete row holding `heap_size` objects when played.
+
+        Args:
+            number_of_heaps (int): number of heaps in every configuration.
+            max_objects (int): maximal number of objects in each heap.
+            rule_set (RuleSet, optional): rules of the game, only the actions they allow are legal. Defaults to None (regular Nim).
+        """
+        self.number_of_heaps = number_of_heaps
+        self.max_objects = max_objects
+        self.rule_set = RuleSet.parse(rule_set)
+
+        self.n_states = comb(max_objects + number_of_heaps, number_of_heaps)
+        self.n_actions = max_objects * (max_objects + 1) // 2
+
+        # the i-th smallest heap holding n objects contributes C(n + i, i + 1) to the rank
+        self._binom = [[comb(n_objects + i, i + 1) for n_objects in range(max_objects + 1)] for i in range(number_of_heaps)]
+        self._binom_array = np.array(self._binom)
+        # (heap size, objects left) corresponding to each action index
+        self._actions = [(heap, left) for heap in range(1, max_objects + 1) for left in range(heap)]
+        self._action_heap = np.array([heap for heap, _ in self._actions])
+        # whether the rules allow each action, i.e. removing (heap size - objects left) objects
+        self._action_allowed = self.rule_set.mask(max_objects)[[heap - left for heap, left in self._actions]]
+
+    def check(self, rows:Iterable)->None:
+        """
+            Raise an error if `rows` cannot be represented by this indexer.
+        """
+        if len(rows) != self.number_of_heaps or max(rows) > self.max_objects or min(rows) < 0:
+            raise ValueError(
+                f"Configuration {list(rows)} is out of bounds: expected {self.number_of_heaps} heaps with at most {self.max_objects} objects each")
+
+    def rank(self, rows:Iterable)->int:
+        """
+            Given a configuration, return the integer index of its canonical (sorted) version.
+        """
+        return sum(binom[n_objects] for binom, n_objects in zip(self._binom, sorted(rows)))
+
+    def rank_batch(self, rows:np.ndarray)->np.ndarray:
+        """
+            Same as `rank`, for a 2D array of configurations (one per row).
+        """
+        return self._binom_array[np.arange(self.number_of_heaps), np.sort(rows, axis=1)].sum(axis=1)
+
+    def states(self)->np.ndarray:
+        """
+            Return all the canonical configurations, sorted by rank, as a 2D array of shape (n_states, number_of_heaps).
+        """
+        states = np.array(list(itertools.combinations_with_replacement(range(self.max_objects + 1), self.number_of_heaps)))
+        return states[np.argsort(self.rank_batch(states))]
+
+    def successors(self, states:np.ndarray)->np.ndarray:
+        """
+            Given a 2D array of configurations, return the 2D array of shape (len(states), n_actions) with the rank of the configuration
+            reached playing each action. Illegal actions are marked with -1.
+        """
+        successors = np.full((len(states), self.n_actions), -1, dtype=np.int64)
+        for action, (heap, left) in enumerate(self._actions):
+            if not self._action_allowed[action]:
+                continue
+            holds_heap = states == heap
+            valid = holds_heap.any(axis=1)
+            # nimming the first row holding `heap` objects
+            next_states = states[valid].copy()
+            next_states[np.arange(len(next_states)), holds_heap[valid].argmax(axis=1)] = left
+            successors[valid, action] = self.rank_batch(next_states)
+        return successors
+
+    def valid_actions(self, rows:Iterable)->np.ndarray:
+        """
+            Given a configuration, return the boolean mask of the legal actions.
+            Action (heap size, objects_left) is legal if and only if at least one row holds `heap size` objects 
+            and the rules allow removing (heap size - objects left) objects.
+        """
+        present = np.zeros(self.max_objects + 1, dtype=bool)
+        present[list(rows)] = True
+        return present[self._action_heap] & self._action_allowed
+
+    def valid_actions_batch(self, rows:np.ndarray)->np.ndarray:
+        """
+            Same as `valid_actions`, for a 2D array of configurations (one per row).
+        """
+        present = np.zeros((len(rows), self.max_objects + 1), dtype=bool)
+        present[np.arange(len(rows))[:, None], rows] = True
+        return present[:, self._action_heap] & self._action_allowed
+
+    def encode_action(self, old_rows:Iterable, new_rows:Iterable)->int:
+        """
+            Given a configuration and the configuration obtained after nimming it, return the index of the action played.
+        """
+        heap, left = next((before, after) for before, after in zip(old_rows, new_rows) if before != after)
+        return heap * (heap - 1) // 2 + left
+
+    def decode_action(self, rows:Iterable, action:int)->tuple:
+        """
+            Given a configuration and an action index, return the action as (row, number of objects to nim), 
+            nimming the first row holding the required number of objects.
+        """
+        heap, left = self._actions[action]
+        return rows.index(heap), heap - left
+
+class QTable:
+    def __init__(self, indexer:object, max_entries:int=2**24, dtype:type=np.float32, values:np.ndarray=None, slots:dict=None):
+        """
+            Array-backed Q-table. Q-values are stored in a 2D array with one row per state and one column per action.
+            Entries which have never been updated are stored as NaN and read as 0.
+
+            When the whole state space fits in `max_entries` values the table is dense and rows are indexed by state rank.
+            Otherwise rows are allocated lazily, the first time a state is updated, and the table grows up to
+            `max_entries` values. Memory usage is therefore bounded by `max_entries * dtype size` bytes.
+
+        Args:
+            indexer (object): state/action indexer, i.e. OrderedIndexer or CanonicalIndexer.
+            max_entries (int, optional): maximal number of Q-values stored. Defaults to 2**24.
+            dtype (type, optional): Q-values dtype. Defaults to np.float32.
+            values (np.ndarray, optional): pre-allocated table to use (e.g., backed by shared memory or by a file). 
+                                           If `slots` is None, the table must be dense, i.e. of shape (number of states, number of actions). 
+                                           Defaults to None.
+            slots (dict, optional): state rank -> row of `values`, for sparse tables. Defaults to None.
+        """
+        self.indexer = indexer
+        self.max_entries = max_entries
+        self.n_actions = indexer.n_actions
+
+        if values is not None and slots is not None:
+            self._slots = slots
+            self.capacity = max_entries // self.n_actions
+            self.values = values
+        elif values is not None:
+            if values.shape != (indexer.n_states, self.n_actions):
+                raise ValueError(f"Q-values of shape {values.shape} do not match the indexer ({indexer.n_states}, {self.n_actions})")
+            self._slots = None
+            self.values = values
+        elif indexer.n_states * self.n_actions <= max_entries:
+            # dense table, state rank is the row index
+            self._slots = None
+            self.values = np.full((indexer.n_states, self.n_actions), np.nan, dtype=dtype)
+        else:
+            # sparse table, state rank -> row index
+            self._slots = dict()
+            self.capacity = max_entries // self.n_actions
+            self.values = np.full((min(1024, self.capacity), self.n_actions), np.nan, dtype=dtype)
+
+    @property
+    def is_dense(self)->bool:
+        return self._slots is None
+
+    @property
+    def slots(self)->Union[dict, None]:
+        """
+            State rank -> row of `values`, None for dense tables.
+        """
+        return self._slots
+
+    @property
+    def nbytes(self)->int:
+        return self.values.nbytes
+
+    def _slot(self, state:int, create:bool=False)->Union[int, None]:
+        """
+            Return the row storing the Q-values of `state`.
+            Should the table be sparse and `state` never seen before, either allocate a new row (`create` = True) or return None.
+        """
+        if self._slots is None:
+            return state
+
+        slot = self._slots.get(state)
+        if slot is None and create:
+            slot = len(self._slots)
+            if slot == len(self.values):
+                if slot == self.capacity:
+                    raise MemoryError(f"Q-table is full ({self.max_entries:,} entries). Increase `max_entries`.")
+                # doubling the number of allocated rows
+                grown = np.full((min(max(2 * slot, 1024), self.capacity), self.n_actions), np.nan, dtype=self.values.dtype)
+                grown[:slot] = self.values
+                self.values = grown
+            self._slots[state] = slot
+        return slot
+
+    def get(self, state:int, action:int, default:float=0.)->float:
+        """
+            Return the Q-value of (`state`, `action`), or `default` if it has never been updated.
+        """
+        slot = self._slot(state)
+        if slot is None:
+            return default
+        value = self.values[slot, action]
+        return default if np.isnan(value) else float(value)
+
+    def set(self, state:int, action:int, value:float)->None:
+        """
+            Set the Q-value of (`state`, `action`).
+        """
+        # the row must be allocated before indexing `self.values`, which might be reallocated
+        slot = self._slot(state, create=True)
+        self.values[slot, action] = value
+
+    def action_values(self, state:int, valid:np.ndarray)->np.ndarray:
+        """
+            Return the Q-values of all the actions in `state`. Illegal actions (according to `valid`) are set to -inf.
+        """
+        slot = self._slot(state)
+        if slot is None:
+            return np.where(valid, 0., -np.inf)
+        values = self.values[slot]
+        return np.where(valid, np.where(np.isnan(values), 0., values), -np.inf)
+
+    def best_value(self, state:int, valid:np.ndarray)->float:
+        """
+            Return the largest Q-value among the legal actions in `state`.
+        """
+        return float(self.action_values(state, valid).max())
+
+    def best_values(self, states:np.ndarray, valid:np.ndarray)->np.ndarray:
+        """
+            Same as `best_value`, for an array of states (one per row of `valid`). Negative states (i.e., finished games) have value 0.
+        """
+        if self._slots is not None:
+            return np.array([
+                self.best_value(state, mask) if state >= 0 else 0. for state, mask in zip(states.tolist(), valid)
+                ])
+        
+        values = self.values[np.maximum(states, 0)]
+        values = np.where(valid, np.where(np.isnan(values), 0., values), -np.inf).max(axis=1)
+        return np.where(states >= 0, values, 0.)
+
+    def best_action(self, state:int, valid:np.ndarray)->int:
+        """
+            Return the legal action with the largest Q-value in `state` (first one in case of ties).
+        """
+        return int(self.action_values(state, valid).argmax())
+
+    def __len__(self)->int:
+        """
+            Number of Q-values updated at least once.
+        """
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+    def save(self, path:str)->None:
+        """
+            Save the table to a .npy file. Only rows which have been updated at least once are stored,
+            as a structured array with fields `state` (state rank) and `q` (Q-values of the state).
+
+        Args:
+            path (str): destination path.
+        """
+        if self._slots is None:
+            states = np.flatnonzero(~np.isnan(self.values).all(axis=1))
+            slots = states
+        else:
+            states = np.fromiter(self._slots.keys(), dtype=np.int64, count=len(self._slots))
+            slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+
+        records = np.empty(len(states), dtype=[("state", np.int64), ("q", self.values.dtype, (self.n_actions,))])
+        records["state"] = states
+        records["q"] = self.values[slots]
+        np.save(path, records)
+
+    @classmethod
+    def load(cls, path:str, indexer:object, max_entries:int=2**24)->"QTable":
+        """
+            Load a table saved with `QTable.save`.
+
+        Args:
+            path (str): .npy file to load.
+            indexer (object): state/action indexer the table was built with.
+            max_entries (int, optional): maximal number of Q-values stored. Defaults to 2**24.
+
+        Returns:
+            QTable: loaded table.
+        """
+        records = np.load(path)
+        if records.dtype["q"].shape != (indexer.n_actions,):
+            raise ValueError(f"Q-table in {path} does not match the indexer ({indexer.n_actions} actions expected)")
+
+        table = cls(indexer, max_entries=max_entries, dtype=records.dtype["q"].base)
+        if table.is_dense:
+            table.values[records["state"]] = records["q"]
+        else:
+            for state, values in zip(records["state"].tolist(), records["q"]):
+                slot = table._slot(state, create=True)
+                table.values[slot] = values
+        return table
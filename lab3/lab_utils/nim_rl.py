@@ -1,21 +1,60 @@
 from lab_utils.nim import *
+from lab_utils.nim_qtable import OrderedIndexer, CanonicalIndexer, QTable
+import profiling
 import random
-from tqdm import tqdm
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
 
 class NimAI():
 
-    def __init__(self, learning_rate = 0.5, eps = 0.2):
+    def __init__(self, learning_rate = 0.5, eps = 0.2, number_of_heaps = 4, max_objects = None, symmetric = True, max_entries = 2**24, q_values = None, q_slots = None, rule_set = None):
         """
-            Initialise an empty dictionary, which will map each action to the corresponding Q-value.
-            Defined as a tuple of Nim games, each action makes the game evolve from the first Nim game to the second..
+            Initialise an empty Q-table, which will map each (state, action) pair to the corresponding Q-value.
+            States and actions are ranked into integer indices, so that the Q-values of a state are a row of a NumPy array.
         Args:
             learning_rate (float): learning rate. Defaults to 0.5.
             eps (float): probability of exploitation. Defaults to 0.2.
+            number_of_heaps (int): number of heaps in the games the agent plays. Defaults to 4.
+            max_objects (int, optional): maximal number of objects in each heap. Defaults to (`number_of_heaps` - 1) * 2 + 1,
+                                         i.e. the number of objects in the last row of a regular Nim game.
+            symmetric (bool): if True, states that only differ by a permutation of the heaps share the same Q-values, 
+                              i.e. learning happens in the (much smaller) canonical state space. Defaults to True.
+            max_entries (int): maximal number of Q-values stored. Defaults to 2**24.
+            q_values (np.ndarray, optional): pre-allocated array to store the Q-values in. Defaults to None.
+            q_slots (dict, optional): state rank -> row of `q_values`, when `q_values` is a sparse table. Defaults to None.
+            rule_set (RuleSet or list, optional): rules of the games the agent plays (see `Nim`). Defaults to None (regular Nim).
         """
-
-        self.q = dict()
         self.learning_rate = learning_rate
         self.eps = eps
+        self.number_of_heaps = number_of_heaps
+        self.max_objects = max_objects if max_objects is not None else (number_of_heaps - 1) * 2 + 1
+        self.symmetric = symmetric
+        self.rule_set = RuleSet.parse(rule_set)
+
+        indexer = CanonicalIndexer if symmetric else OrderedIndexer
+        self.indexer = indexer(self.number_of_heaps, self.max_objects, rule_set = self.rule_set)
+        self.q = QTable(self.indexer, max_entries = max_entries, values = q_values, slots = q_slots)
+
+        # training history
+        self.episodes = 0
+        self.solved = False
+
+    @property
+    def hyperparameters(self):
+        """
+            Arguments needed to build an untrained copy of this agent.
+        """
+        return {
+            "learning_rate": self.learning_rate,
+            "eps": self.eps,
+            "number_of_heaps": self.number_of_heaps,
+            "max_objects": self.max_objects,
+            "symmetric": self.symmetric,
+            "max_entries": self.q.max_entries,
+            "rule_set": None if self.rule_set.is_plain else list(self.rule_set.subtraction_set)
+        }
 
     def update(self, old_state, new_state, reward, next_action = None):
         """
@@ -26,40 +65,76 @@ class NimAI():
             old_state (Nim): previously observed state.
             new_state (Nim): resulting state.
             reward (float): reward when performing `action` in `old_state`
+            next_action (Nim, optional): state reached once the other player has replied. None when the game has finished.
         """
-        # Turn lists into tuples to make them hashable
-        old_state_hash = tuple(old_state._rows)
-        new_state_hash = tuple(new_state._rows)
+        state = self.indexer.rank(old_state._rows)
+        action = self.indexer.encode_action(old_state._rows, new_state._rows)
 
-        # if the tuple (`old_state`, `action`) is not present in the dictionary, 
-        # then add this new key to the dictionary with value equal to the observed reward
-        if (old_state_hash, new_state_hash) not in self.q:
-            self.q[old_state_hash, new_state_hash] = reward
+        if next_action is None:
+            self.update_indices(state, action, reward)
         else:
-            # Consider the action that was played right after by the other player
-            # Find the best reward associated to that action
+            self.update_indices(
+                state, action, reward, 
+                next_state = self.indexer.rank(next_action._rows), 
+                next_valid = self.indexer.valid_actions(next_action._rows)
+                )
 
-            # next_action is None when the game has finished and all you need to know is REWARD,
-            if next_action is None:
-                best_future_reward = 0
-            else:
-                # It means that we are in a phase of game where both players can still win.
-                # So the reward is 0, and all you need to know is BEST_FUTURE_REWARD.
+    def update_indices(self, state, action, reward, next_state = None, next_valid = None):
+        """
+            Same as `update`, with states and actions already ranked into their indices.
+
+        Args:
+            state (int): index of the previously observed state.
+            action (int): index of the action performed in `state`.
+            reward (float): reward when performing `action` in `state`
+            next_state (int, optional): index of the state reached once the other player has replied. None when the game has finished.
+            next_valid (np.ndarray, optional): mask of the legal actions in `next_state`.
+        """
+        if profiling.enabled:
+            profiling.count("lab3.q_updates")
+        old_q = self.q.get(state, action, default = None)
+
+        # if the tuple (`state`, `action`) has never been observed,
+        # then set its Q-value equal to the observed reward
+        if old_q is None:
+            self.q.set(state, action, reward)
+            return
+
+        # next_state is None when the game has finished and all you need to know is REWARD,
+        if next_state is None:
+            best_future_reward = 0
+        else:
+            # It means that we are in a phase of game where both players can still win.
+            # So the reward is 0, and all you need to know is BEST_FUTURE_REWARD,
+            # i.e. the largest Q-value among the legal actions in `next_state` (vectorized reduction over the table row).
+            best_future_reward = self.q.best_value(next_state, next_valid)
 
-                # Consider all possible actions starting from the last action that was played by the other player
-                # For each of them, consider the corresponding q-value (i.e., the last entry in the q dictionary)
-                # Isolate the one with the largest q-value
-                best_future_reward = max([self.get_q(next_action, action) for action in next_action.possible_new_states()])
+        # update the old q-value accordingly
+        self.q.set(state, action, old_q + (self.learning_rate * ((reward + best_future_reward) - old_q)))
+
+    def update_batch(self, states, actions, rewards, next_states, next_rows):
+        """
+            Apply a batch of updates, in order. Differently from `update_indices`, the best future rewards 
+            of the whole batch are computed at once (vectorized) from the Q-values available before the batch.
 
-            # find the previous q-value
-            old_q = self.q[old_state_hash, new_state_hash]
+        Args:
+            states (np.ndarray): indices of the previously observed states.
+            actions (np.ndarray): indices of the actions performed in `states`.
+            rewards (np.ndarray): rewards of the actions.
+            next_states (np.ndarray): indices of the states reached once the other player has replied, -1 when the game has finished.
+            next_rows (np.ndarray): 2D array with the configurations corresponding to `next_states` (one per row).
+        """
+        if profiling.enabled:
+            profiling.count("lab3.q_updates", len(states))
+        targets = rewards + self.q.best_values(next_states, self.indexer.valid_actions_batch(next_rows))
 
-            # update it accordingly
-            self.q[old_state_hash, new_state_hash] = old_q + (self.learning_rate * ((reward + best_future_reward) - old_q))
+        for state, action, reward, target in zip(states.tolist(), actions.tolist(), rewards.tolist(), targets.tolist()):
+            old_q = self.q.get(state, action, default = None)
+            self.q.set(state, action, reward if old_q is None else old_q + (self.learning_rate * (target - old_q)))
 
     def get_q(self, state, action):
         """
-            Given a state and an action, return the corresponding Q-value (i.e., the last value associated to the matching key in the q dictionary).
+            Given a state and an action, return the corresponding Q-value.
             Should it be the first time that this combination of state and action is observed, return 0.
 
         Args:
@@ -69,12 +144,19 @@ class NimAI():
         Returns:
             float: Q-value when performing `action` in `state`
         """
-        state = tuple(state._rows)
-        action = tuple(action._rows)
-        if (state, action) not in self.q:
-            return 0
-        return self.q[state, action]
+        return self.q.get(
+            self.indexer.rank(state._rows), 
+            self.indexer.encode_action(state._rows, action._rows)
+            )
 
+    def choose_action(self, rows, valid, with_probability = False, rng = random):
+        """
+            Given a configuration and the mask of its legal actions, return the index of the action to take.
+            See `best_move_rl` for the meaning of `with_probability`. `rng` is the source of randomness used to explore.
+        """
+        if with_probability and rng.random() <= self.eps:
+            return rng.choice(valid.nonzero()[0].tolist())
+        return self.q.best_action(self.indexer.rank(rows), valid)
 
     def best_move_rl(self, state, with_probability = False):
         """
@@ -90,20 +172,94 @@ class NimAI():
         Returns:
             Nim: action to take.
         """
+        self.indexer.check(state._rows)
         # with probability = self.eps, the best move corresponds to a random move.
         # This is to favour EXPLORATION over EXPLOITATION.
-        if with_probability and random.random() <= self.eps:
-            return random.choice(state.possible_new_states())    
-        else:
-            values = [self.get_q(state, action) for action in state.possible_new_states()]
-            return state.possible_new_states()[max(enumerate(values), key=lambda x: x[1])[0]]
+        action = self.choose_action(state._rows, self.indexer.valid_actions(state._rows), with_probability = with_probability)
+        row, num_objects = self.indexer.decode_action(state._rows, action)
+        
+        new_state = Nim(state._rows.copy(), rule_set = self.rule_set)
+        new_state.nimming(row, num_objects)
+        return new_state
+
+    def save(self, path):
+        """
+            Save the Q-table to a .npy file.
+        """
+        self.q.save(path)
+
+    def load(self, path):
+        """
+            Load the Q-table from a .npy file produced by `save`.
+        """
+        self.q = QTable.load(path, self.indexer, max_entries = self.q.max_entries)
 
 
-def train(nim_game = None, n_iter = 10000, number_of_heaps = 4):
+def self_play(agent, number_of_heaps, rng = random):
+    """
+        Play one game of `agent` against itself, starting from a random configuration with `number_of_heaps` heaps.
+        Each time a Q-value must be updated, the transition (state, action, reward, next_state, next_valid, next_rows) is yielded.
+        `next_state`, `next_valid` and `next_rows` are None when the game has finished.
+        Since the game is suspended until the transition is consumed, updates are visible to the following moves.
+
+    Args:
+        agent (NimAI): agent playing both sides.
+        number_of_heaps (int): number of heaps in the game.
+        rng (random.Random, optional): source of randomness. Defaults to the `random` module.
+    """
+    indexer = agent.indexer
+    # prepare a random configuration for Nim
+    rows = rng.choices(range(1, (number_of_heaps - 1) * 2 + 2), k = number_of_heaps)
+    
+    # Keep track of the last (state, action) indices played by either player
+    last_move = {0: None, 1: None}
+
+    # keep track of which player is playing
+    turn = 0
+
+    # Play
+    while True:
+        # current state
+        if profiling.enabled:
+            start = time.perf_counter()
+        state, valid = indexer.rank(rows), indexer.valid_actions(rows)
+        if profiling.enabled:
+            profiling.record("lab3.successors", start)
+
+        # if at least one move was played by the current player, the state it faces now 
+        # is the result of the other player's last move: update its last move with reward 0.
+        if last_move[turn] is not None:
+            yield (*last_move[turn], 0, state, valid, rows)
+
+        # next state
+        if profiling.enabled:
+            start = time.perf_counter()
+        action = agent.choose_action(rows, valid, with_probability = True, rng = rng)
+        if profiling.enabled:
+            profiling.record("lab3.choose_action", start)
+        row, num_objects = indexer.decode_action(rows, action)
+        rows[row] -= num_objects
+
+        # Update the last_move dictionary
+        last_move[turn] = (state, action)
+
+        # switch player
+        turn = 1 - turn 
+
+        # When game is over, update Q values with rewards
+        if sum(rows) == 0:
+            # loser's last move is given reward -1
+            if last_move[turn] is not None:
+                yield (*last_move[turn], -1, None, None, None)
+            # winner's last move is given reward +1
+            yield (state, action, 1, None, None, None)
+            break
+
+def train(nim_game = None, n_iter = 10000, number_of_heaps = 4, rng = random):
     """
         The AI will play `n_iter` games against itself.
         It will only play games with specified `number_of_heaps`, but with a random number of objects in each heap.
-        The maximum number of objects inside the n-th heap is set to (`number_of_heaps` - 1) * 2 + 2. 
+        The maximum number of objects inside the n-th heap is set to (`number_of_heaps` - 1) * 2 + 1. 
 
         This number corresponds to the number of objects in the last row of a regular Nim game with `number_of_heaps` heaps.
 
@@ -113,61 +269,236 @@ def train(nim_game = None, n_iter = 10000, number_of_heaps = 4):
         nim_game (NimAI, optional): use a pre-generated NimAI agent. 
         n_iter: number of training epochs
         number_of_heaps: number of heaps in every game the AI will be trained on and played against.
+        rng (random.Random, optional): source of randomness of the games. Defaults to the `random` module.
 
     Returns:
         NimAI: trained AI agent ready to be challenged.
     """
-    if nim_game is not None:
-        agent = nim_game
-    else:
-        agent = NimAI()
-
-    return_per_episode = []
+    agent = _training_agent(nim_game, number_of_heaps)
 
+    # tqdm is only imported when training, so that importing this module is cheap
+    from tqdm import tqdm
     for i in tqdm(range(n_iter), desc = 'Training'):
-        # prepare a random configuration for Nim
-        random_configuration = random.choices(range(1, (number_of_heaps - 1) * 2 + 2), k = number_of_heaps)
-        
-        # create the game
-        game = Nim(random_configuration)
-        
-        # Keep track of the last moves made by either player
-        last_move = {
-            0: {"state": None, "action": None},
-            1: {"state": None, "action": None}
-        }
+        for state, action, reward, next_state, next_valid, _ in self_play(agent, number_of_heaps, rng = rng):
+            if profiling.enabled:
+                start = time.perf_counter()
+            agent.update_indices(state, action, reward, next_state = next_state, next_valid = next_valid)
+            if profiling.enabled:
+                profiling.record("lab3.q_update", start)
+        agent.episodes += 1
+
+    # Return the trained AI
+    return agent
+
+def _training_agent(nim_game, number_of_heaps):
+    """
+        Return the agent to train, i.e. `nim_game` or a brand new NimAI if `nim_game` is None.
+    """
+    if nim_game is None:
+        return NimAI(number_of_heaps = number_of_heaps)
+    
+    if nim_game.number_of_heaps != number_of_heaps: 
+        raise ValueError(f"The agent plays games with {nim_game.number_of_heaps} heaps, cannot train it with {number_of_heaps} heaps")
+    return nim_game
+
+def train_exact(nim_game = None, number_of_heaps = 4):
+    """
+        Exact alternative to `train`. Instead of sampling games, the whole (finite) graph of the configurations with `number_of_heaps` heaps
+        and at most `max_objects` objects per heap is enumerated, and the Q-table is filled by backward induction.
+        Since every move removes at least one object, configurations are solved by increasing number of objects,
+        one vectorized step for all the configurations with the same number of objects.
+
+        The resulting Q-values are the game-theoretic ones: Q(state, action) is +1 if `action` leads to a win under optimal play
+        and -1 otherwise. Hence the agent plays perfectly and can be used as ground truth for episodic training (see `optimal_action_rate`).
+
+    Args:
+        nim_game (NimAI, optional): use a pre-generated NimAI agent, whose Q-table must be dense. Its Q-values are overwritten.
+        number_of_heaps: number of heaps in every game the AI will be trained on and played against.
+
+    Returns:
+        NimAI: trained AI agent ready to be challenged.
+    """
+    agent = _training_agent(nim_game, number_of_heaps)
+    if not agent.q.is_dense:
+        raise ValueError("Exact training requires a dense Q-table: use a symmetric agent or increase `max_entries`")
+
+    states = agent.indexer.states()
+    with profiling.phase("lab3.successors"):
+        successors = agent.indexer.successors(states)
+    valid = successors >= 0
+    objects = states.sum(axis = 1)
+
+    # value of each configuration for the player who has to move in it
+    state_values = np.zeros(len(states))
+    q_values = np.full(successors.shape, np.nan)
+
+    # the empty configuration (rank 0, no legal actions) is skipped: whoever empties the board wins.
+    for n_objects in range(1, objects.max() + 1):
+        level = np.flatnonzero(objects == n_objects)
+        next_states = successors[level]
+        # Q(s, a) = - V(s'), i.e. the value of the reached configuration for the opponent
+        level_q = np.where(next_states == 0, 1., -state_values[np.maximum(next_states, 0)])
+        q_values[level] = np.where(valid[level], level_q, np.nan)
+        state_values[level] = np.where(valid[level], level_q, -np.inf).max(axis = 1)
+
+    agent.q.values[:] = q_values
+    agent.solved = True
+    return agent
 
-        # keep track of which player is playing
-        turn = 0
+def optimal_action_rate(agent, exact):
+    """
+        Fraction of the non-terminal configurations in which `agent` plays an optimal move, according to `exact` (see `train_exact`).
+        Configurations in which every move loses are not considered, since any move is optimal there.
 
-        # Play
-        while True:
-            # current state
-            state = Nim(game._rows.copy())
-            # next state
-            new_state = agent.best_move_rl(game, with_probability = True)
+    Args:
+        agent (NimAI): agent to evaluate, with a dense Q-table.
+        exact (NimAI): agent trained with `train_exact`, using the same indexer as `agent`.
 
-            game.nimming(target = new_state._rows)
+    Returns:
+        float: fraction of winnable configurations in which `agent` plays a winning move.
+    """
+    if type(agent.indexer) is not type(exact.indexer) or agent.q.values.shape != exact.q.values.shape:
+        raise ValueError("`agent` and `exact` must share the same state and action spaces")
 
-            # Update the last_move dictionary
-            last_move[turn]["state"] = state
-            last_move[turn]["action"] = new_state
+    valid = ~np.isnan(exact.q.values)
+    winnable = (exact.q.values == 1).any(axis = 1)
 
-            # switch player
-            turn = 1 - turn 
+    # greedy actions of `agent`, never-updated values being read as 0
+    agent_values = np.where(valid, np.nan_to_num(agent.q.values, nan = 0.), -np.inf)
+    greedy = agent_values.argmax(axis = 1)
+    
+    return float((exact.q.values[np.arange(len(greedy)), greedy] == 1)[winnable].mean())
 
-            # When game is over, update Q values with rewards
-            if sum(game._rows) == 0:
-                # loser's last move is given reward -1
-                agent.update(old_state = last_move[turn]["state"], new_state = last_move[turn]["action"], reward = -1)
-                # winner's last move is given reward +1
-                agent.update(old_state = state, new_state = new_state, reward = 1)
-                break
+# agent living in each worker process of `train_parallel`, sharing its Q-table with the learner
+_worker_agent = None
+_worker_memory = None
 
-            # if the game has not finished and at least one move was played
-            elif last_move[turn]["state"] is not None:
-                # update other player's last move with reward 0.
-                agent.update(old_state = last_move[turn]["state"], new_state = last_move[turn]["action"], next_action = last_move[1 - turn]["action"], reward = 0)
+def _init_worker(hyperparameters, memory_name, shape, dtype):
+    """
+        Initialise a self-play worker, attaching its agent to the Q-table shared by the learner.
+    """
+    global _worker_agent, _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name = memory_name)
+    q_values = np.ndarray(shape, dtype = dtype, buffer = _worker_memory.buf)
+    _worker_agent = NimAI(**hyperparameters, q_values = q_values)
+
+def _self_play_chunk(n_games, seed):
+    """
+        Play `n_games` self-play games with the worker's agent and return the transitions observed, as a 2D array with columns
+        state, action, reward, next_state (-1 when the game has finished) and the configuration corresponding to next_state.
+    """
+    rng = random.Random(seed)
+    number_of_heaps = _worker_agent.number_of_heaps
+    finished = (0,) * number_of_heaps
+    
+    transitions = []
+    for _ in range(n_games):
+        for state, action, reward, next_state, _, next_rows in self_play(_worker_agent, number_of_heaps, rng = rng):
+            if next_state is None:
+                transitions.append((state, action, reward, -1, *finished))
+            else:
+                transitions.append((state, action, reward, next_state, *next_rows))
+    
+    return np.array(transitions, dtype = np.int64).reshape(-1, 4 + number_of_heaps)
+
+def train_parallel(nim_game = None, n_iter = 10000, number_of_heaps = 4, n_workers = 2, batch_size = 200, chunk_size = 50, seed = None):
+    """
+        Parallel version of `train`. Games are played by `n_workers` worker processes, which read the Q-table from shared memory,
+        while the current process (the learner) applies the resulting updates in batches of `batch_size` games.
+        Workers do not see the updates of the batch they are playing, hence results differ from the ones of `train`: 
+        the larger `batch_size`, the less frequent the synchronisations but the more games are needed to learn.
+
+        Each batch is split in chunks of `chunk_size` games and every chunk is played with its own random stream, 
+        derived from `seed` and the chunk position. Therefore, for a given `seed`, `batch_size` and `chunk_size`, 
+        the trained agent does not depend on `n_workers`.
+
+    Args:
+        nim_game (NimAI, optional): use a pre-generated NimAI agent, whose Q-table must be dense.
+        n_iter (int): number of training games. Defaults to 10000.
+        number_of_heaps (int): number of heaps in every game the AI will be trained on and played against. Defaults to 4.
+        n_workers (int): number of worker processes. Defaults to 2.
+        batch_size (int): number of games played between two updates of the Q-table. Defaults to 200.
+        chunk_size (int): number of games played by a worker in a single task. Defaults to 50.
+        seed (int, optional): random seed. Defaults to None.
+
+    Returns:
+        NimAI: trained AI agent ready to be challenged.
+    """
+    agent = _training_agent(nim_game, number_of_heaps)
+    if not agent.q.is_dense:
+        raise ValueError("Parallel training requires a dense Q-table: use a symmetric agent or increase `max_entries`")
+
+    seed_sequence = np.random.SeedSequence(seed)
+    values = agent.q.values
+
+    memory = shared_memory.SharedMemory(create = True, size = values.nbytes)
+    try:
+        # the learner updates the very same Q-table the workers read from
+        agent.q.values = np.ndarray(values.shape, dtype = values.dtype, buffer = memory.buf)
+        agent.q.values[:] = values
+
+        initargs = (agent.hyperparameters, memory.name, values.shape, values.dtype)
+        from tqdm import tqdm
+        with ProcessPoolExecutor(max_workers = n_workers, initializer = _init_worker, initargs = initargs) as pool:
+            played, n_chunks = 0, 0
+            with tqdm(total = n_iter, desc = 'Training') as pbar:
+                while played < n_iter:
+                    # splitting the batch in chunks, each one with its own random stream
+                    batch = min(batch_size, n_iter - played)
+                    chunks = [min(chunk_size, batch - start) for start in range(0, batch, chunk_size)]
+                    seeds = [
+                        int(np.random.SeedSequence(seed_sequence.entropy, spawn_key = (n_chunks + i,)).generate_state(1)[0]) 
+                        for i in range(len(chunks))
+                        ]
+
+                    with profiling.phase("lab3.self_play_workers"):
+                        transitions = np.vstack(list(pool.map(_self_play_chunk, chunks, seeds)))
+                    with profiling.phase("lab3.q_update"):
+                        agent.update_batch(
+                            states = transitions[:, 0], 
+                            actions = transitions[:, 1], 
+                            rewards = transitions[:, 2], 
+                            next_states = transitions[:, 3], 
+                            next_rows = transitions[:, 4:]
+                            )
+
+                    played += batch; n_chunks += len(chunks)
+                    agent.episodes += batch
+                    pbar.update(batch)
+    finally:
+        # moving the Q-table out of shared memory
+        agent.q.values = np.array(agent.q.values)
+        memory.close()
+        memory.unlink()
 
-    # Return the trained AI
     return agent
+
+def benchmark_parallel_training(number_of_heaps = 5, n_iter = 20000, worker_counts = (1, 2, 4), **kwargs):
+    """
+        Measure the throughput of `train_parallel` for different numbers of workers.
+
+    Args:
+        number_of_heaps (int): number of heaps in the training games. Defaults to 5.
+        n_iter (int): number of training games for each run. Defaults to 20000.
+        worker_counts (tuple): numbers of workers to test. Defaults to (1, 2, 4).
+        kwargs: further arguments of `train_parallel` (e.g., `batch_size`, `chunk_size`, `seed`).
+
+    Returns:
+        pd.DataFrame: one row per number of workers, with elapsed time, episodes/sec and episodes/sec per worker.
+    """
+    import pandas as pd
+    report = []
+    for n_workers in worker_counts:
+        start = time.perf_counter()
+        train_parallel(n_iter = n_iter, number_of_heaps = number_of_heaps, n_workers = n_workers, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        report.append({
+            "workers": n_workers,
+            "episodes": n_iter,
+            "seconds": elapsed,
+            "episodes/sec": n_iter / elapsed,
+            "episodes/sec/worker": n_iter / elapsed / n_workers
+        })
+
+    return pd.DataFrame(report)
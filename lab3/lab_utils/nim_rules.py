@@ -1,18 +1,25 @@
 from lab_utils.nim import *
+from lab_utils.nim_grundy import RuleSet
 import random
 import itertools
-from tqdm import tqdm
-import pandas as pd
-from typing import Union
+from typing import Union, TYPE_CHECKING
 from math import ceil
-import numpy as np
+import json
+import os
 
-def best_move_rules(nim_game:object, inplace:bool=False)->Union[None, list]:
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+def best_move_rules(nim_game:object, inplace:bool=False, rng:random.Random=random)->Union[None, list]:
     """This function either performs or return a best move based on a set of parametric rules.
+    Rules are designed for the regular Nim: in games with a different rule set, each move is restricted to the largest 
+    legal one on the same heap (see `RuleSet.restrict`).
 
     Args:
         nim_game (object): Nim game as per nim interface.
         inplace (bool, optional): Whether to perform the move on the actual nim_game or return it. Defaults to False.
+        rng (random.Random, optional): source of randomness of the opening. Defaults to the `random` module.
 
     Returns:
         Union[None, list]: Either None (best move is performed on nim_game) or the list representing the best move.
@@ -21,7 +28,7 @@ def best_move_rules(nim_game:object, inplace:bool=False)->Union[None, list]:
     opening_condition = nim_game._rows.count(0) + nim_game._rows.count(1) < nim_game._k
     
     if not nim_game.is_endgame() and opening_condition:
-        opening_move = opening(nim_game, nim_game.alpha)
+        opening_move = nim_game.rule_set.restrict(nim_game._rows, opening(nim_game, nim_game.alpha, rng = rng))
         
         if inplace:
             nim_game.nimming(target = opening_move)
@@ -30,7 +37,7 @@ def best_move_rules(nim_game:object, inplace:bool=False)->Union[None, list]:
 
     # midgame:    
     elif not nim_game.is_endgame():
-        midgame_move = midgame(nim_game, nim_game.strategy)
+        midgame_move = nim_game.rule_set.restrict(nim_game._rows, midgame(nim_game, nim_game.strategy))
         
         if inplace:
             nim_game.nimming(target = midgame_move)
@@ -44,6 +51,8 @@ def best_move_rules(nim_game:object, inplace:bool=False)->Union[None, list]:
         elements_to_nim = max(
             ceil(nim_game.endgame_nim * nim_game._rows[biggest_heap]), 1
         )
+        # largest legal number of objects not exceeding the desired one
+        elements_to_nim = max(n for n in nim_game.rule_set.removals(nim_game._rows[biggest_heap]) if n <= elements_to_nim)
         if inplace:
             nim_game.nimming(biggest_heap, elements_to_nim)
         
@@ -53,7 +62,7 @@ def best_move_rules(nim_game:object, inplace:bool=False)->Union[None, list]:
 
             return (target)
 
-def opening(nim_game:object, alpha:float)->list:
+def opening(nim_game:object, alpha:float, rng:random.Random=random)->list:
     """This function is used in the opening phase.
     With probability alpha nims biggest heap and 1-alpha nims smallest heap. 
 
@@ -61,11 +70,12 @@ def opening(nim_game:object, alpha:float)->list:
         nim_game (object): Nim game as per nim interface.
         alpha (float): Probability of nimming biggest heap during opening. 1-alpha is the probability of nimming smallest
                        heap during opening.
+        rng (random.Random, optional): source of randomness. Defaults to the `random` module.
 
     Returns: 
         list: list representing the configuration corresponding to best move according to parameter.
     """
-    if random.uniform(0, 1) < alpha:
+    if rng.uniform(0, 1) < alpha:
         biggest_heap = nim_game.biggest_heap()
         # target configuration
         target = nim_game._rows.copy()
@@ -116,76 +126,106 @@ def midgame(nim_game:object, strategy:Union[str, None])->list:
 
     return (rows_copy)
 
-def find_max_weighted_variance(nim_game:object, strategy:Union[str, None])->tuple:
+def find_max_weighted_variance(nim_game:object, strategy:Union[str, None], closed_form:bool=True)->tuple:
     """Given a nim_game and a strategy, return the variance-sorted tuple of tuples indicating
     indices and values that need to be nimmed to minimise variance. 
 
+    The pairwise variance of heaps (a, b) is (a - b)**2 / 2 and, for every strategy, its weighted version strictly increases with
+    the largest heap of the pair. Hence the maximal pair always contains the most populated heap and, when `closed_form` is True,
+    only its partner is searched for (linear time). Otherwise, all the pairs are weighted at once (vectorized, quadratic memory).
+    Either way, ties are broken as in `itertools.combinations` order, i.e. the first maximal pair of populated heaps is chosen.
+
     Args:
         nim_game (object, Nim): Nim game as per nim interface.
         strategy (Union[str, None]): Either 'None' when pairwise variances are not weighted according to any strategy or
                                      one in "min", "max" or "sum".
                                      "min" weighs each pairwise variance by the minimal value of the elements with respect to 
                                      is computed, "max" the maximal value and "sum" the sum of the values.
+        closed_form (bool, optional): whether to search for the partner of the most populated heap only. Defaults to True.
 
     Returns:
         tuple: Tuple of tuples of type (index, value) sorted according to value in ascending order.
     """
+    import numpy as np
+    rows = np.asarray(nim_game._rows)
     # restricting to populated heaps only (those having at least one element inside)
-    populated_heaps = [heap for heap in nim_game._rows if heap > 0]
+    populated_idx = np.flatnonzero(rows > 0)
+    populated_heaps = rows[populated_idx]
     # edge case 1 - one heap only is populated (not going to be called if endgame is defined as per definition)
     if len(populated_heaps) == 1:
-        first_zero_index = next(idx for idx, heap in enumerate(nim_game._rows) if heap == 0) 
-        nonzero_index = next(idx for idx, heap in enumerate(nim_game._rows) if heap > 0)
+        first_zero_index = int(np.argmax(rows == 0))
+        nonzero_index = int(populated_idx[0])
 
         return (
             (first_zero_index, nim_game._rows[first_zero_index]), 
             (nonzero_index, nim_game._rows[nonzero_index])
             )
     # edge case 2 - configuration is like [n, n, n, ..., n]
-    elif all_equal(populated_heaps):
-        first_index, second_index = [idx for idx, heap in enumerate(nim_game._rows) if heap > 0][:2]
+    elif (populated_heaps == populated_heaps[0]).all():
+        first_index, second_index = populated_idx[:2].tolist()
         return (
             (first_index, nim_game._rows[first_index]), 
             (second_index, nim_game._rows[second_index])
             )
     # non-edge cases
-    strategy_dict = {"min" : min, "sum" : sum, "max" : max}
-    # different pairs
-    combinations = list(itertools.combinations(populated_heaps, 2))
-    if strategy is None:
-        # beta is a weight array with length equal to the number of pairs obtainable from populated_heaps
-        beta = [1] * len(combinations)
+    if closed_form:
+        low, high = _max_weighted_variance_closed_form(rows, populated_heaps, strategy)
     else:
-        # beta is a weight array with length equal to the number of pairs obtainable from populated_heaps
-        # elements of beta are the results of applying strategy to the possible pairs
-        beta = [strategy_dict[strategy](tuple_) for tuple_ in combinations]
-    
-    # computing variances
-    pairwise_vars = [
-        (tuple_[0] - (sum(tuple_) / 2)) ** 2 + (tuple_[1] - (sum(tuple_) / 2)) ** 2
-            for tuple_ in combinations
-            ]
-    # weighting pairwise variances
-    weighted_pairwise_vars = [beta[i] * var for i, var in enumerate(pairwise_vars)]
-    
-    # values corresponding to maximal variance 
-    values_max_var = sorted(list(combinations)[max(enumerate(weighted_pairwise_vars), key=lambda x: x[1])[0]])
-    # sorting values of maximal variance in ascending order gives the desidered ordering in output (low to high)
-    
+        low, high = _max_weighted_variance_pairs(populated_heaps, strategy)
+
+    # values corresponding to maximal variance, sorted in ascending order, and the first heaps holding them 
     return (
-        (next(idx for idx, heap in enumerate(nim_game._rows) if heap == values_max_var[0]), values_max_var[0]),
-        (next(idx for idx, heap in enumerate(nim_game._rows) if heap == values_max_var[1]), values_max_var[1])
+        (int(np.argmax(rows == low)), nim_game._rows[int(np.argmax(rows == low))]), 
+        (int(np.argmax(rows == high)), nim_game._rows[int(np.argmax(rows == high))])
         )
 
-def rules_tournament(nim_game:object)->pd.DataFrame:
-    """This function returns a pd.DataFrame with the result of the tournament for various parameters.
+def _max_weighted_variance_closed_form(rows:"np.ndarray", populated_heaps:"np.ndarray", strategy:Union[str, None])->tuple:
+    """Return the (low, high) values of the first pair of populated heaps with maximal weighted variance,
+    knowing that the highest value of such pair is the most populated heap.
+    """
+    import numpy as np
+    highest = populated_heaps.max()
+    # with no weights (or max weights) the lowest value is the least populated heap
+    if strategy is None or strategy.lower() == "max":
+        return populated_heaps.min(), highest
+    
+    # distinct candidate partners of the most populated heap
+    candidates = np.unique(populated_heaps[populated_heaps < highest])
+    beta = candidates + highest if strategy.lower() == "sum" else candidates
+    weighted_vars = beta * (highest - candidates) ** 2
+    tied = candidates[weighted_vars == weighted_vars.max()]
+    if len(tied) == 1:
+        return tied[0], highest
+    
+    # ties: the first pair in combinations order is the one whose (first index, second index) is lexicographically smallest
+    first_highest = np.argmax(rows == highest)
+    first_tied = np.argmax(rows[None, :] == tied[:, None], axis=1)
+    pairs = np.stack((np.minimum(first_tied, first_highest), np.maximum(first_tied, first_highest)), axis=1)
+    return tied[np.lexsort((pairs[:, 1], pairs[:, 0]))[0]], highest
+
+def _max_weighted_variance_pairs(populated_heaps:"np.ndarray", strategy:Union[str, None])->tuple:
+    """Return the (low, high) values of the first pair of populated heaps with maximal weighted variance, weighting all the pairs.
+    """
+    import numpy as np
+    # different pairs, in combinations order
+    first, second = np.triu_indices(len(populated_heaps), k=1)
+    a, b = populated_heaps[first], populated_heaps[second]
+    # (a - b)**2 is twice the pairwise variance, which does not change the maximal pair
+    weighted_vars = strategy_weights(a, b, strategy) * (a - b) ** 2
+    pair = np.argmax(weighted_vars)
+
+    return min(a[pair], b[pair]), max(a[pair], b[pair])
+
+def rules_grid(nim_game:object)->list:
+    """This function returns the grid of parameters of the rule-based agent explored by `rules_tournament` and `rules_racing`.
 
     Args:
         nim_game (object, Nim): Nim game as per nim interface.
 
     Returns:
-        pd.DataFrame: DataFrame containing experiments results
+        list: one dictionary of parameters (k, alpha, endgame_nim, strategy) per configuration.
     """
+    import numpy as np
     gridsearch = {
         "k" : range(0, nim_game.number_of_heaps()),
         "alpha" : np.linspace(start = 0, stop = 1, num = 20, endpoint = False),
@@ -194,32 +234,295 @@ def rules_tournament(nim_game:object)->pd.DataFrame:
     }
     
     keys, values = zip(*gridsearch.items())
-    permutations_dicts = [dict(zip(keys, v)) for v in itertools.product(*values)]
+    return [dict(zip(keys, v)) for v in itertools.product(*values)]
+
+def rules_tournament(
+    nim_game:object, 
+    n_games:int=100, 
+    n_workers:int=1, 
+    chunk_size:int=200, 
+    results_path:str=None, 
+    seed:int=None, 
+    vectorized:bool=False)->"pd.DataFrame":
+    """This function returns a pd.DataFrame with the result of the tournament for various parameters.
+    Configurations are played in chunks of `chunk_size`, possibly over a pool of `n_workers` processes.
+    When `results_path` is given, the results of each chunk are appended to that CSV file as soon as they are available, 
+    and configurations already stored there are not played again (i.e., an interrupted tournament resumes where it stopped).
+    The parameters the results depend on are stored next to the CSV file (see `check_tournament_parameters`), and resuming
+    with different parameters raises an error.
+
+    Args:
+        nim_game (object, Nim): Nim game as per nim interface.
+        n_games (int, optional): number of games played by each configuration. Defaults to 100.
+        n_workers (int, optional): number of worker processes. Defaults to 1 (no pool).
+        chunk_size (int, optional): number of configurations played in a single task. Defaults to 200.
+        results_path (str, optional): CSV file where results are streamed. Defaults to None.
+        seed (int, optional): random seed. Each chunk is played with its own seed, derived from `seed` and the position of the chunk
+                              in the grid, so that results do not depend on `n_workers` nor on interruptions (a chunk only partially
+                              written to `results_path` is played again as a whole). Defaults to None.
+        vectorized (bool, optional): whether to play the games of each configuration in lockstep with `play_against_random_batch`, 
+                                     which makes larger values of `n_games` affordable. Defaults to False.
 
+    Returns:
+        pd.DataFrame: DataFrame containing experiments results
+    """
+    permutations_dicts = rules_grid(nim_game)
+
+    # numpy, pandas and tqdm are only imported when needed, so that importing this module is cheap
+    import numpy as np
+    import pandas as pd
+    from tqdm import tqdm
+    from concurrent.futures import ProcessPoolExecutor, as_completed
     championship = pd.DataFrame(permutations_dicts)
     
-    winning_ratio = []
-    n_games = int(1e2)
+    # configuration index -> winning ratio
+    winning_ratio = dict()
+    if results_path is not None:
+        check_tournament_parameters(results_path, {
+            "rows": list(nim_game._rows), "rule_set": repr(nim_game.rule_set), "n_configurations": len(permutations_dicts), 
+            "n_games": n_games, "seed": seed, "chunk_size": chunk_size, "vectorized": vectorized
+            })
+        winning_ratio = read_tournament_results(results_path)
+    
+    # chunks of configurations, identified by their starting position in the grid. The games of a chunk depend on its seed and on
+    # all of its configurations: a chunk only partially written (interrupted while writing) is played again as a whole
+    chunks = [
+        (start, list(range(start, min(start + chunk_size, len(permutations_dicts)))))
+        for start in range(0, len(permutations_dicts), chunk_size)
+        ]
+    chunks = [(start, indices) for start, indices in chunks if not all(idx in winning_ratio for idx in indices)]
+    for _, indices in chunks:
+        for idx in indices:
+            winning_ratio.pop(idx, None)
+    tasks = [
+        (
+            nim_game._rows.copy(), 
+            [permutations_dicts[idx] for idx in indices], 
+            n_games, 
+            None if seed is None else int(np.random.SeedSequence(seed, spawn_key = (start,)).generate_state(1)[0]), 
+            vectorized, 
+            nim_game.rule_set
+        ) for start, indices in chunks
+        ]
+
+    with tqdm(total = len(permutations_dicts), initial = len(winning_ratio), desc = 'Configuration') as pbar:
+        def register(indices, ratios): 
+            winning_ratio.update(zip(indices, ratios))
+            if results_path is not None:
+                write_tournament_results(results_path, indices, ratios)
+            pbar.update(len(indices))
+
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers = n_workers) as pool:
+                futures = {pool.submit(play_configurations, *task): indices for task, (_, indices) in zip(tasks, chunks)}
+                for future in as_completed(futures):
+                    register(futures[future], future.result())
+        else:
+            for task, (_, indices) in zip(tasks, chunks):
+                register(indices, play_configurations(*task))
+
+    # storing information on percentage of games won
+    championship["success"] = [winning_ratio[idx] for idx in range(len(permutations_dicts))]
 
-    for dict_ in tqdm(permutations_dicts, desc = 'Configuration'):    
+    return (championship)
+
+def rules_racing(
+    nim_game:object, 
+    initial_games:int=10, 
+    max_games:int=1000, 
+    eta:Union[int, None]=2, 
+    confidence:float=0.95, 
+    seed:int=None, 
+    vectorized:bool=True)->"pd.DataFrame":
+    """Adaptive alternative to `rules_tournament`, over the same grid of parameters.
+    Configurations are raced against each other: at each round, every configuration still in the race plays as many new games as
+    it has played so far (`initial_games` in the first round) and the ones whose upper confidence bound on the winning ratio is smaller
+    than the best lower confidence bound are eliminated (Hoeffding bounds, union bound over configurations and rounds).
+    When `eta` is not None, only the best 1/`eta` of the remaining configurations (by winning ratio) are kept as well (successive halving).
+    The race stops when the best configuration is statistically separated from the others or when it has played `max_games` games.
+
+    Args:
+        nim_game (object, Nim): Nim game as per nim interface.
+        initial_games (int, optional): number of games played by each configuration in the first round. Defaults to 10.
+        max_games (int, optional): maximal number of games played by a configuration. Defaults to 1000.
+        eta (Union[int, None], optional): halving rate, None for racing only. Defaults to 2.
+        confidence (float, optional): confidence level of the bounds. Defaults to 0.95.
+        seed (int, optional): random seed. Defaults to None.
+        vectorized (bool, optional): whether to play games in lockstep with `play_against_random_batch`. Defaults to True.
+
+    Returns:
+        pd.DataFrame: DataFrame containing experiments results, with the same columns as the one of `rules_tournament`.
+                      `success` is the winning ratio over the games each configuration played. Attribute `attrs` stores 
+                      the index of the best configuration (`best`), the number of games played (`games_played`), the number of games 
+                      the exhaustive grid search would play with `max_games` games per configuration (`grid_games`) and 
+                      whether the best configuration is statistically separated from the others (`separated`).
+    """
+    permutations_dicts = rules_grid(nim_game)
+
+    # numpy, pandas and tqdm are only imported when needed, so that importing this module is cheap
+    import numpy as np
+    import pandas as pd
+    from tqdm import tqdm
+    championship = pd.DataFrame(permutations_dicts)
+    n_configs = len(permutations_dicts)
+    # union bound over configurations and rounds
+    max_rounds = int(np.ceil(np.log2(max_games / initial_games))) + 1
+    log_term = np.log(2 * n_configs * max_rounds / (1 - confidence))
+
+    wins, games = np.zeros(n_configs), np.zeros(n_configs)
+    alive = np.arange(n_configs)
+    separated = False
+    n_round = 0
+
+    with tqdm(desc = 'Racing') as pbar:
+        while True:
+            # each configuration in the race doubles its number of games
+            n_games = int(min(max(initial_games, games[alive[0]]), max_games - games[alive[0]]))
+            round_seed = None if seed is None else int(np.random.SeedSequence(seed, spawn_key = (n_round,)).generate_state(1)[0])
+            ratios = play_configurations(
+                nim_game._rows.copy(), [permutations_dicts[idx] for idx in alive], n_games, seed = round_seed, vectorized = vectorized, 
+                rule_set = nim_game.rule_set
+                )
+            wins[alive] += np.round(np.array(ratios) * n_games)
+            games[alive] += n_games
+            n_round += 1
+
+            means = wins[alive] / games[alive]
+            half_width = np.sqrt(log_term / (2 * games[alive]))
+            # racing: dropping configurations which are worse than the best one with high probability
+            contenders = means + half_width >= (means - half_width).max()
+            separated = contenders.sum() == 1
+            alive, means = alive[contenders], means[contenders]
+
+            # successive halving: keeping the best 1/eta configurations only
+            if eta is not None and not separated:
+                alive = alive[np.argsort(-means, kind = "stable")[:max(1, int(np.ceil(len(alive) / eta)))]]
+
+            pbar.update(); pbar.set_postfix(configurations = len(alive), games = int(games.sum()))
+            if len(alive) == 1 or games[alive[0]] >= max_games:
+                break
+
+    championship["success"] = np.divide(wins, games, out = np.zeros(n_configs), where = games > 0)
+    # best configuration among the ones still in the race
+    championship.attrs = {
+        "best": int(alive[np.argmax(championship["success"].values[alive])]),
+        "games_played": int(games.sum()),
+        "grid_games": int(max_games * n_configs),
+        "separated": bool(separated)
+    }
+
+    return (championship)
+
+def play_configurations(rows:list, configurations:list, n_games:int, seed:int=None, vectorized:bool=False, rule_set:RuleSet=None)->list:
+    """This function plays `n_games` games against the random agent for each configuration of the rule-based agent.
+
+    Args:
+        rows (list): starting configuration of the Nim games.
+        configurations (list): list of dictionaries with the parameters of the rule-based agent (k, alpha, endgame_nim, strategy).
+        n_games (int): number of games for each configuration.
+        seed (int, optional): random seed. Defaults to None.
+        vectorized (bool, optional): whether to play the games of all the configurations in lockstep with `play_against_random_batch` 
+                                     rather than with `rules_gym`. Defaults to False.
+        rule_set (RuleSet or list, optional): rules of the games (see `Nim`). Defaults to None (regular Nim).
+
+    Returns:
+        list: winning ratio of each configuration.
+    """
+    import numpy as np
+    if vectorized:
+        rng = np.random.default_rng(seed)
+        # at most ~250k games are played in lockstep
+        group = max(1, 2**18 // n_games)
+        return np.concatenate([
+            play_against_random_batch(rows, configurations[start:start + group], n_games, rng = rng, rule_set = rule_set).mean(axis = 1)
+            for start in range(0, len(configurations), group)
+            ]).tolist()
+
+    # local generator, not to reseed the `random` module of the caller
+    rng = random.Random(seed)
+
+    winning_ratio = []
+    for dict_ in configurations:
         # using dict as kwargs
-        nim_gym = Nim(
-            nim_game._rows.copy(), agent = 'rules', **dict_)
+        nim_gym = Nim(rows.copy(), agent = 'rules', rule_set = rule_set, **dict_)
         # array in which each element corresponds to either 1 (win) or 0 (loss)
-        palmares = rules_gym(nim_gym, n_games = n_games)
+        palmares = rules_gym(nim_gym, n_games = n_games, rng = rng)
         winning_ratio.append(sum(palmares) / len(palmares))
     
-    # storing information on percentage of games won
-    championship["success"] = winning_ratio
+    return winning_ratio
 
-    return (championship)
+def check_tournament_parameters(results_path:str, parameters:dict)->None:
+    """This function checks that the results streamed to `results_path` come from a tournament with the same `parameters`
+    (initial rows, rule set, size of the grid, number of games, seed, ...), which are stored in `<results_path>.json`.
+    The parameters are written when no results are stored yet.
 
-def rules_gym(test_agent:object, n_games:int=100):
+    Args:
+        results_path (str): CSV file with the results of the tournament.
+        parameters (dict): parameters of the tournament about to be played (JSON-serializable).
+
+    Raises:
+        ValueError: when the stored parameters differ from `parameters`, or results are stored without parameters.
+    """
+    parameters_path = results_path + ".json"
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0:
+        with open(parameters_path, "w") as f:
+            json.dump(parameters, f)
+        return
+    
+    if not os.path.exists(parameters_path):
+        raise ValueError(f"{results_path} has no {parameters_path}: cannot check which tournament its results come from, please use another file")
+    with open(parameters_path) as f:
+        stored = json.load(f)
+    different = {key: (stored.get(key), value) for key, value in parameters.items() if stored.get(key) != value}
+    if different:
+        raise ValueError(
+            f"{results_path} stores a tournament with different parameters ("
+            + ", ".join(f"{key}: {old} instead of {new}" for key, (old, new) in different.items())
+            + "), please use another file"
+            )
+
+def read_tournament_results(results_path:str)->dict:
+    """This function reads the results streamed by `rules_tournament`. 
+    Should an interruption have left the last line incomplete, that line is removed from the file.
+
+    Args:
+        results_path (str): CSV file with columns `config` (position of the configuration in the grid) and `success`.
+
+    Returns:
+        dict: configuration index -> winning ratio. Empty if the file does not exist.
+    """
+    if not os.path.exists(results_path):
+        return dict()
+    
+    with open(results_path, "r+") as f:
+        content = f.read()
+        if not content.endswith("\n"):
+            # truncating the file right after the last complete line
+            content = content[:content.rfind("\n") + 1]
+            f.seek(0); f.truncate(); f.write(content)
+    lines = content.splitlines()[1:]
+
+    return {int(config): float(success) for config, success in (line.strip().split(",") for line in lines)}
+
+def write_tournament_results(results_path:str, indices:list, ratios:list)->None:
+    """This function appends the results of some configurations to the CSV file `results_path`.
+
+    Args:
+        results_path (str): destination CSV file. The header is written when the file does not exist.
+        indices (list): position of the configurations in the grid.
+        ratios (list): winning ratio of each configuration.
+    """
+    new_file = not os.path.exists(results_path)
+    with open(results_path, "a") as f:
+        f.write(("config,success\n" if new_file else "") + "".join(f"{idx},{ratio}\n" for idx, ratio in zip(indices, ratios)))
+
+def rules_gym(test_agent:object, n_games:int=100, rng:random.Random=random):
     """Gym for the rule-based agent. The goal is to find the one which performs better than the random agent.
 
     Args:
         test_agent (object, Nim):  Nim game as per nim interface.
         n_games (int, optional): total number of games. Defaults to 100.
+        rng (random.Random, optional): source of randomness of both agents. Defaults to the `random` module.
     """
     original_nim = test_agent._rows.copy()
     palmares = []
@@ -228,14 +531,14 @@ def rules_gym(test_agent:object, n_games:int=100):
         test_agent._rows = original_nim.copy()
         while sum(test_agent._rows) > 0: # as long as one can play, play
             # test agent performs best move according to rules
-            best_move_rules(test_agent, inplace = True)                
+            best_move_rules(test_agent, inplace = True, rng = rng)                
             
             if sum(test_agent._rows) == 0:
                 palmares.append(1)
                 break
             
-            row = random.choice([r for r, c in enumerate(test_agent._rows) if c > 0])
-            num_objects = random.randint(1, test_agent._rows[row])
+            row = rng.choice([r for r, c in enumerate(test_agent._rows) if c > 0])
+            num_objects = rng.choice(test_agent.rule_set.removals(test_agent._rows[row]))
             # control agent performs random move
             test_agent.nimming(row, num_objects)
 
@@ -245,6 +548,200 @@ def rules_gym(test_agent:object, n_games:int=100):
 
     return (palmares)
 
+def best_move_rules_batch(
+    rows:"np.ndarray", 
+    k:int=1, 
+    alpha:float=0., 
+    endgame_nim:float=0.6, 
+    strategy:Union[str, None]="sum", 
+    rng:"np.random.Generator"=None, 
+    rule_set:RuleSet=None)->"np.ndarray":
+    """Vectorized version of `best_move_rules`, playing the best move of the rule-based agent in many positions at once.
+    Moves are the same ones `best_move_rules` would play, including ties and the restriction to moves allowed by `rule_set`, 
+    except for the random draws of the opening.
+    Each parameter can either be a scalar or an array with one value per position (i.e., one agent per position).
+
+    Args:
+        rows (np.ndarray): 2D array of shape (games, heaps), each row being a non-terminal Nim configuration.
+        k (int, optional): number of heaps to eliminate during the opening. Defaults to 1.
+        alpha (float, optional): probability of nimming the biggest heap during the opening. Defaults to 0.
+        endgame_nim (float, optional): percentage of elements to nim in endgame. Defaults to 0.6.
+        strategy (Union[str, None], optional): strategy used to weigh pairwise variances, one in None, "min", "max" or "sum". Defaults to "sum".
+        rng (np.random.Generator, optional): source of randomness. Defaults to None (a new, unseeded generator).
+        rule_set (RuleSet or list, optional): rules of the games (see `Nim`). Defaults to None (regular Nim).
+
+    Returns:
+        np.ndarray: configurations after the best move.
+    """
+    import numpy as np
+    rng = rng if rng is not None else np.random.default_rng()
+    k, alpha, endgame_nim = np.asarray(k), np.asarray(alpha), np.asarray(endgame_nim)
+
+    rows = np.array(rows, dtype=np.int64)
+    games = np.arange(len(rows))
+    biggest_heap = rows.argmax(axis=1)
+
+    endgame = (rows > 1).sum(axis=1) <= 1
+    opening = ~endgame & ((rows <= 1).sum(axis=1) < k)
+    midgame = ~endgame & ~opening
+
+    # opening: wiping either the biggest heap (probability alpha) or the smallest one
+    wipe_biggest = rng.random(len(rows)) < alpha
+    wiped = np.where(wipe_biggest, biggest_heap, rows.argmin(axis=1))
+
+    # midgame: pair of populated heaps with maximal weighted pairwise variance, first pair in case of ties
+    first, second = np.triu_indices(rows.shape[1], k=1)
+    a, b = rows[:, first], rows[:, second]
+    # (a - b)**2 is twice the pairwise variance, which does not change the maximal pair
+    weighted_variance = (a - b) ** 2 * strategy_weights(a, b, strategy)
+    weighted_variance = np.where((a > 0) & (b > 0), weighted_variance, -1)
+    pair = weighted_variance.argmax(axis=1)
+    low_val, high_val = np.minimum(a[games, pair], b[games, pair]), np.maximum(a[games, pair], b[games, pair])
+    
+    # first heaps holding the values of the pair
+    low_idx = (rows == low_val[:, None]).argmax(axis=1)
+    high_idx = (rows == high_val[:, None]).argmax(axis=1)
+    # configurations like [n, n, ..., n]: the second populated heap is nimmed
+    populated = rows > 0
+    all_equal_ = (np.where(populated, rows, high_val[:, None]) == high_val[:, None]).all(axis=1)
+    second_populated = np.where(populated.cumsum(axis=1) == 2, 1, 0).argmax(axis=1)
+    high_idx = np.where(all_equal_, second_populated, high_idx)
+
+    # endgame: nimming a percentage of the biggest heap (at least one object)
+    biggest = rows[games, biggest_heap]
+    endgame_objects = np.maximum(np.ceil(endgame_nim * biggest), 1).astype(np.int64)
+
+    target = rows.copy()
+    target[games[opening], wiped[opening]] = 0
+    target[games[midgame], high_idx[midgame]] = np.minimum(np.maximum(1, low_val), high_val - 1)[midgame]
+    target[games[endgame], biggest_heap[endgame]] -= endgame_objects[endgame]
+
+    rule_set = RuleSet.parse(rule_set)
+    if not rule_set.is_plain:
+        # each move changes a single heap: removing the largest allowed number of objects not exceeding the desired one
+        target = rows - rule_set.largest_removals(int(rows.max(initial = 0)))[rows - target]
+    
+    return target
+
+def strategy_weights(a:"np.ndarray", b:"np.ndarray", strategy:Union[str, None, Iterable])->"np.ndarray":
+    """This function returns the weights of the pairwise variances between heaps `a` and `b` (2D arrays of shape (games, pairs)).
+
+    Args:
+        a (np.ndarray): number of objects in the first heap of each pair.
+        b (np.ndarray): number of objects in the second heap of each pair.
+        strategy (Union[str, None, Iterable]): either a single strategy (None, "min", "max" or "sum") or one strategy per game.
+
+    Returns:
+        np.ndarray: weights, with the same shape as `a` and `b`.
+    """
+    import numpy as np
+    functions = {"min": np.minimum, "max": np.maximum, "sum": np.add}
+
+    if strategy is None or isinstance(strategy, str):
+        if strategy is not None and strategy.lower() not in functions: 
+            raise ValueError('Strategy must be one of ["min", "max", "sum"]. Check documentation for guidance in the choice') 
+        return np.ones_like(a) if strategy is None else functions[strategy.lower()](a, b)
+
+    strategy = np.asarray(strategy, dtype=object)
+    names = set(strategy.tolist())
+    if len(names) == 1:
+        # same strategy for every game
+        return strategy_weights(a, b, names.pop())
+    if not {name.lower() for name in names if name is not None} <= set(functions): 
+        raise ValueError('Strategy must be one of ["min", "max", "sum"]. Check documentation for guidance in the choice') 
+    
+    weights = np.ones_like(a)
+    for name in names - {None}:
+        games = strategy == name
+        weights[games] = functions[name.lower()](a[games], b[games])
+    return weights
+
+def random_move_batch(rows:"np.ndarray", rng:"np.random.Generator"=None, rule_set:RuleSet=None)->"np.ndarray":
+    """Vectorized random agent: in each position, nim a random (allowed) number of objects from a random non-empty heap.
+
+    Args:
+        rows (np.ndarray): 2D array of shape (games, heaps), each row being a non-terminal Nim configuration.
+        rng (np.random.Generator, optional): source of randomness. Defaults to None (a new, unseeded generator).
+        rule_set (RuleSet or list, optional): rules of the games (see `Nim`). Defaults to None (regular Nim).
+
+    Returns:
+        np.ndarray: configurations after the random move.
+    """
+    import numpy as np
+    rng = rng if rng is not None else np.random.default_rng()
+    rows = np.array(rows, dtype=np.int64)
+    games = np.arange(len(rows))
+
+    populated = rows > 0
+    # picking the n-th populated heap, n being uniform in [0, number of populated heaps)
+    nth = (rng.random(len(rows)) * populated.sum(axis=1)).astype(np.int64)
+    row = (populated.cumsum(axis=1) > nth[:, None]).argmax(axis=1)
+    heap = rows[games, row]
+    # allowed removals, in increasing order, and how many of them are possible on a heap of each size
+    mask = RuleSet.parse(rule_set).mask(int(heap.max(initial = 0)))
+    allowed, n_allowed = np.flatnonzero(mask), np.cumsum(mask)
+    num_objects = allowed[(rng.random(len(rows)) * n_allowed[heap]).astype(np.int64)]
+
+    rows[games, row] -= num_objects
+    return rows
+
+def rules_gym_batch(test_agent:object, n_games:int=10_000, rng:"np.random.Generator"=None)->"np.ndarray":
+    """Vectorized version of `rules_gym`: all the games are played in lockstep, as rows of a (games, heaps) array.
+    Finished games are masked out.
+
+    Args:
+        test_agent (object, Nim):  Nim game as per nim interface.
+        n_games (int, optional): total number of games. Defaults to 10000.
+        rng (np.random.Generator, optional): source of randomness. Defaults to None (a new, unseeded generator).
+
+    Returns:
+        np.ndarray: array in which each element corresponds to either 1 (win) or 0 (loss).
+    """
+    params = {"k": test_agent._k, "alpha": test_agent.alpha, "endgame_nim": test_agent.endgame_nim, "strategy": test_agent.strategy}
+    return play_against_random_batch(test_agent._rows, [params], n_games = n_games, rng = rng, rule_set = test_agent.rule_set)[0]
+
+def play_against_random_batch(rows:list, configurations:list, n_games:int, rng:"np.random.Generator"=None, rule_set:RuleSet=None)->"np.ndarray":
+    """This function plays `n_games` games of each configuration of the rule-based agent against the random agent.
+    The games of all the configurations are played in lockstep, as rows of a (configurations * games, heaps) array.
+
+    Args:
+        rows (list): starting configuration of the Nim games.
+        configurations (list): list of dictionaries with the parameters of the rule-based agent (k, alpha, endgame_nim, strategy).
+        n_games (int): number of games for each configuration.
+        rng (np.random.Generator, optional): source of randomness. Defaults to None (a new, unseeded generator).
+        rule_set (RuleSet or list, optional): rules of the games (see `Nim`). Defaults to None (regular Nim).
+
+    Returns:
+        np.ndarray: array of shape (configurations, games) in which each element corresponds to either 1 (win) or 0 (loss).
+    """
+    import numpy as np
+    rng = rng if rng is not None else np.random.default_rng()
+    rule_set = RuleSet.parse(rule_set)
+    # one set of parameters per game
+    params = {
+        key: np.repeat(np.array([config.get(key, default) for config in configurations], dtype=dtype), n_games)
+        for key, default, dtype in [("k", 1, np.int64), ("alpha", 0., float), ("endgame_nim", 0.6, float), ("strategy", "sum", object)]
+        }
+
+    rows = np.tile(np.array(rows, dtype=np.int64), (len(configurations) * n_games, 1))
+    palmares = np.zeros(len(rows), dtype=np.int64)
+    # games still being played
+    active = np.flatnonzero(rows.sum(axis=1) > 0)
+
+    while len(active) > 0:
+        # test agent performs best move according to rules
+        rows[active] = best_move_rules_batch(rows[active], rng=rng, rule_set=rule_set, **{key: value[active] for key, value in params.items()})
+        finished = rows[active].sum(axis=1) == 0
+        palmares[active[finished]] = 1
+        active = active[~finished]
+
+        # control agent performs random move
+        rows[active] = random_move_batch(rows[active], rng=rng, rule_set=rule_set)
+        # once control agent wins, stop playing and register loss
+        active = active[rows[active].sum(axis=1) > 0]
+    
+    return palmares.reshape(len(configurations), n_games)
+
 def all_equal(l:Iterable)->bool:
     """This function returns a boolean value indicating whether or not a given list contains all equal values.
 
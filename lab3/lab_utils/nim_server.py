@@ -0,0 +1,303 @@
+from lab_utils.nim import Nim
+from lab_utils.nim_arena import ArenaAgent
+from lab_utils.nim_grundy import RuleSet
+from lab_utils.nim_rl import NimAI, train_exact
+from lab_utils.nim_store import agent_path, is_compatible, load_agent, save_agent
+import asyncio
+import json
+import os
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# protocol: one JSON object per line, in both directions. Requests are
+#   {"op": "ping"}
+#   {"op": "move", "agent": "omni", "rows": [1, 3, 5], ...agent parameters (e.g., "alpha": 0.5 when agent = rules)}
+#   {"op": "match", "agents": ["omni", "random"], "rows": [1, 3, 5], "params": [{...}, {...}]}
+# both "move" and "match" accept an optional "rule_set", i.e. the subtraction set of the game (regular Nim when missing).
+# and are answered with {"ok": true, ...} or {"ok": false, "error": "..."}.
+# When a request carries an "id", the same "id" is sent back in the response.
+# Lines longer than the limit of the stream (64 KiB by default) are discarded and answered with an error.
+
+# agents whose decisions are offloaded to the worker pool, not to block the event loop
+CPU_BOUND_AGENTS = {"minmax"}
+
+def _minmax_move(rows:list, rule_set:RuleSet)->list:
+    """
+        Minmax move computed in a worker process.
+    """
+    return ArenaAgent("minmax", len(rows), rule_set = rule_set).move(rows)
+
+def _load_or_train_rl(store:str, number_of_heaps:int, rule_set:RuleSet)->NimAI:
+    """
+        Load the RL agent playing games with `number_of_heaps` heaps and `rule_set` rules from `store`, if any. 
+        Otherwise, solve the game with `train_exact` and store the resulting agent. Runs in a worker process.
+    """
+    path = agent_path(store, number_of_heaps, rule_set = rule_set) if store is not None else None
+    if path is not None and is_compatible(path, number_of_heaps, rule_set = rule_set):
+        return load_agent(path, mmap = False)
+    ai = train_exact(NimAI(number_of_heaps = number_of_heaps, rule_set = rule_set), number_of_heaps = number_of_heaps)
+    if path is not None:
+        save_agent(ai, path)
+    return ai
+
+class NimServer:
+    def __init__(
+        self, 
+        host:str="127.0.0.1", 
+        port:int=8765, 
+        n_workers:int=2, 
+        rl_store:str=None, 
+        max_heaps:int=7, 
+        max_agents:int=256, 
+        max_rl_agents:int=8):
+        """
+            Long-lived asyncio server answering best-move and full-match requests from many concurrent clients.
+            Agents (and Q-tables) are built once and kept in memory; cheap decisions are taken on the event loop,
+            whereas searches and trainings run in a pool of `n_workers` processes.
+
+        Args:
+            host (str, optional): address the server listens on. Defaults to "127.0.0.1".
+            port (int, optional): port the server listens on (0 picks a free port). Defaults to 8765.
+            n_workers (int, optional): number of worker processes. Defaults to 2.
+            rl_store (str, optional): directory where RL agents are loaded from and stored to. Defaults to None (not stored).
+            max_heaps (int, optional): maximal number of heaps of the configurations served, since the cost of searches and
+                                       trainings grows exponentially with it (exact RL training takes ~1 s with 7 heaps). Defaults to 7.
+            max_agents (int, optional): maximal number of agents kept in memory (least recently used ones are dropped). Defaults to 256.
+            max_rl_agents (int, optional): maximal number of RL agents (Q-tables) kept in memory. Defaults to 8.
+        """
+        self.host = host
+        self.port = port
+        self.n_workers = n_workers
+        self.rl_store = rl_store
+        self.max_heaps, self.max_agents, self.max_rl_agents = max_heaps, max_agents, max_rl_agents
+        self.pool = None
+        self.server = None
+        # LRU caches, (agent name, number of heaps, parameters) -> ArenaAgent
+        self._agents = OrderedDict()
+        # and (number of heaps, rule set) -> task loading/training the corresponding RL agent, shared by concurrent requests
+        self._rl_agents = OrderedDict()
+        self.requests_served = 0
+
+    async def start(self)->None:
+        self.pool = ProcessPoolExecutor(max_workers = self.n_workers)
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # actual port, when port 0 was requested
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self)->None:
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self)->None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures = True)
+
+    def _cache(self, cache:OrderedDict, key:tuple, value:object, max_size:int)->None:
+        """
+            Store `value` in the LRU `cache`, evicting its least recently used entries beyond `max_size`.
+            Pending RL loadings/trainings (futures not done yet) are never evicted, since concurrent requests wait for them.
+        """
+        cache[key] = value
+        for old in list(cache):
+            if len(cache) <= max_size:
+                break
+            if old != key and not (isinstance(cache[old], asyncio.Future) and not cache[old].done()):
+                del cache[old]
+
+    async def _rl_agent(self, number_of_heaps:int, rule_set:RuleSet)->NimAI:
+        key = (number_of_heaps, rule_set)
+        if key not in self._rl_agents:
+            loop = asyncio.get_running_loop()
+            self._cache(self._rl_agents, key, asyncio.ensure_future(
+                loop.run_in_executor(self.pool, _load_or_train_rl, self.rl_store, number_of_heaps, rule_set)
+                ), self.max_rl_agents)
+        else:
+            self._rl_agents.move_to_end(key)
+        try:
+            return await asyncio.shield(self._rl_agents[key])
+        except Exception:
+            # do not cache failures
+            self._rl_agents.pop(key, None)
+            raise
+
+    async def _agent(self, name:str, number_of_heaps:int, rule_set:RuleSet, params:dict)->ArenaAgent:
+        key = (name, number_of_heaps, rule_set, tuple(sorted(params.items())))
+        if key not in self._agents:
+            if name == "rl":
+                params = {**params, "ai": await self._rl_agent(number_of_heaps, rule_set)}
+            self._cache(self._agents, key, ArenaAgent(name, number_of_heaps, rule_set = rule_set, **params), self.max_agents)
+        else:
+            self._agents.move_to_end(key)
+        return self._agents[key]
+
+    async def best_move(self, name:str, rows:list, params:dict=None, rule_set:RuleSet=None)->list:
+        """
+            Return the configuration obtained when agent `name` moves in the (non-terminal) configuration `rows`, with `rule_set` rules.
+        """
+        name = name.lower()
+        rule_set = RuleSet.parse(rule_set)
+        if sum(rows) == 0 or min(rows) < 0:
+            raise ValueError(f"Invalid configuration {rows}: no move is possible")
+        if len(rows) > self.max_heaps:
+            raise ValueError(f"Configurations with {len(rows)} heaps are not served, the maximum is {self.max_heaps}")
+        if name in CPU_BOUND_AGENTS:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, _minmax_move, rows, rule_set)
+        agent = await self._agent(name, len(rows), rule_set, params or dict())
+        return list(agent.move(rows))
+
+    async def match(self, names:list, rows:list, params:list=None, rule_set:RuleSet=None)->dict:
+        """
+            Play a full match between the agents in `names` (the first one moving first), starting from `rows`, with `rule_set` rules.
+
+        Returns:
+            dict: index of the winner and list of the configurations reached during the match.
+        """
+        params = params or [dict(), dict()]
+        rule_set = RuleSet.parse(rule_set)
+        history = [list(rows)]
+        turn = 0
+        while sum(rows) > 0:
+            new_rows = await self.best_move(names[turn], rows, params[turn], rule_set)
+            Nim(rows, rule_set = rule_set).nimming(target = new_rows)
+            rows = new_rows
+            history.append(rows)
+            turn = 1 - turn
+
+        return {"winner": 1 - turn, "history": history}
+
+    async def _dispatch(self, request:dict)->dict:
+        op = request.get("op")
+        if op == "ping":
+            return {"requests_served": self.requests_served}
+        elif op == "move":
+            params = {k: v for k, v in request.items() if k not in {"op", "id", "agent", "rows", "rule_set"}}
+            return {"rows": await self.best_move(request["agent"], list(request["rows"]), params, request.get("rule_set"))}
+        elif op == "match":
+            return await self.match(request["agents"], list(request["rows"]), request.get("params"), request.get("rule_set"))
+        else:
+            raise ValueError(f"Unknown op {op}! Please use one in ['ping', 'move', 'match']")
+
+    async def _handle_request(self, line:bytes)->dict:
+        request = dict()
+        try:
+            request = json.loads(line)
+            response = {"ok": True, **await self._dispatch(request)}
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        self.requests_served += 1
+        return response
+
+    async def _handle_client(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter)->None:
+        # requests of a single connection are answered in order
+        try:
+            while True:
+                try:
+                    line = await read_line(reader)
+                except ValueError as e:
+                    # the request was discarded, the connection is still usable
+                    self.requests_served += 1
+                    response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                else:
+                    if not line:
+                        break
+                    if not line.strip():
+                        continue
+                    response = await self._handle_request(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def read_line(reader:asyncio.StreamReader)->bytes:
+    """
+        Read a line (empty at the end of the stream). Lines longer than the limit of `reader` are discarded up to their end,
+        so that the next line can still be read, and a ValueError is raised.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        # end of the stream, possibly after a last line without newline
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b"\n")
+            break
+        except asyncio.IncompleteReadError:
+            break
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+    raise ValueError("Line longer than the limit of the stream, discarded")
+
+async def request(reader:asyncio.StreamReader, writer:asyncio.StreamWriter, message:dict)->dict:
+    """
+        Send a request to the server over an open connection and wait for its response.
+        Raise a ValueError if the response is longer than the limit of `reader` (see `asyncio.open_connection`).
+    """
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+    line = await read_line(reader)
+    if not line:
+        raise ConnectionError("Connection closed by the server")
+    return json.loads(line)
+
+async def load_test(
+    host:str="127.0.0.1",
+    port:int=8765,
+    n_clients:int=32,
+    n_requests:int=100,
+    message:dict=None)->dict:
+    """
+        Load generator: `n_clients` concurrent clients, each with its own connection, send `n_requests` requests each, one after the other.
+
+    Args:
+        host (str, optional): server address. Defaults to "127.0.0.1".
+        port (int, optional): server port. Defaults to 8765.
+        n_clients (int, optional): number of concurrent clients. Defaults to 32.
+        n_requests (int, optional): number of requests per client. Defaults to 100.
+        message (dict, optional): request sent by the clients. Defaults to an omni move on Nim(5).
+
+    Returns:
+        dict: requests/sec, latency percentiles (ms) and number of failed requests.
+    """
+    message = message if message is not None else {"op": "move", "agent": "omni", "rows": Nim(5)._rows}
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(n_requests):
+                start = time.perf_counter()
+                response = await request(reader, writer, message)
+                latencies.append(time.perf_counter() - start)
+                errors += not response["ok"]
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(n_clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = 1e3 * np.array(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": np.percentile(latencies, 50),
+        "p99_ms": np.percentile(latencies, 99),
+        "max_ms": latencies.max()
+    }
@@ -0,0 +1,126 @@
+from lab_utils.nim_rl import NimAI
+from lab_utils.nim_grundy import RuleSet
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+
+# file layout: MAGIC | header length (uint32, little endian) | JSON header | padding | Q-values | padding | state ranks (sparse tables only)
+MAGIC = b"NIMQ\x01"
+ALIGNMENT = 64
+
+def _aligned(offset:int)->int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def agent_path(store:str, number_of_heaps:int, symmetric:bool=True, rule_set:RuleSet=None)->str:
+    """
+        Return the path where the agent playing games with `number_of_heaps` heaps (and `rule_set` rules) is stored in the directory `store`.
+    """
+    rule_set = RuleSet.parse(rule_set)
+    rules = "" if rule_set.is_plain else "_s" + "-".join(map(str, rule_set.subtraction_set))
+    return os.path.join(store, f"nim_rl_{number_of_heaps}_{'canonical' if symmetric else 'ordered'}{rules}.nimq")
+
+def save_agent(agent:NimAI, path:str)->None:
+    """
+        Serialize a trained agent (Q-table, hyperparameters and training history) to a compact binary file.
+        The file is written next to `path` and then moved in place, so that agents memory-mapped from `path` are not affected.
+
+    Args:
+        agent (NimAI): agent to store.
+        path (str): destination path.
+    """
+    values = agent.q.values
+    slots = agent.q.slots
+    if slots is not None:
+        # only allocated rows are stored, together with the rank of the corresponding state
+        values = values[:len(slots)]
+        ranks = np.empty(len(slots), dtype=np.int64)
+        ranks[np.fromiter(slots.values(), dtype=np.int64, count=len(slots))] = np.fromiter(slots.keys(), dtype=np.int64, count=len(slots))
+
+    header = json.dumps({
+        "hyperparameters": agent.hyperparameters,
+        "episodes": agent.episodes,
+        "solved": agent.solved,
+        "dtype": values.dtype.str,
+        "shape": list(values.shape),
+        "sparse": slots is not None
+    }).encode()
+
+    values_offset = _aligned(len(MAGIC) + 4 + len(header))
+    ranks_offset = _aligned(values_offset + values.nbytes)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        f.seek(values_offset)
+        f.write(np.ascontiguousarray(values).tobytes())
+        if slots is not None:
+            f.seek(ranks_offset)
+            f.write(ranks.tobytes())
+    # temporary files are only readable by their owner
+    os.chmod(f.name, 0o644)
+    os.replace(f.name, path)
+
+def read_header(path:str)->dict:
+    """
+        Return the header of a stored agent, without loading its Q-table.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a stored Nim agent")
+        header_length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length))
+    
+    header["values_offset"] = _aligned(len(MAGIC) + 4 + header_length)
+    return header
+
+def load_agent(path:str, mmap:bool=True)->NimAI:
+    """
+        Load an agent stored with `save_agent`.
+
+    Args:
+        path (str): stored agent.
+        mmap (bool, optional): if True, the Q-table is memory-mapped (copy-on-write), so that it is only read from disk when accessed 
+                               and further training never modifies the file. If False, it is loaded in memory. Defaults to True.
+
+    Returns:
+        NimAI: stored agent.
+    """
+    header = read_header(path)
+    dtype, shape = np.dtype(header["dtype"]), tuple(header["shape"])
+    values_offset = header["values_offset"]
+
+    if mmap and np.prod(shape) > 0:
+        values = np.memmap(path, dtype=dtype, mode="c", offset=values_offset, shape=shape)
+    else:
+        values = np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=values_offset).reshape(shape)
+
+    if header["sparse"]:
+        ranks_offset = _aligned(values_offset + values.nbytes)
+        ranks = np.fromfile(path, dtype=np.int64, count=shape[0], offset=ranks_offset)
+        agent = NimAI(**header["hyperparameters"], q_values=values, q_slots=dict(zip(ranks.tolist(), range(len(ranks)))))
+    else:
+        agent = NimAI(**header["hyperparameters"], q_values=values)
+
+    agent.episodes = header["episodes"]
+    agent.solved = header["solved"]
+    return agent
+
+def is_compatible(path:str, number_of_heaps:int, max_objects:int=None, symmetric:bool=True, rule_set:RuleSet=None)->bool:
+    """
+        Whether the agent stored in `path` (if any) plays games with `number_of_heaps` heaps of at most `max_objects` objects, with `rule_set` rules.
+    """
+    if not os.path.exists(path):
+        return False
+    
+    hyperparameters = read_header(path)["hyperparameters"]
+    max_objects = max_objects if max_objects is not None else (number_of_heaps - 1) * 2 + 1
+    return (
+        hyperparameters["number_of_heaps"] == number_of_heaps 
+        and hyperparameters["max_objects"] == max_objects 
+        and hyperparameters["symmetric"] == symmetric
+        # agents stored before rule sets were introduced play the regular Nim
+        and RuleSet.parse(hyperparameters.get("rule_set")) == RuleSet.parse(rule_set)
+    )
@@ -0,0 +1,42 @@
+from lab_utils.nim_server import NimServer, load_test
+import argparse
+import asyncio
+import json
+import os
+
+def parse_args()->object:
+    """args function.
+
+    Returns:
+        object: args parser
+    """
+    parser = argparse.ArgumentParser(description="Local Nim game server, and load generator to benchmark it")
+    parser.add_argument("--host", default="127.0.0.1", type=str, help="Address the server listens on")
+    parser.add_argument("--port", default=8765, type=int, help="Port the server listens on")
+    parser.add_argument("--n-workers", default=2, type=int, help="Number of worker processes running searches and trainings")
+    parser.add_argument("--rl-store", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"), type=str, help="Directory where RL agents are stored")
+    parser.add_argument("--max-heaps", default=7, type=int, help="Maximal number of heaps of the configurations served")
+    parser.add_argument("--load-test", default=False, action="store_true", help="Run the load generator against a running server instead of serving")
+    parser.add_argument("--n-clients", default=32, type=int, help="When load-testing, number of concurrent clients")
+    parser.add_argument("--n-requests", default=100, type=int, help="When load-testing, number of requests per client")
+    parser.add_argument("--message", default=None, type=str, help="When load-testing, JSON request sent by the clients (default: omni move on Nim(5))")
+
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.load_test:
+        message = json.loads(args.message) if args.message is not None else None
+        report = asyncio.run(load_test(args.host, args.port, args.n_clients, args.n_requests, message))
+        print(json.dumps(report, indent = 2))
+    else:
+        server = NimServer(args.host, args.port, args.n_workers, args.rl_store, max_heaps = args.max_heaps)
+        print(f"Serving on {args.host}:{args.port}")
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
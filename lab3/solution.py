@@ -1,15 +1,22 @@
 from lab_utils.nim import Nim
 from lab_utils.nim_game import *
 from lab_utils.nim_rules import *
+from lab_utils.nim_minmax import best_move_minmax
+import profiling
+from typing import TYPE_CHECKING
 import argparse
+import os
+
+if TYPE_CHECKING:
+    from lab_utils.nim_rl import NimAI
 
 def boolean_string(s):
     if s.lower() not in {'false', 'true'}:
         raise ValueError('Not a valid boolean string')
     return s.lower() == 'true'
 
-def parse_args()->object: 
-    """args function. 
+def parse_args(argv:list=None)->object: 
+    """args function. Parses `argv` (defaults to the command line).
     Side note: if args.grid_search is False the agent's parameters will be set equal to our best-tested agent,
     trained on Nim(5) ONLY.
 
@@ -18,8 +25,14 @@ def parse_args()->object:
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("--nim-dimension", default=5, type=int, help="Dimension of the Nim game")
+    parser.add_argument("--subtraction-set", default=None, nargs="+", type=int, help="Numbers of objects which can be removed in a move (default: any, i.e. regular Nim)")
     parser.add_argument("--agent", default="omni", type=str, help="Type of agent to be considered (one in ['omni', 'rules', 'rl', 'minmax'])")
     parser.add_argument("--grid-search", default=False, type=boolean_string, help="Whether to perform a grid search on parameters of rules or not")
+    parser.add_argument("--grid-search-method", default="grid", type=str, help="How to search for the best parameters of rules (one in ['grid', 'racing'])")
+    parser.add_argument("--grid-search-games", default=100, type=int, help="Number of games played by each configuration during the grid search")
+    parser.add_argument("--grid-search-vectorized", default=False, type=boolean_string, help="Whether to play the games of the grid search in lockstep with numpy")
+    parser.add_argument("--grid-search-workers", default=1, type=int, help="Number of worker processes used to perform the grid search")
+    parser.add_argument("--grid-search-results", default=None, type=str, help="CSV file where grid search results are streamed (and resumed from)")
     parser.add_argument("--print-best-config", default=False, type=boolean_string, help="Whether or not to print the best config retrieved during grid search")
     parser.add_argument("--play-action", default=True, type = boolean_string, help="Play the action on the actual Nim game rather than simply returning it")
     parser.add_argument("--return-action", default=False, type = boolean_string, help="Return best action considering the actual Nim game before playing it")
@@ -28,13 +41,60 @@ def parse_args()->object:
     parser.add_argument("--rule-k", default=None, type=int, help="When agent=rules, number of heaps to be eliminated during opening")
     parser.add_argument("--rule-endgame-nim", default=None, type=float, help="When agent=rules, percentage of elements to nim in endgame")
     parser.add_argument("--rl-n-iter", default=10000, type=int, help="When agent=rl, number of games the AI plays in the training phase.")
+    parser.add_argument("--rl-trainer", default="episodic", type=str, help="When agent=rl, how to train the AI (one in ['episodic', 'parallel', 'exact'])")
+    parser.add_argument("--rl-n-workers", default=2, type=int, help="When agent=rl and rl-trainer=parallel, number of worker processes")
+    parser.add_argument("--rl-store", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"), type=str, help="When agent=rl, directory where trained AIs are stored")
+    parser.add_argument("--rl-retrain", default=False, type=boolean_string, help="When agent=rl, whether to train the AI from scratch even if a stored one is available")
+    parser.add_argument("--profile", default=None, type=str, help="Profile the run (one in ['phases', 'cprofile', 'sample'])")
+    parser.add_argument("--profile-output", default=None, type=str, help="When profiling with cprofile or sample, where to write the raw profile")
+    parser.add_argument("--rl-continue-iter", default=0, type=int, help="When agent=rl and a stored AI is reused, number of further games it plays in the training phase.")
                                             
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+def rl_agent(number_of_heaps:int, args:object)->"NimAI":
+    """Return the Q-learning agent playing games with `number_of_heaps` heaps.
+    A compatible agent stored in `args.rl_store` is reused (and trained for `args.rl_continue_iter` further games), 
+    otherwise a new agent is trained for `args.rl_n_iter` games. The resulting agent is stored for later use.
+
+    Args:
+        number_of_heaps (int): number of heaps in the games the agent plays.
+        args (object): parsed arguments (see `parse_args`).
+
+    Returns:
+        NimAI: trained agent.
+    """
+    # the Q-learning agent (and numpy) are only imported when needed, so that the other agents start quickly
+    from lab_utils.nim_rl import NimAI, train, train_parallel, train_exact
+    from lab_utils.nim_store import agent_path, is_compatible, load_agent, save_agent
+
+    trainers = {
+        "episodic": train,
+        "parallel": lambda ai, n_iter, number_of_heaps: train_parallel(ai, n_iter = n_iter, number_of_heaps = number_of_heaps, n_workers = args.rl_n_workers),
+        "exact": lambda ai, n_iter, number_of_heaps: train_exact(ai, number_of_heaps = number_of_heaps)
+    }
+    if args.rl_trainer.lower() not in trainers:
+        raise ValueError(f"Invalid trainer! Please use one in {list(trainers)}")
+
+    path = agent_path(args.rl_store, number_of_heaps, rule_set = args.subtraction_set)
+    if not args.rl_retrain and is_compatible(path, number_of_heaps, rule_set = args.subtraction_set):
+        ai = load_agent(path)
+        if ai.solved or args.rl_continue_iter == 0: 
+            return ai
+        n_iter = args.rl_continue_iter
+    else:
+        ai, n_iter = NimAI(number_of_heaps = number_of_heaps, rule_set = args.subtraction_set), args.rl_n_iter
+    
+    ai = trainers[args.rl_trainer.lower()](ai, n_iter = n_iter, number_of_heaps = number_of_heaps)
+    save_agent(ai, path)
+    return ai
 
-args = parse_args()
+def main(argv:list=None): 
+    args = parse_args(argv)
+    if args.profile is not None: 
+        return profiling.profile_run(run, args, mode = args.profile, output = args.profile_output)
+    return run(args)
 
-def main(): 
-    print(args.rl_n_iter)
+def run(args:object): 
     # sanity check on args
     if args.agent.lower() not in ["omni", "rules", "rl", "minmax"] or not isinstance(args.nim_dimension, int):
         raise ValueError("Invalid input types! Please use help to obtain guidance on input types")
@@ -44,19 +104,31 @@ def main():
         raise ValueError("Cannot play and return action at the same time!")
 
     if args.agent.lower() == "rules" and args.grid_search: 
-        # this performs grid search on possible configurations
-        configs_championship = rules_tournament(Nim(args.nim_dimension))
-        best_row = configs_championship.sort_values(by="success", ascending=False).iloc[0,:]
+        if args.grid_search_method.lower() == "racing":
+            # this races configurations, spending games on contenders only
+            configs_championship = rules_racing(Nim(args.nim_dimension, rule_set = args.subtraction_set), max_games = args.grid_search_games)
+            best_row = configs_championship.iloc[configs_championship.attrs["best"], :]
+            print(f"Racing played {configs_championship.attrs['games_played']:,} games (exhaustive grid: {configs_championship.attrs['grid_games']:,})")
+        else:
+            # this performs grid search on possible configurations
+            configs_championship = rules_tournament(
+                Nim(args.nim_dimension, rule_set = args.subtraction_set), 
+                n_games = args.grid_search_games, 
+                n_workers = args.grid_search_workers, 
+                results_path = args.grid_search_results, 
+                vectorized = args.grid_search_vectorized
+                )
+            best_row = configs_championship.sort_values(by="success", ascending=False).iloc[0,:]
 
         # initialize game with best config
-        game = Nim(args.nim_dimension, agent = args.agent.lower(), **best_row[:-1])
+        game = Nim(args.nim_dimension, agent = args.agent.lower(), rule_set = args.subtraction_set, **best_row[:-1])
 
         if args.print_best_config:
             print(best_row)
 
     if not args.grid_search and not args.agent.lower() == "rules":
         # initialize game with default config 
-        game = Nim(args.nim_dimension, agent = args.agent.lower())
+        game = Nim(args.nim_dimension, agent = args.agent.lower(), rule_set = args.subtraction_set)
     elif not args.grid_search and args.agent.lower() == "rules":
         # given parameters for rule-based agent
         params = {
@@ -65,19 +137,19 @@ def main():
             "strategy": args.rule_strategy if args.rule_strategy is not None else "sum", 
             "endgame_nim": args.rule_endgame_nim if args.rule_endgame_nim is not None else 0.6
         }
-        game = Nim(args.nim_dimension, agent = args.agent.lower(), **params)
+        game = Nim(args.nim_dimension, agent = args.agent.lower(), rule_set = args.subtraction_set, **params)
 
-    if game.agent == "minmax" and game._rows > 4:
+    if game.agent == "minmax" and len(game._rows) > 4:
         print("WARNING: you are using the minmax agent, and the tree is big. Computations may be really slow, although alpha-beta is implemented.")
         
+    # generate (or reuse) an instance of the Q-learning agent.
+    ai = rl_agent(game.number_of_heaps(), args) if game.agent == "rl" else None
+
     if args.play_action: 
-        play(game, args.rl_n_iter)
+        play(game, rl_agent = ai)
     elif args.return_action: 
         if game.agent == "rl":
-            # generate an instance of the Q-learning agent.
-            ai = train(ai, n_iter = args.rl_n_iter, number_of_heaps = game.number_of_heaps())
-            
-            best_move = ai.best_move_rl(game, with_probability = False)
+            best_move = ai.best_move_rl(game, with_probability = False)._rows
         else:
             best_moves = {
                 "omni" : best_move_nim_sum,
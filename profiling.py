@@ -0,0 +1,186 @@
+"""
+Lightweight instrumentation of the hot paths: named counters, per-phase timers and whole-run profiles.
+
+Instrumentation is disabled by default. Hooks run per call (e.g., per fitness evaluation, per expanded node or per move) are
+guarded with `if profiling.enabled:`, which costs a few tens of nanoseconds while disabled: counters with `count`, timers with
+`time.perf_counter()` and `record`. The `phase` context manager is convenient but costs a few hundred nanoseconds even while
+disabled (it returns a shared no-op context), so it only wraps coarse phases (e.g., a generation or a batch of games).
+The profilers (cProfile, pstats, signal) are only imported by `profile_run`, so that importing this module does not slow down
+the cold start of the labs.
+
+The module is shared by the labs, whose `lab_utils` add the root of this repo to `sys.path`.
+"""
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+
+enabled = False
+# name -> number of events
+counters = Counter()
+# phase name -> total seconds, number of calls
+timings = Counter()
+calls = Counter()
+
+_DISABLED = nullcontext()
+
+def enable(flag:bool=True)->None:
+    """
+        Enable (or disable) counters and timers.
+    """
+    global enabled
+    enabled = flag
+
+def reset()->None:
+    """
+        Clear counters and timers.
+    """
+    counters.clear(); timings.clear(); calls.clear()
+
+def count(name:str, n:int=1)->None:
+    """
+        Increase counter `name` by `n`. On hot paths, guard the call with `if profiling.enabled:`.
+    """
+    if enabled:
+        counters[name] += n
+
+@contextmanager
+def _timed_phase(name:str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start)
+
+def record(name:str, start:float)->float:
+    """
+        Add the time elapsed since `start` (a `time.perf_counter()` reading) to phase `name`, and return the current time,
+        so that consecutive phases can be chained. On hot paths, guard the call (and the reading of `start`) with `if profiling.enabled:`.
+    """
+    now = time.perf_counter()
+    timings[name] += now - start
+    calls[name] += 1
+    return now
+
+def phase(name:str):
+    """
+        Context manager timing the code it wraps as phase `name`. Nested phases are timed independently.
+        Meant for coarse phases: on hot paths, use `record` instead.
+    """
+    return _timed_phase(name) if enabled else _DISABLED
+
+def report(wall_seconds:float=None)->dict:
+    """
+        Return counters and phase timings (total seconds, calls, microseconds per call and share of `wall_seconds`).
+        Since phases can be nested (e.g., fitness evaluations within selection), shares do not necessarily sum to 1.
+        When `wall_seconds` is None, shares are relative to the total time of the phases.
+    """
+    total = wall_seconds if wall_seconds is not None else sum(timings.values())
+    return {
+        "counters": dict(counters),
+        "phases": {
+            name: {
+                "seconds": seconds,
+                "calls": calls[name],
+                "us_per_call": 1e6 * seconds / calls[name],
+                "share": seconds / total if total > 0 else 0.
+            } for name, seconds in timings.most_common()
+        }
+    }
+
+def format_report(wall_seconds:float=None)->str:
+    """
+        Human-readable version of `report`.
+    """
+    summary = report(wall_seconds)
+    lines = [f"{'phase':<28}{'seconds':>10}{'calls':>12}{'us/call':>10}{'share':>8}"]
+    for name, stats in summary["phases"].items():
+        lines.append(f"{name:<28}{stats['seconds']:>10.3f}{stats['calls']:>12,}{stats['us_per_call']:>10.1f}{stats['share']:>8.1%}")
+    lines.append(f"{'counter':<28}{'events':>10}")
+    for name, events in sorted(summary["counters"].items()):
+        lines.append(f"{name:<28}{events:>10,}")
+    return "\n".join(lines)
+
+def _sample(function:Callable, interval:float, *args, **kwargs)->tuple:
+    """
+        Statistical profiler: every `interval` seconds of CPU time, the stack of the running frame is sampled.
+        Return the result of `function` and the Counter of the sampled (file:line function) locations, both as leaf and in the stack.
+    """
+    import signal
+    leaves, stacks = Counter(), Counter()
+
+    def handler(signum, frame):
+        seen = set()
+        leaves[f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno or frame.f_code.co_firstlineno} {frame.f_code.co_name}"] += 1
+        # frames above `function` (i.e., the profiler and its callers) are not reported
+        while frame is not None and frame.f_code is not _sample.__code__:
+            location = f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno} {frame.f_code.co_name}"
+            if location not in seen:
+                stacks[location] += 1
+                seen.add(location)
+            frame = frame.f_back
+
+    previous = signal.signal(signal.SIGPROF, handler)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, previous)
+    return result, leaves, stacks
+
+def profile_run(function:Callable, *args, mode:str="phases", output:str=None, top:int=20, interval:float=0.001, **kwargs):
+    """
+        Run `function(*args, **kwargs)` with counters and timers enabled and print their report.
+
+    Args:
+        function (Callable): function to profile.
+        mode (str, optional): one in ['phases', 'cprofile', 'sample']. 'cprofile' also runs the deterministic profiler (see `cProfile`),
+                              'sample' a statistical profiler sampling the stack every `interval` seconds of CPU time (Unix only),
+                              which has a much lower overhead. Defaults to 'phases'.
+        output (str, optional): when `mode` is 'cprofile', file where the raw statistics are dumped (to be read with `pstats` or snakeviz).
+                                When `mode` is 'sample', file where the samples are written (one "location count" per line). Defaults to None.
+        top (int, optional): number of entries of the profiles which are printed. Defaults to 20.
+        interval (float, optional): sampling interval (s), when `mode` is 'sample'. Defaults to 0.001.
+
+    Returns:
+        whatever `function` returns.
+    """
+    if mode not in ["phases", "cprofile", "sample"]:
+        raise ValueError(f"Unknown profiling mode {mode}! Please use one in ['phases', 'cprofile', 'sample']")
+
+    was_enabled = enabled
+    enable(True); reset()
+    start = time.perf_counter()
+    try:
+        if mode == "cprofile":
+            import cProfile, io, pstats
+            profiler = cProfile.Profile()
+            result = profiler.runcall(function, *args, **kwargs)
+            if output is not None:
+                profiler.dump_stats(output)
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream = stream).sort_stats("cumulative").print_stats(top)
+            print(stream.getvalue())
+        elif mode == "sample":
+            result, leaves, stacks = _sample(function, interval, *args, **kwargs)
+            n_samples = sum(leaves.values())
+            print(f"{n_samples:,} samples every {1e3 * interval:g} ms of CPU time")
+            print(f"{'self':>8}  location")
+            for location, samples in leaves.most_common(top):
+                print(f"{samples / n_samples:>8.1%}  {location}")
+            print(f"{'total':>8}  function")
+            for location, samples in stacks.most_common(top):
+                print(f"{samples / n_samples:>8.1%}  {location}")
+            if output is not None:
+                with open(output, "w") as f:
+                    f.writelines(f"{location} {samples}\n" for location, samples in leaves.most_common())
+        else:
+            result = function(*args, **kwargs)
+        wall_seconds = time.perf_counter() - start
+        print(f"run: {wall_seconds:.3f} s")
+        print(format_report(wall_seconds))
+    finally:
+        enable(was_enabled)
+    return result